@@ -0,0 +1 @@
+# Benchmarks - scripts de mesure de performance (hors suite pytest)
@@ -0,0 +1,61 @@
+"""
+Benchmark GET /api/auth/me : remote (GoTrue) vs local JWT verification
+
+Usage (from backend/):
+    python -m benchmarks.bench_auth_me --requests 500 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.fake_supabase import FakeSupabase, summarize
+
+import httpx
+
+from config import get_settings
+from services.cache import get_user_cache
+from server import app
+
+
+async def _run(mode: str, requests: int, token: str) -> dict:
+    get_settings().AUTH_VERIFICATION_MODE = mode
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(requests):
+            started = time.perf_counter()
+            response = await client.get("/api/auth/me", headers={"Authorization": f"Bearer {token}"})
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+    return summarize(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02, help="injected upstream latency (s)")
+    parser.add_argument("--user-cache", action="store_true", help="keep the user_profiles cache enabled")
+    args = parser.parse_args()
+
+    user_cache = get_user_cache()
+    if not args.user_cache:
+        user_cache.max_size = 0
+
+    settings = get_settings()
+    fake = FakeSupabase(latency=args.latency, jwt_secret=settings.SUPABASE_JWT_SECRET, audience=settings.SUPABASE_JWT_AUDIENCE)
+    [(user_id, email)] = fake.seed(0, 1)
+    fake.install()
+    token = fake.mint_token(user_id, email)
+
+    results = {}
+    for mode in ("remote", "local"):
+        fake.requests.clear()
+        user_cache.clear()
+        results[mode] = asyncio.run(_run(mode, args.requests, token))
+        results[mode]["upstream_calls"] = sum(fake.requests.values())
+    print(json.dumps({"latency_s": args.latency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
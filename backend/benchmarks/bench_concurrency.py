@@ -0,0 +1,64 @@
+"""
+Throughput under concurrent slow upstream calls
+
+Fires N concurrent GET /api/entrepreneurs/{id} against
+benchmarks.fake_supabase, whose every request blocks for --latency seconds, first with blocking calls executed on the
+event loop (SUPABASE_THREADPOOL_SIZE=0, previous behaviour), then offloaded
+to the bounded worker pool.
+
+Usage (from backend/):
+    python -m benchmarks.bench_concurrency --concurrency 200 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from benchmarks.fake_supabase import FakeSupabase, summarize
+
+import httpx
+
+from config import get_settings
+from server import app
+
+
+async def _burst(concurrency: int, ids) -> dict:
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(entrepreneur_id: str) -> None:
+            started = time.perf_counter()
+            response = await client.get(f"/api/entrepreneurs/{entrepreneur_id}")
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(ids[i % len(ids)]) for i in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {"elapsed_s": round(elapsed, 3), "rps": round(concurrency / elapsed, 1), **summarize(samples)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="injected upstream latency (s)")
+    parser.add_argument("--pool-size", type=int, default=get_settings().SUPABASE_THREADPOOL_SIZE)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    fake = FakeSupabase(latency=args.latency, jwt_secret=settings.SUPABASE_JWT_SECRET, audience=settings.SUPABASE_JWT_AUDIENCE)
+    fake.seed(500, 0)
+    fake.install()
+    ids = [row["id"] for row in fake.store.tables["entrepreneurs_public"]]
+
+    # Mesure des appels amont : le cache de réponses doit rester hors jeu
+    settings.RESPONSE_CACHE_BACKEND = "none"
+    results = {}
+    for label, pool_size in (("event_loop", 0), ("threadpool", args.pool_size)):
+        settings.SUPABASE_THREADPOOL_SIZE = pool_size
+        results[label] = asyncio.run(_burst(args.concurrency, ids))
+    print(json.dumps({"concurrency": args.concurrency, "latency_s": args.latency, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Contact form under a burst: direct insert vs write-behind queue
+
+Fires --burst concurrent POST /api/contact against benchmarks.fake_supabase
+(every upstream request sleeps --latency seconds, like a remote PostgREST),
+first with the synchronous insert (201 once the row is written), then with
+CONTACT_QUEUE_ENABLED (202 once the message is in the local SQLite spool).
+Reports the acceptance latency seen by clients, the time until every
+message is in contact_messages, and the number of upstream requests.
+
+Usage (from backend/):
+    python -m benchmarks.bench_contact_queue --burst 500 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict
+
+from benchmarks.fake_supabase import FakeSupabase, summarize
+
+# Lus à l'import du serveur : un seul client simulé, sans plafond de concurrence (latence brute mesurée)
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("ADMISSION_MAX_CONCURRENT", "0")
+
+import httpx
+
+from config import get_settings
+
+settings = get_settings()
+
+
+def _message(index: int) -> Dict[str, str]:
+    return {
+        "name": f"Visiteur {index}",
+        "email": f"visitor{index}@bench.example.com",
+        "subject": "Demande d'information",
+        "message": f"Message de test numéro {index} envoyé pendant la campagne.",
+    }
+
+
+async def _burst(app, fake: FakeSupabase, burst: int, expected_status: int) -> Dict[str, Any]:
+    from services.contact_queue import get_contact_queue
+    from services.supabase_client import get_supabase_admin
+
+    stored_before = len(fake.store.tables.get("contact_messages", []))
+    requests_before = fake.requests["postgrest"]
+    queue = get_contact_queue() if settings.CONTACT_QUEUE_ENABLED else None
+    if queue is not None:
+        await queue.start(get_supabase_admin())
+    samples = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one(index: int) -> None:
+            started = time.perf_counter()
+            response = await client.post("/api/contact", json=_message(index))
+            samples.append(time.perf_counter() - started)
+            assert response.status_code == expected_status, response.text
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(index) for index in range(burst)))
+        accepted = time.perf_counter() - started
+        # Messages acceptés mais pas encore insérés : attente du worker
+        while len(fake.store.tables.get("contact_messages", [])) - stored_before < burst:
+            await asyncio.sleep(0.005)
+        stored = time.perf_counter() - started
+    if queue is not None:
+        await queue.stop(settings.CONTACT_QUEUE_DRAIN_SECONDS)
+    return {
+        "status": expected_status,
+        "all_accepted_s": round(accepted, 3),
+        "all_stored_s": round(stored, 3),
+        "upstream_requests": fake.requests["postgrest"] - requests_before,
+        "acceptance": summarize(samples),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--burst", type=int, default=500, help="concurrent submissions")
+    parser.add_argument("--latency", type=float, default=0.05, help="injected upstream latency (s)")
+    parser.add_argument("--batch-size", type=int, default=settings.CONTACT_QUEUE_BATCH_SIZE)
+    args = parser.parse_args()
+
+    fake = FakeSupabase(latency=args.latency, jwt_secret=settings.SUPABASE_JWT_SECRET, audience=settings.SUPABASE_JWT_AUDIENCE)
+    fake.install()
+    from server import app
+
+    results = {}
+    with tempfile.TemporaryDirectory() as spool_dir:
+        settings.CONTACT_QUEUE_PATH = os.path.join(spool_dir, "contact_queue.sqlite3")
+        settings.CONTACT_QUEUE_BATCH_SIZE = args.batch_size
+        for label, enabled, expected_status in (("direct", False, 201), ("queued", True, 202)):
+            settings.CONTACT_QUEUE_ENABLED = enabled
+            results[label] = asyncio.run(_burst(app, fake, args.burst, expected_status))
+    print(json.dumps({"burst": args.burst, "latency_s": args.latency, "batch_size": args.batch_size, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
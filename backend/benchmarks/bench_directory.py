@@ -0,0 +1,176 @@
+"""
+Directory pages from the in-memory snapshot vs the PostgREST query
+
+Loads services.directory_snapshot from benchmarks.fake_supabase (real
+postgrest-py requests, in-process answers), then checks that the snapshot
+returns the same rows in the same order as the PostgREST query of
+list_entrepreneurs for --queries random filter / sort / page combinations,
+following cursors over several pages. The store is then modified (ratings,
+cities, unpublished and new profiles), the snapshot polled, and the check
+run again. Exits non-zero on any difference. Finally times one page from
+each path (the PostgREST time excludes the network: it is the client and
+fake-server cost only).
+
+Usage (from backend/):
+    python -m benchmarks.bench_directory --entrepreneurs 5000 --queries 500
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.fake_supabase import COUNTRIES, CITIES, PROFILE_TYPES, TAGS, FakeSupabase, make_entrepreneur, summarize
+
+from config import get_settings
+from routers.entrepreneurs import _decode_cursor, _directory_query, _encode_cursor
+from services.directory_snapshot import DirectorySnapshot
+from services.supabase_client import execute, get_supabase_admin
+
+settings = get_settings()
+
+Params = Tuple[Optional[str], Optional[str], Optional[str], Optional[str], Optional[float], str, str, int, int]
+
+
+def _random_params(rng: random.Random) -> Params:
+    country_code = rng.choice(COUNTRIES).lower() if rng.random() < 0.4 else None
+    city = rng.choice(CITIES)[:rng.randint(2, 5)].upper() if rng.random() < 0.3 else None
+    profile_type = rng.choice(PROFILE_TYPES) if rng.random() < 0.3 else None
+    tags = ",".join(rng.sample(TAGS, rng.randint(1, 2))) if rng.random() < 0.3 else None
+    min_rating = rng.choice([1.5, 3, 4.25, 4.9]) if rng.random() < 0.3 else None
+    sort_by = rng.choice(["created_at", "rating"])
+    sort_order = rng.choice(["asc", "desc"])
+    limit = rng.choice([1, 10, 50, 100])
+    offset = rng.choice([0, 0, 20, 500])
+    return country_code, city, profile_type, tags, min_rating, sort_by, sort_order, limit, offset
+
+
+async def _postgrest_page(supabase, params: Params, after: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    country_code, city, profile_type, tags, min_rating, sort_by, sort_order, limit, offset = params
+    result = await execute(_directory_query(supabase, country_code, city, profile_type, tags, min_rating, sort_by, sort_order, limit, offset, after), call_site="bench.directory")
+    return result.data or []
+
+
+def _ids(rows: List[Dict[str, Any]]) -> List[str]:
+    return [str(row["id"]) for row in rows]
+
+
+async def check_consistency(snapshot: DirectorySnapshot, supabase, rng: random.Random, queries: int, pages: int = 3) -> int:
+    """Compare both paths (offset pages, then a few cursor pages); returns the number of pages compared"""
+    compared = 0
+    for _ in range(queries):
+        params = _random_params(rng)
+        country_code, city, profile_type, tags, min_rating, sort_by, sort_order, limit, offset = params
+        expected = await _postgrest_page(supabase, params, None)
+        got = snapshot.page(country_code, city, profile_type, tags, min_rating, sort_by, sort_order, limit, offset)
+        if got is None or _ids(got) != _ids(expected):
+            raise AssertionError(f"offset page differs for {params}: {_ids(got or [])[:5]} != {_ids(expected)[:5]}")
+        compared += 1
+        # Pagination par curseur à partir de la première page
+        cursor_params = params[:-1] + (0,)
+        after = None
+        for _ in range(pages):
+            expected = await _postgrest_page(supabase, cursor_params, after)
+            got = snapshot.page(country_code, city, profile_type, tags, min_rating, sort_by, sort_order, limit, 0, after)
+            if _ids(got) != _ids(expected):
+                raise AssertionError(f"cursor page differs for {params} after {after}")
+            compared += 1
+            if len(expected) < limit:
+                break
+            # Curseur tel que la route le décode
+            after = _decode_cursor(_encode_cursor(sort_by, sort_order, expected[-1]), sort_by, sort_order)
+    return compared
+
+
+def mutate(fake: FakeSupabase, rng: random.Random, count: int) -> None:
+    """Change ratings and cities, unpublish and add profiles, bumping updated_at like the trigger"""
+    store = fake.store
+    rows = store.tables["entrepreneurs"]
+    now = datetime.now(timezone.utc)
+    for offset, row in enumerate(rng.sample(rows, count)):
+        row["updated_at"] = (now + timedelta(microseconds=offset)).isoformat()
+        choice = rng.random()
+        if choice < 0.4:
+            row["rating"] = round(rng.uniform(0, 5), 2)
+        elif choice < 0.6:
+            row["city"] = rng.choice(CITIES)
+        elif choice < 0.8:
+            row["status"] = "deactivated"
+        else:
+            row["status"] = "published"
+    for index in range(count // 4):
+        row = make_entrepreneur(len(rows) + index, rng)
+        row.update(id=str(uuid.uuid4()), status="published", updated_at=now.isoformat())
+        rows.append(row)
+    store.tables["entrepreneurs_public"] = [row for row in rows if row["status"] == "published"]
+    fake._versions.update(("entrepreneurs", "entrepreneurs_public"))
+
+
+def _time_page(func, number: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(number):
+        started = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+async def run(args) -> Dict[str, Any]:
+    fake = FakeSupabase(jwt_secret=settings.SUPABASE_JWT_SECRET, audience=settings.SUPABASE_JWT_AUDIENCE)
+    fake.seed(args.entrepreneurs, 0, args.seed)
+    fake.install()
+    supabase = get_supabase_admin()
+    # Générateur distinct de celui des données (mêmes tirages sinon : identifiants en double)
+    rng = random.Random(args.seed + 1)
+
+    snapshot = DirectorySnapshot(poll_seconds=3600, reload_seconds=3600)
+    started = time.perf_counter()
+    await snapshot.start(supabase)
+    load_seconds = time.perf_counter() - started
+    await snapshot.stop()
+    compared = await check_consistency(snapshot, supabase, rng, args.queries)
+
+    mutate(fake, rng, args.mutations)
+    changes = await snapshot.poll()
+    compared += await check_consistency(snapshot, supabase, rng, args.queries)
+
+    page = ("CI", None, None, "web", None, "rating", "desc", 50, 0)
+    memory = _time_page(lambda: snapshot.page(*page), args.number)
+    postgrest_samples = []
+    for _ in range(args.number):
+        begin = time.perf_counter()
+        await _postgrest_page(supabase, page, None)
+        postgrest_samples.append(time.perf_counter() - begin)
+    return {
+        "entrepreneurs": args.entrepreneurs,
+        "published": len(snapshot),
+        "load_ms": round(load_seconds * 1000, 1),
+        "poll_changes": changes,
+        "pages_compared": compared,
+        "consistency": "ok",
+        "page": {"snapshot": memory, "postgrest_in_process": summarize(postgrest_samples)},
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entrepreneurs", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=300, help="random filter combinations checked (before and after the changes)")
+    parser.add_argument("--mutations", type=int, default=200, help="profiles changed before the poll")
+    parser.add_argument("--number", type=int, default=200, help="pages timed per path")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    try:
+        report = asyncio.run(run(args))
+    except AssertionError as e:
+        print(f"Directory snapshot differs from PostgREST: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
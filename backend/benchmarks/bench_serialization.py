@@ -0,0 +1,102 @@
+"""
+Serialization cost of a directory page: Pydantic models vs trusted-row fast path
+
+Checks first that the fast path conforms to EntrepreneurPublic on a page of
+realistic rows plus edge cases (null tags/portfolio, missing optional
+columns, integer ratings, extra keys); exits non-zero otherwise. Then times,
+per page of --rows rows:
+  - original: model_validate per row, then FastAPI-style re-validation and
+    serialization through response_model=List[EntrepreneurPublic]
+  - models: model_validate per row + TypeAdapter.dump_json
+  - fast_path: TrustedRowSerializer.shape_many + dumps
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization --rows 100
+"""
+import argparse
+import json
+import random
+import sys
+import timeit
+from typing import Any, Dict, List
+
+from benchmarks.fake_supabase import make_entrepreneur
+
+from pydantic import TypeAdapter
+
+from models.entrepreneur import EntrepreneurPublic
+from routers.entrepreneurs import _PUBLIC_ROWS, _sanitize_profile
+from services import serialization
+from services.serialization import dumps
+
+_PROFILES = TypeAdapter(List[EntrepreneurPublic])
+
+
+def _edge_cases(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    cases = [dict(row) for row in rows[:4]]
+    cases[0]["tags"] = None
+    cases[1].pop("first_saved_at")
+    cases[1].pop("website")
+    cases[2]["rating"] = 4
+    cases[2]["portfolio"] = [{"type": "link", "value": "https://example.com", "label": "extra"}]
+    cases[3].pop("status")
+    return cases
+
+
+def _original(rows):
+    profiles = [EntrepreneurPublic.model_validate(_sanitize_profile(row)) for row in rows]
+    # Chemin de FastAPI pour response_model : dict -> validation -> sérialisation JSON -> json.dumps
+    validated = _PROFILES.validate_python([profile.model_dump() for profile in profiles])
+    return json.dumps(_PROFILES.dump_python(validated, mode="json"), ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def _models(rows):
+    return _PROFILES.dump_json([EntrepreneurPublic.model_validate(_sanitize_profile(row)) for row in rows])
+
+
+def _fast_path(rows):
+    return dumps(_PUBLIC_ROWS.shape_many(rows))
+
+
+def check_conformance(rows: List[Dict[str, Any]]) -> None:
+    """Fast-path output must validate and decode to the same profiles as the model path"""
+    fast = json.loads(_fast_path(rows))
+    _PUBLIC_ROWS.check(fast)
+    expected = _PROFILES.validate_json(_models(rows))
+    if _PROFILES.validate_python(fast) != expected:
+        raise AssertionError("fast path output differs from EntrepreneurPublic serialization")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--number", type=int, default=200, help="pages serialized per timing run")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    # Colonnes de la vue entrepreneurs_public (sans les contacts)
+    rows = [make_entrepreneur(index, rng) for index in range(args.rows)]
+    for row in rows:
+        for column in ("user_id", "phone", "whatsapp", "email", "premium_until"):
+            row.pop(column)
+
+    try:
+        check_conformance(rows + _edge_cases(rows))
+    except Exception as e:
+        print(f"Schema conformance check failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    results = {}
+    for name, func in (("original", _original), ("models", _models), ("fast_path", _fast_path)):
+        best = min(timeit.repeat(lambda: func(rows), number=args.number, repeat=5))
+        results[name] = {"us_per_page": round(best / args.number * 1e6, 1), "bytes": len(func(rows))}
+    print(json.dumps({
+        "rows": args.rows,
+        "encoder": "orjson" if serialization.orjson is not None else "json",
+        "conformance": "ok",
+        "results": results,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
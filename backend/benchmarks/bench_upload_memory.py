@@ -0,0 +1,79 @@
+"""
+Memory of concurrent logo uploads: streamed/spooled path vs read-all legacy path
+
+Sends N concurrent ~5 MB PNG uploads to POST /api/storage/upload-logo and to
+a copy of the previous implementation (UploadFile + await file.read()), and
+reports the Python heap peak (tracemalloc) of each run.
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload_memory --concurrency 50
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import tracemalloc
+import uuid
+
+from benchmarks.fake_supabase import FakeSupabase
+
+import httpx
+from fastapi import Depends, File, HTTPException, UploadFile
+
+from config import get_settings
+from dependencies import get_current_user
+from services.supabase_client import get_supabase_admin, run_sync
+from server import app
+
+USER = {"id": str(uuid.uuid4()), "email": "bench@example.com", "has_profile": False}
+
+
+@app.post("/bench/legacy-upload-logo")
+async def legacy_upload_logo(file: UploadFile = File(...), current_user: dict = Depends(get_current_user), supabase=Depends(get_supabase_admin)):
+    # Reproduction de l'ancienne implémentation : lecture complète en mémoire puis contrôle de taille
+    contents = await file.read()
+    if len(contents) > 5 * 1024 * 1024:
+        raise HTTPException(status_code=400, detail="File size exceeds 5 MB limit")
+    await run_sync(supabase.storage.from_('logos').upload, path=f"{current_user['id']}/{uuid.uuid4()}.png", file=contents, file_options={"content-type": file.content_type})
+    return {"ok": True}
+
+
+async def _burst(url: str, concurrency: int, payload: bytes) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        async def one() -> None:
+            response = await client.post(url, files={"file": ("logo.png", payload, "image/png")})
+            assert response.status_code == 200, response.text
+
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"elapsed_s": round(elapsed, 3), "heap_peak_mb": round(peak / (1024 * 1024), 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--size-mb", type=float, default=4.9)
+    parser.add_argument("--latency", type=float, default=0.05, help="injected storage latency (s)")
+    args = parser.parse_args()
+
+    settings = get_settings()
+    FakeSupabase(latency=args.latency, jwt_secret=settings.SUPABASE_JWT_SECRET, audience=settings.SUPABASE_JWT_AUDIENCE).install()
+    app.dependency_overrides[get_current_user] = lambda: USER
+    payload = b"\x89PNG\r\n\x1a\n" + os.urandom(int(args.size_mb * 1024 * 1024) - 8)
+
+    results = {
+        "legacy_read_all": asyncio.run(_burst("/bench/legacy-upload-logo", args.concurrency, payload)),
+        "streamed": asyncio.run(_burst("/api/storage/upload-logo", args.concurrency, payload)),
+    }
+    print(json.dumps({"concurrency": args.concurrency, "size_mb": args.size_mb, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
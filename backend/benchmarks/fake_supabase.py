@@ -0,0 +1,659 @@
+"""
+In-process HTTP stand-in for Supabase (PostgREST, GoTrue, Storage), shared
+by the benchmarks and the tests
+
+The fake answers HTTP requests: the real clients (PooledClient,
+postgrest-py, gotrue, storage3) build and parse every request, and the fake
+is plugged in as the transport of the shared connection pools (install()).
+Tables and RPCs live in a FakeStore; every upstream request sleeps
+`latency` seconds in the calling worker thread, like network time.
+
+Supported subset: PostgREST reads (eq/neq/gt/gte/lt/lte/like/ilike/in/cs/is
+filters, or=(... and(...)) keyset filters, order, limit/offset, select
+columns, single object), insert/upsert/update/delete, the RPCs of the store;
+GoTrue signup, password and refresh-token grants, /user, /logout; Storage
+object upload (read in chunks, like a socket) and delete.
+"""
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+import jwt
+
+# Settings are required at import time of the backend modules
+os.environ.setdefault("SUPABASE_URL", "http://supabase.local")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "benchmark-jwt-secret-benchmark-jwt-secret")
+# JWT-shaped API keys: supabase-py rejects anything else when a real client is created (fake_supabase)
+os.environ.setdefault("SUPABASE_ANON_KEY", jwt.encode({"role": "anon", "iss": "supabase"}, os.environ["SUPABASE_JWT_SECRET"]))
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", jwt.encode({"role": "service_role", "iss": "supabase"}, os.environ["SUPABASE_JWT_SECRET"]))
+
+# Per-request access logs of the in-process client would dominate the output
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 in milliseconds"""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+    }
+
+
+PROFILE_TYPES = ["entreprise", "freelance", "pme", "artisan", "ONG", "cabinet", "organisation", "autre"]
+COUNTRIES = ["BJ", "CI", "SN", "TG", "CM", "FR", "BF", "ML"]
+CITIES = ["Cotonou", "Abidjan", "Dakar", "Lomé", "Douala", "Paris", "Ouagadougou", "Bamako"]
+TAGS = ["design", "web", "mobile", "marketing", "finance", "agriculture", "btp", "conseil", "mode", "santé"]
+
+
+def make_entrepreneur(index: int, rng: random.Random) -> Dict[str, Any]:
+    """Realistic entrepreneurs row (all columns of the table)"""
+    created_at = datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=index)
+    country = rng.randrange(len(COUNTRIES))
+    return {
+        "id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "user_id": str(uuid.UUID(int=rng.getrandbits(128))),
+        "profile_type": rng.choice(PROFILE_TYPES),
+        "first_name": f"Prénom{index}",
+        "last_name": f"Nom{index}",
+        "company_name": f"Société {index}",
+        "activity_name": f"Activité {index % 500}",
+        "logo_url": None,
+        "description": "Accompagnement des entreprises locales dans leur croissance numérique.",
+        "tags": rng.sample(TAGS, rng.randint(0, 5)),
+        "phone": "+22900000000",
+        "whatsapp": "+22900000000",
+        "email": f"user{index}@example.com",
+        "website": None,
+        "country_code": COUNTRIES[country],
+        "city": CITIES[country],
+        "portfolio": [],
+        "rating": round(rng.uniform(0, 5), 2),
+        "review_count": rng.randint(0, 200),
+        "is_premium": rng.random() < 0.1,
+        "premium_until": None,
+        "status": "published" if rng.random() < 0.9 else "draft",
+        "first_saved_at": created_at.isoformat(),
+        "created_at": created_at.isoformat(),
+        "updated_at": created_at.isoformat(),
+    }
+
+
+# Paramètres PostgREST qui ne sont pas des filtres de colonne
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+# Colonnes indexées (recherche directe par égalité au lieu d'un parcours)
+_INDEXED_COLUMNS = ("id", "user_id")
+# RPC qui modifient les tables du store (invalident tris et index mis en cache)
+_WRITE_RPCS = {"create_entrepreneur_profile", "delete_entrepreneur_profile", "increment_entrepreneur_views"}
+_OBJECT_MEDIA_TYPE = "application/vnd.pgrst.object+json"
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+def _split_top_level(value: str) -> List[str]:
+    """Split on commas outside parentheses, braces and double quotes"""
+    parts, depth, quoted, current = [], 0, False, []
+    for char in value:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char in "({":
+            depth += 1
+        elif not quoted and char in ")}":
+            depth -= 1
+        elif char == "," and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _coerce(raw: str, sample: Any) -> Any:
+    """Filter operand converted to the type of the column value"""
+    if isinstance(sample, bool):
+        return raw == "true"
+    if isinstance(sample, (int, float)):
+        return float(raw)
+    return raw
+
+
+def _pattern(value: str, flags: int = 0) -> "re.Pattern[str]":
+    escaped = re.escape(value).replace("%", ".*").replace(r"\*", ".*")
+    return re.compile(f"^{escaped}$", flags | re.DOTALL)
+
+
+def _condition(column: str, expression: str) -> Predicate:
+    """Predicate of one PostgREST filter such as `rating=gte.4` or `id=in.(a,b)`"""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, operand = expression.partition(".")
+
+    if op in ("eq", "neq", "gt", "gte", "lt", "lte"):
+        raw = _unquote(operand)
+        compare = {
+            "eq": lambda a, b: a == b, "neq": lambda a, b: a != b,
+            "gt": lambda a, b: a > b, "gte": lambda a, b: a >= b,
+            "lt": lambda a, b: a < b, "lte": lambda a, b: a <= b,
+        }[op]
+
+        def matches(row):
+            value = row.get(column)
+            return value is not None and compare(value, _coerce(raw, value))
+    elif op in ("like", "ilike"):
+        regex = _pattern(_unquote(operand), re.IGNORECASE if op == "ilike" else 0)
+
+        def matches(row):
+            value = row.get(column)
+            return value is not None and regex.match(str(value)) is not None
+    elif op == "in":
+        accepted = {_unquote(item) for item in _split_top_level(operand.strip("()"))}
+
+        def matches(row):
+            value = row.get(column)
+            return value is not None and str(value) in accepted
+    elif op == "cs":
+        required = {_unquote(item) for item in _split_top_level(operand.strip("{}")) if item}
+
+        def matches(row):
+            return required <= set(row.get(column) or [])
+    elif op == "is":
+        expected = {"null": None, "true": True, "false": False}[operand]
+
+        def matches(row):
+            return row.get(column) is expected
+    else:
+        raise ValueError(f"unsupported PostgREST operator: {op}")
+
+    if negate:
+        return lambda row: not matches(row)
+    return matches
+
+
+def _logical(expression: str, combine: Callable[[Iterable[bool]], bool]) -> Predicate:
+    """Predicate of `or=(a.eq.1,and(b.gt.2,c.lt.3))` style filters"""
+    predicates = []
+    for item in _split_top_level(expression.strip("()")):
+        for keyword, inner in (("and", all), ("or", any)):
+            if item.startswith(f"{keyword}("):
+                predicates.append(_logical(item[len(keyword):], inner))
+                break
+        else:
+            column, _, rest = item.partition(".")
+            predicates.append(_condition(column, rest))
+    return lambda row: combine(predicate(row) for predicate in predicates)
+
+
+def _sort(rows: List[Dict[str, Any]], order: str) -> List[Dict[str, Any]]:
+    ordered = list(rows)
+    # Tris stables successifs, de la dernière clé à la première
+    for term in reversed(order.split(",")):
+        column, *modifiers = term.split(".")
+        descending = "desc" in modifiers
+        # Place des NULL comme PostgreSQL : nullsfirst / nullslast, sinon en tête en ordre décroissant
+        nulls_first = "nullsfirst" in modifiers or (descending and "nullslast" not in modifiers)
+        ordered.sort(key=lambda row: row.get(column) if row.get(column) is not None else 0, reverse=descending)
+        ordered.sort(key=lambda row: (row.get(column) is None) != nulls_first)
+    return ordered
+
+
+class FakeStore:
+    """Tables, storage objects and RPCs behind the fake (the database side)"""
+
+    def __init__(self):
+        self.tables: Dict[str, List[Dict[str, Any]]] = {}
+        # Chemin de l'objet -> taille en octets
+        self.objects: Dict[str, int] = {}
+        self._search_texts: Dict[str, str] = {}
+        self.rpc_handlers: Dict[str, Any] = {
+            "get_platform_stats": self._platform_stats,
+            "get_entrepreneur_contacts": self._contacts,
+            "get_entrepreneur_contacts_batch": self._contacts_batch,
+            "search_entrepreneurs": self._search,
+            "create_entrepreneur_profile": self._create_profile,
+            "delete_entrepreneur_profile": self._delete_profile,
+            "get_entrepreneur_facets": self._facets,
+            "increment_entrepreneur_views": self._increment_views,
+        }
+
+    def _platform_stats(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        entrepreneurs = self.tables.get("entrepreneurs", [])
+        return [{
+            "total_users": len(self.tables.get("user_profiles", [])),
+            "total_entrepreneurs": len(entrepreneurs),
+            "total_published": len(self.tables.get("entrepreneurs_public", [])),
+            "countries_covered": len({row["country_code"] for row in entrepreneurs}),
+            "total_views": sum(row["views"] for row in self.tables.get("entrepreneur_views", [])),
+        }]
+
+    def _increment_views(self, params: Dict[str, Any]) -> int:
+        rows = {row["entrepreneur_id"]: row for row in self.tables.setdefault("entrepreneur_views", [])}
+        known = {row["id"] for row in self.tables.get("entrepreneurs", [])}
+        applied = 0
+        for entrepreneur_id, delta in (params.get("deltas") or {}).items():
+            if entrepreneur_id not in known or delta <= 0:
+                continue
+            row = rows.get(entrepreneur_id)
+            if row is None:
+                row = rows[entrepreneur_id] = {"entrepreneur_id": entrepreneur_id, "views": 0}
+                self.tables["entrepreneur_views"].append(row)
+            row["views"] += delta
+            applied += 1
+        return applied
+
+    def _contacts_batch(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        wanted = set(params.get("entrepreneur_ids") or [])
+        return [
+            {"id": row["id"], "phone": row.get("phone"), "whatsapp": row.get("whatsapp"), "email": row.get("email")}
+            for row in self.tables.get("entrepreneurs_public", []) if row["id"] in wanted
+        ]
+
+    def _search_text(self, row: Dict[str, Any]) -> str:
+        # Texte indexé mis en cache par profil (le load test interroge des milliers de lignes par recherche)
+        text = self._search_texts.get(row["id"])
+        if text is None:
+            text = " ".join(str(row.get(key) or "") for key in ("first_name", "last_name", "company_name", "activity_name", "description")).lower()
+            self._search_texts[row["id"]] = text
+        return text
+
+    def _filtered_public(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Published rows matching the filters of search_entrepreneurs / get_entrepreneur_facets"""
+        # Recherche libre approchée par une sous-chaîne (pas de plein texte dans le fake)
+        term = (params.get("search_query") or "").strip().lower()
+        country, city, kind = params.get("filter_country_code"), params.get("filter_city"), params.get("filter_profile_type")
+        tags, min_rating = params.get("filter_tags"), params.get("filter_min_rating")
+        return [
+            row for row in self.tables.get("entrepreneurs_public", [])
+            if (not term or term in self._search_text(row))
+            and (not country or row.get("country_code") == country.upper())
+            and (not city or city.lower() in (row.get("city") or "").lower())
+            and (not kind or row.get("profile_type") == kind)
+            and (not tags or set(tags) <= set(row.get("tags") or []))
+            and (not min_rating or (row.get("rating") or 0) >= min_rating)
+        ]
+
+    def _search(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        rows = self._filtered_public(params)
+        column = "rating" if params.get("sort_by") == "rating" else "created_at"
+        rows.sort(key=lambda row: (row.get(column) is not None, row.get(column) or 0, row["id"]), reverse=not params.get("sort_ascending"))
+        # NULLS LAST dans les deux sens, comme search_entrepreneurs
+        if params.get("sort_ascending"):
+            rows.sort(key=lambda row: row.get(column) is None)
+        offset = max(params.get("page_offset") or 0, 0)
+        return rows[offset:offset + min(max(params.get("page_limit") or 50, 1), 100)]
+
+    def _contacts(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        return self._contacts_batch({"entrepreneur_ids": [params.get("entrepreneur_id")]})
+
+    def _facets(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        rows = self._filtered_public(params)
+        limit = params.get("facet_limit") or 50
+        facets: Dict[str, Any] = {"total": len(rows)}
+        for facet in ("country_code", "city", "profile_type", "tags"):
+            counts = Counter(value for row in rows for value in (row.get(facet) or [] if facet == "tags" else [row.get(facet)]) if value)
+            ranked = sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            facets[facet] = [{"value": value, "count": count} for value, count in ranked]
+        return facets
+
+    def _create_profile(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        entrepreneurs = self.tables.setdefault("entrepreneurs", [])
+        if any(row["user_id"] == params["p_user_id"] for row in entrepreneurs):
+            return {"status": "already_exists"}
+        now = datetime.now(timezone.utc).isoformat()
+        row = {
+            "rating": 0.0, "review_count": 0, "is_premium": False, "premium_until": None,
+            "company_name": None, "activity_name": None, "logo_url": None, "website": None,
+            "tags": [], "portfolio": [], **params["p_profile"],
+            "id": str(uuid.uuid4()), "user_id": params["p_user_id"], "status": "draft",
+            "first_saved_at": now, "created_at": now, "updated_at": now,
+        }
+        entrepreneurs.append(row)
+        return {"status": "created", "profile": row}
+
+    def _delete_profile(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        entrepreneurs = self.tables.get("entrepreneurs", [])
+        wanted = params.get("p_entrepreneur_id")
+        target = next((row for row in entrepreneurs if (row["id"] == wanted if wanted else row["user_id"] == params["p_user_id"])), None)
+        if target is None:
+            return {"status": "not_found"}
+        if target["user_id"] != params["p_user_id"]:
+            return {"status": "not_owner"}
+        entrepreneurs.remove(target)
+        return {"status": "deleted", "id": target["id"]}
+
+    def seed_entrepreneurs(self, count: int, seed: int = 42) -> List[Dict[str, Any]]:
+        """Fill entrepreneurs and the entrepreneurs_public view"""
+        rng = random.Random(seed)
+        rows = [make_entrepreneur(index, rng) for index in range(count)]
+        self.tables["entrepreneurs"] = rows
+        self.tables["entrepreneurs_public"] = [row for row in rows if row["status"] == "published"]
+        return rows
+
+
+class FakeSupabaseTransport(httpx.BaseTransport):
+    """Transport of one Supabase service, answered by the fake"""
+
+    def __init__(self, fake: "FakeSupabase", service: str):
+        self._fake = fake
+        self._service = service
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        return self._fake.handle(self._service, request)
+
+    def shutdown(self) -> None:
+        pass
+
+
+class FakeSupabase:
+    def __init__(self, latency: float = 0.0, jwt_secret: str = "", audience: str = "authenticated"):
+        self.store = FakeStore()
+        self.latency = latency
+        self.jwt_secret = jwt_secret
+        self.audience = audience
+        self.requests: Counter = Counter()
+        # email -> (user_id, password) ; refresh token -> email
+        self.accounts: Dict[str, Tuple[str, str]] = {}
+        self._refresh_tokens: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._versions: Counter = Counter()
+        self._sorted: Dict[Tuple[str, str], Tuple[int, List[Dict[str, Any]]]] = {}
+        self._indexes: Dict[Tuple[str, str], Tuple[int, Dict[Any, List[Dict[str, Any]]]]] = {}
+
+    # ------------------------------------------------------------------
+    # Installation et données
+
+    def transport(self, service: str) -> FakeSupabaseTransport:
+        return FakeSupabaseTransport(self, service)
+
+    def install(self) -> None:
+        """Route the shared connection pools of services.supabase_client to the fake"""
+        from services import supabase_client
+
+        supabase_client.get_http_transport = lru_cache(maxsize=None)(self.transport)
+        supabase_client.get_supabase_admin.cache_clear()
+
+    def seed(self, entrepreneurs: int, users: int, seed: int = 42, password: str = "benchmark-password") -> List[Tuple[str, str]]:
+        """Seed entrepreneurs (+ the public view) and user accounts; returns (user_id, email) pairs"""
+        self.store.seed_entrepreneurs(entrepreneurs, seed)
+        accounts = []
+        for index in range(users):
+            user_id = str(uuid.UUID(int=seed * 1_000_003 + index))
+            email = f"user{index}@bench.example.com"
+            self.accounts[email] = (user_id, password)
+            self.store.tables.setdefault("user_profiles", []).append({
+                "id": str(uuid.uuid4()), "user_id": user_id, "first_name": f"Prénom{index}",
+                "last_name": f"Nom{index}", "has_profile": False,
+            })
+            accounts.append((user_id, email))
+        self._versions.update(("entrepreneurs", "entrepreneurs_public", "user_profiles"))
+        return accounts
+
+    def mint_token(self, user_id: str, email: str, ttl: int = 3600) -> str:
+        now = int(time.time())
+        return jwt.encode(
+            {"sub": user_id, "email": email, "aud": self.audience, "role": "authenticated", "iat": now, "exp": now + ttl},
+            self.jwt_secret,
+            algorithm="HS256",
+        )
+
+    # ------------------------------------------------------------------
+    # Dispatch
+
+    def handle(self, service: str, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.requests[service] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        # Les corps téléversés sont lus par morceaux dans _storage, sans copie complète
+        if service != "storage":
+            request.read()
+        path = request.url.path
+        if request.method == "HEAD" or path.rstrip("/") in ("/rest/v1", "/storage/v1", "/auth/v1/health"):
+            return httpx.Response(200, json={})
+        try:
+            if service == "postgrest":
+                return self._postgrest(request, path[len("/rest/v1/"):])
+            if service == "auth":
+                return self._auth(request, path[len("/auth/v1/"):])
+            if service == "storage":
+                return self._storage(request, path[len("/storage/v1/"):])
+        except Exception as e:
+            return httpx.Response(500, json={"message": f"fake supabase: {type(e).__name__}: {e}"})
+        return httpx.Response(404, json={"message": f"unknown service {service}"})
+
+    # ------------------------------------------------------------------
+    # PostgREST
+
+    def _table(self, name: str) -> List[Dict[str, Any]]:
+        return self.store.tables.setdefault(name, [])
+
+    def _sorted_rows(self, table: str, order: Optional[str]) -> List[Dict[str, Any]]:
+        if not order:
+            return self._table(table)
+        version = self._versions[table]
+        cached = self._sorted.get((table, order))
+        if cached is None or cached[0] != version:
+            cached = (version, _sort(self._table(table), order))
+            self._sorted[(table, order)] = cached
+        return cached[1]
+
+    def _index(self, table: str, column: str) -> Dict[Any, List[Dict[str, Any]]]:
+        version = self._versions[table]
+        cached = self._indexes.get((table, column))
+        if cached is None or cached[0] != version:
+            index: Dict[Any, List[Dict[str, Any]]] = {}
+            for row in self._table(table):
+                index.setdefault(row.get(column), []).append(row)
+            cached = (version, index)
+            self._indexes[(table, column)] = cached
+        return cached[1]
+
+    def _matching(self, table: str, params: httpx.QueryParams) -> Iterable[Dict[str, Any]]:
+        predicates: List[Predicate] = []
+        candidates: Optional[List[Dict[str, Any]]] = None
+        for column, expression in params.multi_items():
+            if column in _RESERVED_PARAMS:
+                continue
+            if column in ("or", "and"):
+                predicates.append(_logical(expression, any if column == "or" else all))
+                continue
+            if candidates is None and column in _INDEXED_COLUMNS and expression.startswith("eq."):
+                candidates = self._index(table, column).get(_unquote(expression[3:]), [])
+            predicates.append(_condition(column, expression))
+        rows = candidates if candidates is not None else self._sorted_rows(table, params.get("order"))
+        if candidates is not None and params.get("order"):
+            rows = _sort(rows, params["order"])
+        return (row for row in rows if all(predicate(row) for predicate in predicates))
+
+    def _project(self, rows: List[Dict[str, Any]], select: Optional[str]) -> List[Dict[str, Any]]:
+        if not select or select == "*":
+            return rows
+        columns = [column.strip() for column in select.split(",")]
+        return [{column: row.get(column) for column in columns} for row in rows]
+
+    def _rows_response(self, request: httpx.Request, rows: List[Dict[str, Any]], offset: int = 0) -> httpx.Response:
+        if _OBJECT_MEDIA_TYPE in request.headers.get("accept", ""):
+            if len(rows) != 1:
+                return httpx.Response(406, json={
+                    "code": "PGRST116",
+                    "details": f"The result contains {len(rows)} rows",
+                    "hint": None,
+                    "message": "JSON object requested, multiple (or no) rows returned",
+                })
+            return httpx.Response(200, json=rows[0])
+        content_range = f"{offset}-{offset + len(rows) - 1}/*" if rows else "*/*"
+        return httpx.Response(200, json=rows, headers={"content-range": content_range})
+
+    def _postgrest(self, request: httpx.Request, path: str) -> httpx.Response:
+        if path.startswith("rpc/"):
+            handler = self.store.rpc_handlers.get(path[4:])
+            if handler is None:
+                return httpx.Response(404, json={"code": "PGRST202", "message": f"Could not find the function public.{path[4:]}"})
+            params = json.loads(request.content) if request.content else {}
+            data = handler(params)
+            if path[4:] in _WRITE_RPCS:
+                with self._lock:
+                    self._versions.update(("entrepreneurs", "entrepreneurs_public", "user_profiles", "entrepreneur_views"))
+            return httpx.Response(200, json=data)
+
+        table, params = path, request.url.params
+        if request.method == "GET":
+            offset = int(params.get("offset", 0))
+            limit = int(params["limit"]) if "limit" in params else None
+            rows = list(islice(self._matching(table, params), offset, offset + limit if limit is not None else None))
+            return self._rows_response(request, self._project(rows, params.get("select")), offset)
+
+        with self._lock:
+            if request.method == "POST":
+                body = json.loads(request.content)
+                rows = body if isinstance(body, list) else [body]
+                prefer = request.headers.get("prefer", "")
+                if "resolution=merge-duplicates" in prefer:
+                    written = [self._upsert(table, row, params.get("on_conflict", "id")) for row in rows]
+                elif "resolution=ignore-duplicates" in prefer:
+                    key = params.get("on_conflict") or "id"
+                    existing = {stored.get(key) for stored in self._table(table)}
+                    written = [self._insert(table, row) for row in rows if row.get(key) not in existing]
+                else:
+                    written = [self._insert(table, row) for row in rows]
+            elif request.method == "PATCH":
+                changes = json.loads(request.content)
+                written = []
+                for row in list(self._matching(table, params)):
+                    row.update(changes)
+                    written.append(row)
+            elif request.method == "DELETE":
+                written = list(self._matching(table, params))
+                removed = {id(row) for row in written}
+                self._table(table)[:] = [row for row in self._table(table) if id(row) not in removed]
+            else:
+                return httpx.Response(405, json={"message": f"unsupported method {request.method}"})
+            self._versions[table] += 1
+        return self._rows_response(request, written)
+
+    def _insert(self, table: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        now = datetime.now(timezone.utc).isoformat()
+        stored = {"id": str(uuid.uuid4()), "created_at": now, **row}
+        self._table(table).append(stored)
+        return stored
+
+    def _upsert(self, table: str, row: Dict[str, Any], key: str) -> Dict[str, Any]:
+        existing = next((stored for stored in self._table(table) if stored.get(key) == row.get(key)), None)
+        if existing is None:
+            return self._insert(table, row)
+        existing.update(row, updated_at=datetime.now(timezone.utc).isoformat())
+        return existing
+
+    # ------------------------------------------------------------------
+    # GoTrue
+
+    def _user(self, user_id: str, email: str) -> Dict[str, Any]:
+        return {
+            "id": user_id, "aud": self.audience, "role": "authenticated", "email": email,
+            "app_metadata": {"provider": "email"}, "user_metadata": {},
+            "created_at": "2024-01-01T00:00:00+00:00", "email_confirmed_at": "2024-01-01T00:00:00+00:00",
+        }
+
+    def _session(self, email: str) -> Dict[str, Any]:
+        user_id, _ = self.accounts[email]
+        refresh_token = uuid.uuid4().hex
+        with self._lock:
+            self._refresh_tokens[refresh_token] = email
+        return {
+            "access_token": self.mint_token(user_id, email),
+            "token_type": "bearer",
+            "expires_in": 3600,
+            "refresh_token": refresh_token,
+            "user": self._user(user_id, email),
+        }
+
+    def _auth_error(self, status_code: int, code: str, message: str) -> httpx.Response:
+        return httpx.Response(status_code, json={"code": status_code, "error_code": code, "msg": message})
+
+    def _auth(self, request: httpx.Request, path: str) -> httpx.Response:
+        body = json.loads(request.content) if request.content else {}
+        if path == "signup" and request.method == "POST":
+            email = body.get("email", "").lower()
+            if email in self.accounts:
+                return self._auth_error(422, "user_already_exists", "User already registered")
+            user_id = str(uuid.uuid4())
+            with self._lock:
+                self.accounts[email] = (user_id, body.get("password", ""))
+                # Équivalent du trigger handle_new_user
+                metadata = body.get("data") or {}
+                self._table("user_profiles").append({
+                    "id": str(uuid.uuid4()), "user_id": user_id, "first_name": metadata.get("first_name"),
+                    "last_name": metadata.get("last_name"), "has_profile": False,
+                })
+                self._versions["user_profiles"] += 1
+            return httpx.Response(200, json=self._session(email))
+        if path == "token" and request.method == "POST":
+            grant_type = request.url.params.get("grant_type")
+            if grant_type == "password":
+                email = body.get("email", "").lower()
+                account = self.accounts.get(email)
+                if account is None or account[1] != body.get("password"):
+                    return self._auth_error(400, "invalid_credentials", "Invalid login credentials")
+                return httpx.Response(200, json=self._session(email))
+            if grant_type == "refresh_token":
+                with self._lock:
+                    email = self._refresh_tokens.pop(body.get("refresh_token"), None)
+                if email is None:
+                    return self._auth_error(400, "refresh_token_not_found", "Invalid Refresh Token")
+                return httpx.Response(200, json=self._session(email))
+        if path == "user" and request.method == "GET":
+            token = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+            try:
+                claims = jwt.decode(token, self.jwt_secret, algorithms=["HS256"], audience=self.audience)
+            except jwt.InvalidTokenError:
+                return self._auth_error(403, "bad_jwt", "invalid JWT")
+            return httpx.Response(200, json=self._user(claims["sub"], claims.get("email")))
+        if path == "logout":
+            return httpx.Response(204)
+        return self._auth_error(404, "not_found", f"unsupported auth endpoint {request.method} {path}")
+
+    # ------------------------------------------------------------------
+    # Storage
+
+    def _storage(self, request: httpx.Request, path: str) -> httpx.Response:
+        if not path.startswith("object/"):
+            return httpx.Response(404, json={"message": f"unsupported storage endpoint {path}"})
+        key = path[len("object/"):]
+        if request.method in ("POST", "PUT"):
+            size = sum(len(chunk) for chunk in request.stream)
+            with self._lock:
+                self.store.objects[key] = size
+            return httpx.Response(200, json={"Key": key, "Id": str(uuid.uuid4())})
+        if request.method == "DELETE":
+            request.read()
+            prefixes = (json.loads(request.content) if request.content else {}).get("prefixes", [])
+            with self._lock:
+                removed = [prefix for prefix in prefixes if self.store.objects.pop(f"{key}/{prefix}", None) is not None]
+            return httpx.Response(200, json=[{"name": name} for name in removed])
+        return httpx.Response(405, json={"message": f"unsupported method {request.method}"})
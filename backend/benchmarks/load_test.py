@@ -0,0 +1,332 @@
+"""
+Load test of server:app against an in-process fake Supabase
+
+Starts the application (startup and shutdown events included) behind an
+in-process ASGI transport, with the real supabase-py clients talking HTTP to
+fake_supabase.FakeSupabase (PostgREST, GoTrue and Storage; --latency seconds
+per upstream request). Seeds --entrepreneurs profiles and --users accounts,
+then --concurrency virtual users run the weighted actions of --mix for
+--duration seconds; requests sent during the first --warmup seconds are not
+recorded.
+
+Reports requests, errors, RPS and p50/p95/p99 per action and overall, plus
+upstream requests per Supabase service, as JSON (stdout, and --output).
+--compare prints the RPS / p95 change of each action against a previous
+report and exits non-zero when a p95 grew by more than --max-regression
+percent.
+
+Latencies include the client side of the in-process transport: compare
+reports produced on the same machine with the same options.
+
+Usage (from backend/):
+    python -m benchmarks.load_test --mix browse --concurrency 50 --duration 20 --output /tmp/before.json
+    python -m benchmarks.load_test --mix browse --concurrency 50 --duration 20 --compare /tmp/before.json
+    python -m benchmarks.load_test --mix "list=3,profile=1" --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import struct
+import subprocess
+import sys
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.fake_supabase import COUNTRIES, TAGS, summarize
+
+import httpx
+
+# Une action envoie une requête d'un utilisateur virtuel
+Action = Callable[[httpx.AsyncClient, "LoadContext", random.Random], Awaitable[httpx.Response]]
+
+MIXES: Dict[str, Dict[str, int]] = {
+    "browse": {"list": 35, "search": 15, "facets": 10, "profile": 30, "contact": 5, "stats": 5},
+    "auth": {"login": 30, "me": 70},
+    "upload": {"upload": 100},
+    "mixed": {"list": 25, "search": 10, "facets": 5, "profile": 25, "contact": 5, "stats": 5, "login": 5, "me": 15, "draft": 3, "upload": 2},
+}
+
+
+@dataclass
+class LoadContext:
+    profile_ids: List[str]
+    accounts: List[Tuple[str, str]]
+    tokens: List[str]
+    password: str
+    logo: bytes = b""
+    search_terms: List[str] = field(default_factory=list)
+
+    def auth_headers(self, rng: random.Random) -> Dict[str, str]:
+        return {"Authorization": f"Bearer {rng.choice(self.tokens)}"}
+
+
+def _png(width: int, height: int, rng: random.Random) -> bytes:
+    """Valid RGB PNG with noisy pixels (decodable by the logo pipeline)"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    raw = b"".join(b"\x00" + rng.randbytes(width * 3) for _ in range(height))
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+async def _list(client, ctx, rng):
+    params: Dict[str, Any] = {"limit": 20, "offset": rng.randrange(10) * 20}
+    if rng.random() < 0.3:
+        params["country_code"] = rng.choice(COUNTRIES)
+    if rng.random() < 0.2:
+        params["tags"] = rng.choice(TAGS)
+    return await client.get("/api/entrepreneurs", params=params)
+
+
+async def _search(client, ctx, rng):
+    return await client.get("/api/entrepreneurs", params={"search": rng.choice(ctx.search_terms), "limit": 20})
+
+
+async def _facets(client, ctx, rng):
+    params = {"country_code": rng.choice(COUNTRIES)} if rng.random() < 0.5 else {}
+    return await client.get("/api/entrepreneurs/facets", params=params)
+
+
+async def _profile(client, ctx, rng):
+    return await client.get(f"/api/entrepreneurs/{rng.choice(ctx.profile_ids)}")
+
+
+async def _contact(client, ctx, rng):
+    return await client.get(f"/api/entrepreneurs/{rng.choice(ctx.profile_ids)}/contact")
+
+
+async def _stats(client, ctx, rng):
+    return await client.get("/api/stats")
+
+
+async def _login(client, ctx, rng):
+    _, email = rng.choice(ctx.accounts)
+    return await client.post("/api/auth/login", json={"email": email, "password": ctx.password})
+
+
+async def _me(client, ctx, rng):
+    return await client.get("/api/auth/me", headers=ctx.auth_headers(rng))
+
+
+async def _draft(client, ctx, rng):
+    payload = {"form_data": {"company_name": f"Société {rng.randrange(1000)}", "tags": rng.sample(TAGS, 2)}, "current_step": rng.randint(1, 4)}
+    return await client.put("/api/entrepreneurs/me/draft", json=payload, headers=ctx.auth_headers(rng))
+
+
+async def _upload(client, ctx, rng):
+    return await client.post("/api/storage/upload-logo", files={"file": ("logo.png", ctx.logo, "image/png")}, headers=ctx.auth_headers(rng))
+
+
+ACTIONS: Dict[str, Tuple[str, Action]] = {
+    "list": ("GET /api/entrepreneurs", _list),
+    "search": ("GET /api/entrepreneurs?search", _search),
+    "facets": ("GET /api/entrepreneurs/facets", _facets),
+    "profile": ("GET /api/entrepreneurs/{entrepreneur_id}", _profile),
+    "contact": ("GET /api/entrepreneurs/{entrepreneur_id}/contact", _contact),
+    "stats": ("GET /api/stats", _stats),
+    "login": ("POST /api/auth/login", _login),
+    "me": ("GET /api/auth/me", _me),
+    "draft": ("PUT /api/entrepreneurs/me/draft", _draft),
+    "upload": ("POST /api/storage/upload-logo", _upload),
+}
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    """Named mix or `action=weight,...`"""
+    if value in MIXES:
+        return MIXES[value]
+    weights = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in ACTIONS:
+            raise argparse.ArgumentTypeError(f"unknown action {name!r} (known: {', '.join(ACTIONS)})")
+        weights[name] = int(weight or 1)
+    return weights
+
+
+def _git_revision() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True, text=True, check=True).stdout.strip())
+        return {"commit": commit, "dirty": dirty}
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+
+
+async def _virtual_user(client, ctx, mix, rng, warmup_end, deadline, samples, errors) -> None:
+    names, weights = list(mix), list(mix.values())
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await ACTIONS[name][1](client, ctx, rng)
+            failed = response.status_code >= 400
+        except Exception:
+            failed = True
+        if started >= warmup_end:
+            samples[name].append(time.perf_counter() - started)
+            errors[name] += failed
+
+
+async def run_load(app, fake, ctx: LoadContext, mix: Dict[str, int], concurrency: int, duration: float, warmup: float, seed: int) -> Dict[str, Any]:
+    samples: Dict[str, List[float]] = {name: [] for name in mix}
+    errors: Dict[str, int] = {name: 0 for name in mix}
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            started = time.perf_counter()
+            warmup_end, deadline = started + warmup, started + warmup + duration
+            baseline: Dict[str, int] = {}
+
+            async def snapshot_upstream() -> None:
+                await asyncio.sleep(warmup)
+                baseline.update(fake.requests)
+
+            snapshot = asyncio.ensure_future(snapshot_upstream())
+            await asyncio.gather(*(
+                _virtual_user(client, ctx, mix, random.Random(seed + index), warmup_end, deadline, samples, errors)
+                for index in range(concurrency)
+            ))
+            await snapshot
+            # Les derniers utilisateurs virtuels finissent leur requête après l'échéance
+            elapsed = max(time.perf_counter(), deadline) - warmup_end
+    finally:
+        await app.router.shutdown()
+
+    actions = {}
+    for name in mix:
+        actions[name] = {
+            "route": ACTIONS[name][0],
+            "requests": len(samples[name]),
+            "errors": errors[name],
+            "rps": round(len(samples[name]) / elapsed, 1),
+            **{key: value for key, value in summarize(samples[name]).items() if key != "count"},
+        }
+    everything = [sample for values in samples.values() for sample in values]
+    totals = {
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "rps": round(len(everything) / elapsed, 1),
+        **{key: value for key, value in summarize(everything).items() if key != "count"},
+    }
+    upstream = {service: count - baseline.get(service, 0) for service, count in sorted(fake.requests.items())}
+    return {"measured_s": round(elapsed, 2), "totals": totals, "actions": actions, "upstream_requests": upstream}
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], max_regression: Optional[float]) -> bool:
+    """Print RPS / p95 changes per action; False when a p95 regressed beyond max_regression (%)"""
+    def change(new: float, old: float) -> float:
+        return (new - old) / old * 100 if old else 0.0
+
+    ok = True
+    print(f"Baseline {baseline['meta'].get('commit')} -> {report['meta'].get('commit')}", file=sys.stderr)
+    print(f"{'action':<10} {'rps':>9} {'Δrps':>8} {'p95 ms':>9} {'Δp95':>8}", file=sys.stderr)
+    rows = [(name, stats, baseline["actions"].get(name)) for name, stats in report["actions"].items()]
+    rows.append(("TOTAL", report["totals"], baseline["totals"]))
+    for name, stats, old in rows:
+        if old is None:
+            print(f"{name:<10} {stats['rps']:>9} {'new':>8} {stats['p95_ms']:>9} {'new':>8}", file=sys.stderr)
+            continue
+        p95_change = change(stats["p95_ms"], old["p95_ms"])
+        flag = ""
+        if max_regression is not None and p95_change > max_regression:
+            ok = False
+            flag = "  REGRESSION"
+        print(f"{name:<10} {stats['rps']:>9} {change(stats['rps'], old['rps']):>+7.1f}% {stats['p95_ms']:>9} {p95_change:>+7.1f}%{flag}", file=sys.stderr)
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--mix", type=parse_mix, default="mixed", help=f"{', '.join(MIXES)} or action=weight,... (actions: {', '.join(ACTIONS)})")
+    parser.add_argument("--concurrency", type=int, default=50, help="virtual users")
+    parser.add_argument("--duration", type=float, default=15.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=3.0, help="unrecorded seconds before the measurement")
+    parser.add_argument("--latency", type=float, default=0.01, help="injected latency per upstream request (s)")
+    parser.add_argument("--entrepreneurs", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--auth-mode", choices=("local", "remote"), default=None, help="AUTH_VERIFICATION_MODE (default: configured value)")
+    parser.add_argument("--no-response-cache", action="store_true", help="RESPONSE_CACHE_BACKEND=none")
+    parser.add_argument("--directory-snapshot", action="store_true", help="DIRECTORY_SNAPSHOT_ENABLED=true")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--compare", help="previous JSON report to compare with")
+    parser.add_argument("--max-regression", type=float, default=None, help="with --compare: fail if a p95 grew by more than this percentage")
+    args = parser.parse_args()
+    mix = args.mix
+
+    # Réglages lus à l'import des modules du backend : à fixer avant d'importer server
+    # Un seul client simulé : les limites par client fausseraient la mesure
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    if args.auth_mode:
+        os.environ["AUTH_VERIFICATION_MODE"] = args.auth_mode
+    if args.no_response_cache:
+        os.environ["RESPONSE_CACHE_BACKEND"] = "none"
+    if args.directory_snapshot:
+        os.environ["DIRECTORY_SNAPSHOT_ENABLED"] = "true"
+
+    from benchmarks.fake_supabase import FakeSupabase
+    from config import get_settings
+
+    settings = get_settings()
+    fake = FakeSupabase(latency=args.latency, jwt_secret=settings.SUPABASE_JWT_SECRET, audience=settings.SUPABASE_JWT_AUDIENCE)
+    password = "benchmark-password"
+    accounts = fake.seed(args.entrepreneurs, args.users, args.seed, password)
+    fake.install()
+
+    from server import app
+
+    rng = random.Random(args.seed)
+    published = fake.store.tables["entrepreneurs_public"]
+    ctx = LoadContext(
+        profile_ids=[row["id"] for row in published],
+        accounts=accounts,
+        tokens=[fake.mint_token(user_id, email) for user_id, email in accounts],
+        password=password,
+        logo=_png(256, 256, rng) if "upload" in mix else b"",
+        search_terms=[f"Société {rng.randrange(args.entrepreneurs)}" for _ in range(50)] + [f"Activité {index}" for index in range(50)],
+    )
+
+    results = asyncio.run(run_load(app, fake, ctx, mix, args.concurrency, args.duration, args.warmup, args.seed))
+    report = {
+        "meta": {
+            **_git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "mix": mix,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "latency_s": args.latency,
+            "entrepreneurs": args.entrepreneurs,
+            "published": len(published),
+            "users": args.users,
+            "seed": args.seed,
+            "auth_mode": settings.AUTH_VERIFICATION_MODE,
+            "response_cache": settings.RESPONSE_CACHE_BACKEND,
+            "directory_snapshot": settings.DIRECTORY_SNAPSHOT_ENABLED,
+        },
+        **results,
+    }
+    body = json.dumps(report, indent=2, ensure_ascii=False)
+    print(body)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output:
+            output.write(body + "\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as previous:
+            if not compare(report, json.load(previous), args.max_regression):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
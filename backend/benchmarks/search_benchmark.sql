@@ -0,0 +1,80 @@
+-- ==========================================
+-- BENCHMARK: recherche annuaire sur 100k profils
+-- ==========================================
+-- Compare l'ancienne recherche (ILIKE sur cinq colonnes puis filtre IN sur
+-- la vue) avec la RPC search_entrepreneurs (index GIN plein texte + trigramme).
+--
+-- Usage : psql "$POSTGRES_URL_NON_POOLING" -f backend/benchmarks/search_benchmark.sql
+-- Tout s'exécute dans une transaction annulée à la fin : aucune donnée ne reste.
+
+\timing on
+BEGIN;
+
+-- Utilisateurs factices (le trigger on_auth_user_created crée aussi les user_profiles)
+INSERT INTO auth.users (id, email)
+SELECT uuid_generate_v4(), 'bench' || g || '@example.com'
+FROM generate_series(1, 100000) AS g;
+
+INSERT INTO public.entrepreneurs (
+    user_id, profile_type, first_name, last_name, company_name, activity_name,
+    description, tags, phone, whatsapp, email, country_code, city, rating, status
+)
+SELECT
+    u.id,
+    (ARRAY['entreprise', 'freelance', 'pme', 'artisan', 'ONG', 'cabinet', 'organisation', 'autre'])[1 + (n % 8)],
+    'Prénom' || n,
+    'Nom' || n,
+    'Société ' || (n % 20000),
+    (ARRAY['Boulangerie', 'Développement web', 'Couture', 'Transport', 'Comptabilité', 'Menuiserie', 'Photographie', 'Agriculture'])[1 + (n % 8)] || ' ' || (n % 500),
+    (ARRAY['Création de sites internet et applications mobiles',
+           'Fabrication artisanale de meubles en bois massif',
+           'Conseil en gestion financière pour les PME',
+           'Production et vente de produits agricoles biologiques'])[1 + (n % 4)],
+    (ARRAY[ARRAY['web', 'mobile'], ARRAY['bois'], ARRAY['finance', 'conseil'], ARRAY['agriculture']])[1 + (n % 4)],
+    '+22900000000', '+22900000000', u.email,
+    (ARRAY['BJ', 'CI', 'SN', 'TG', 'CM', 'FR'])[1 + (n % 6)],
+    (ARRAY['Cotonou', 'Abidjan', 'Dakar', 'Lomé', 'Douala', 'Paris'])[1 + (n % 6)],
+    round((random() * 5)::numeric, 2),
+    CASE WHEN n % 10 = 0 THEN 'draft' ELSE 'published' END
+FROM (SELECT id, email, row_number() OVER () AS n FROM auth.users WHERE email LIKE 'bench%@example.com') AS u;
+
+ANALYZE public.entrepreneurs;
+
+-- 1. Terme fréquent
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT p.* FROM public.entrepreneurs_public p
+WHERE p.id IN (
+    SELECT id FROM public.entrepreneurs
+    WHERE status = 'published'
+      AND (first_name ILIKE '%meubles%' OR last_name ILIKE '%meubles%' OR company_name ILIKE '%meubles%'
+           OR activity_name ILIKE '%meubles%' OR description ILIKE '%meubles%')
+)
+ORDER BY p.created_at DESC LIMIT 50;
+
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM public.search_entrepreneurs('meubles');
+
+-- 2. Terme rare
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT p.* FROM public.entrepreneurs_public p
+WHERE p.id IN (
+    SELECT id FROM public.entrepreneurs
+    WHERE status = 'published'
+      AND (first_name ILIKE '%Prénom4242%' OR last_name ILIKE '%Prénom4242%' OR company_name ILIKE '%Prénom4242%'
+           OR activity_name ILIKE '%Prénom4242%' OR description ILIKE '%Prénom4242%')
+)
+ORDER BY p.created_at DESC LIMIT 50;
+
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM public.search_entrepreneurs('Prénom4242');
+
+-- 3. Faute de frappe (uniquement trouvée par l'index trigramme)
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM public.search_entrepreneurs('menuserie', filter_country_code => 'BJ');
+
+-- 4. Recherche + filtres + tri par note, page profonde
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM public.search_entrepreneurs('finance', filter_country_code => 'SN', filter_tags => ARRAY['conseil'],
+                                          sort_by => 'rating', page_offset => 500);
+
+ROLLBACK;
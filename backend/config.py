@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 
 class Settings(BaseSettings):
@@ -11,6 +11,159 @@ class Settings(BaseSettings):
     SUPABASE_ANON_KEY: str
     SUPABASE_SERVICE_ROLE_KEY: str
     
+    # Auth - vérification des JWT
+    # "remote" : chaque jeton est validé par GoTrue (auth.get_user)
+    # "local" : signature, expiration et audience vérifiées en process,
+    #           repli sur GoTrue uniquement si la vérification est non concluante
+    AUTH_VERIFICATION_MODE: str = "remote"
+    SUPABASE_JWT_SECRET: Optional[str] = None
+    SUPABASE_JWKS_URL: Optional[str] = None
+    SUPABASE_JWT_AUDIENCE: str = "authenticated"
+    JWKS_CACHE_TTL_SECONDS: int = 600
+    
+    # Cache des profils utilisateurs (get_current_user) - 0 pour désactiver
+    USER_CACHE_SIZE: int = 10000
+    USER_CACHE_TTL_SECONDS: int = 60
+    
+    # Appels Supabase bloquants exécutés hors de la boucle d'événements
+    # (nombre max d'appels simultanés ; 0 = exécution directe sur la boucle)
+    SUPABASE_THREADPOOL_SIZE: int = 64
+    
+    # Coalescence des lectures identiques simultanées vers PostgREST (single-flight)
+    SINGLE_FLIGHT_ENABLED: bool = True
+    
+    # Pools de connexions HTTP vers PostgREST / Storage / GoTrue
+    SUPABASE_HTTP2: bool = True
+    SUPABASE_HTTP_MAX_CONNECTIONS: int = 100
+    SUPABASE_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+    SUPABASE_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    SUPABASE_HTTP_PREWARM: bool = True
+    SUPABASE_POSTGREST_TIMEOUT: float = 10.0
+    SUPABASE_STORAGE_TIMEOUT: float = 30.0
+    SUPABASE_AUTH_TIMEOUT: float = 10.0
+    
+    # Disjoncteur par service Supabase (postgrest, auth, storage) : ouvert après N échecs consécutifs
+    # (connexion, délai dépassé, 5xx), appels refusés en 503 pendant SUPABASE_BREAKER_RESET_SECONDS,
+    # puis SUPABASE_BREAKER_HALF_OPEN_PROBES appel(s) d'essai avant de se refermer
+    SUPABASE_BREAKER_ENABLED: bool = True
+    SUPABASE_BREAKER_FAILURE_THRESHOLD: int = 5
+    SUPABASE_BREAKER_RESET_SECONDS: float = 30.0
+    SUPABASE_BREAKER_HALF_OPEN_PROBES: int = 1
+    
+    # Dernière réponse valide des lectures publiques (liste, fiche, statistiques), servie marquée
+    # périmée quand Supabase est indisponible (0 pour désactiver)
+    STALE_CACHE_SIZE: int = 2048
+    STALE_CACHE_MAX_AGE_SECONDS: int = 86400
+    
+    # Cache des réponses publiques de l'annuaire : memory, redis ou none
+    RESPONSE_CACHE_BACKEND: str = "memory"
+    RESPONSE_CACHE_URL: Optional[str] = None
+    RESPONSE_CACHE_SIZE: int = 2048
+    RESPONSE_CACHE_TTL_SECONDS: int = 30
+    
+    # En-têtes HTTP de cache (ETag + Cache-Control) des lectures publiques
+    PUBLIC_CACHE_MAX_AGE_SECONDS: int = 30
+    PUBLIC_CACHE_STALE_WHILE_REVALIDATE_SECONDS: int = 120
+    
+    # Instantané des statistiques globales (RPC get_platform_stats)
+    STATS_REFRESH_SECONDS: int = 60
+    
+    # Annuaire publié en mémoire (entrepreneurs_public) : filtres et tris de la liste servis sans PostgREST.
+    # Sondage des lignes modifiées (updated_at) et rechargement complet périodique (suppressions) ;
+    # DIRECTORY_SNAPSHOT_CHECK compare chaque page avec PostgREST (développement / CI)
+    DIRECTORY_SNAPSHOT_ENABLED: bool = False
+    DIRECTORY_SNAPSHOT_POLL_SECONDS: float = 5.0
+    DIRECTORY_SNAPSHOT_RELOAD_SECONDS: float = 300.0
+    DIRECTORY_SNAPSHOT_CHECK: bool = False
+    
+    # Vues des profils (GET /entrepreneurs/{id}) : comptées en mémoire, écrites en lot (RPC
+    # increment_entrepreneur_views) au plus tard VIEW_FLUSH_SECONDS après la première vue en attente ;
+    # les vues répétées d'un même client sur VIEW_DEDUP_SECONDS ne comptent qu'une fois ; à l'arrêt,
+    # l'écriture est retentée pendant au plus VIEW_FLUSH_DRAIN_SECONDS, puis les vues restantes sont
+    # conservées dans VIEW_SPOOL_PATH (SQLite, relatif à backend/) et écrites au démarrage suivant
+    VIEW_COUNTER_ENABLED: bool = True
+    VIEW_FLUSH_SECONDS: float = 10.0
+    VIEW_DEDUP_SECONDS: float = 1800.0
+    VIEW_DEDUP_MAX_ENTRIES: int = 100000
+    VIEW_FLUSH_DRAIN_SECONDS: float = 5.0
+    VIEW_SPOOL_PATH: str = "data/view_counts.sqlite3"
+    
+    # Appels Supabase de chaque requête : en-tête Server-Timing et budget d'appels déclaré par route
+    # avec @call_budget : off, warn (log) ou raise (réponse 500, pour les tests / CI) ; désactivés
+    # sauf configuration explicite (les détails des appels ne sortent pas par défaut)
+    SERVER_TIMING_ENABLED: bool = False
+    CALL_BUDGET_MODE: str = "off"
+    
+    # Limitation de débit par client (seau à jetons) des routes coûteuses ou exposées aux abus.
+    # RATE_LIMIT_RULES : "règle:requêtes/secondes" séparées par des virgules (règle absente = pas de limite) ;
+    # backend memory (par worker) ou redis (partagé, RATE_LIMIT_URL ou à défaut RESPONSE_CACHE_URL).
+    # TRUSTED_PROXY_HOPS : nombre de proxys devant l'API ; 0 (défaut) ignore X-Forwarded-For, que tout client
+    # peut écrire. Derrière un reverse proxy / load balancer qui ajoute l'en-tête, le fixer au nombre de proxys
+    # (1 pour un seul) : l'IP du client est alors lue dans X-Forwarded-For
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_URL: Optional[str] = None
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_RULES: str = (
+        "auth.login:10/60,auth.login_account:5/300,auth.register:5/3600,"
+        "contact.create:5/600,entrepreneurs.search:60/60,entrepreneurs.contact:30/60,"
+        "entrepreneurs.batch:1000/60"
+    )
+    TRUSTED_PROXY_HOPS: int = 0
+    
+    # Contrôle d'admission : requêtes servies simultanément par worker (0 = sans limite) ; au-delà,
+    # attente dans une file bornée puis 503 + Retry-After (file pleine ou délai dépassé)
+    ADMISSION_MAX_CONCURRENT: int = 128
+    ADMISSION_MAX_QUEUE: int = 256
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 2.0
+    
+    # Validation des réponses sérialisées sans Pydantic (développement / CI)
+    RESPONSE_SCHEMA_CHECK: bool = False
+    
+    # Brouillons (autosave) : écriture différée du dernier état après une période calme,
+    # au changement d'étape, ou au plus tard après le délai max (0 = écriture immédiate) ;
+    # à l'arrêt, les écritures en échec sont retentées pendant au plus DRAFT_FLUSH_DRAIN_SECONDS
+    DRAFT_FLUSH_QUIET_SECONDS: float = 2.0
+    DRAFT_FLUSH_MAX_DELAY_SECONDS: float = 15.0
+    DRAFT_FLUSH_DRAIN_SECONDS: float = 5.0
+    DRAFT_MAX_BYTES: int = 64 * 1024
+    
+    # Messages de contact en écriture différée : POST /api/contact valide le message, l'ajoute à une file
+    # SQLite locale (écrite sur disque avant la réponse 202) et un worker l'insère par lots dans
+    # contact_messages (nouvel essai avec backoff exponentiel, file vidée à l'arrêt pendant au plus
+    # CONTACT_QUEUE_DRAIN_SECONDS, le reste est envoyé au redémarrage). Chemin relatif à backend/
+    CONTACT_QUEUE_ENABLED: bool = False
+    CONTACT_QUEUE_PATH: str = "data/contact_queue.sqlite3"
+    CONTACT_QUEUE_BATCH_SIZE: int = 100
+    CONTACT_QUEUE_POLL_SECONDS: float = 5.0
+    CONTACT_QUEUE_MAX_BACKOFF_SECONDS: float = 60.0
+    CONTACT_QUEUE_DRAIN_SECONDS: float = 10.0
+    
+    # Nombre max d'identifiants par requête /api/entrepreneurs/batch, et par requête
+    # /api/entrepreneurs/batch/contacts (coordonnées : chaque identifiant compte pour entrepreneurs.contact ;
+    # la RPC get_entrepreneur_contacts_batch refuse elle aussi plus de 20 identifiants)
+    BATCH_MAX_IDS: int = 200
+    BATCH_CONTACTS_MAX_IDS: int = 20
+    
+    # Téléversement des logos
+    LOGO_MAX_BYTES: int = 5 * 1024 * 1024
+    
+    # Traitement des logos (optionnel, nécessite Pillow) : redimensionnement, recompression, miniatures
+    LOGO_PIPELINE_ENABLED: bool = False
+    LOGO_OUTPUT_FORMAT: str = "webp"
+    LOGO_OUTPUT_QUALITY: int = 80
+    LOGO_MAX_DIMENSION: int = 1024
+    LOGO_THUMBNAIL_SIZES: str = "small:96,medium:320"
+    LOGO_MAX_PIXELS: int = 40_000_000
+    # Processus de traitement (0 = threads du pool) et nombre max de traitements simultanés
+    LOGO_PIPELINE_WORKERS: int = 2
+    LOGO_PIPELINE_MAX_JOBS: int = 4
+    
+    # Métriques Prometheus (/api/metrics), protégées par un jeton Bearer (METRICS_TOKEN) ; sans jeton,
+    # l'endpoint n'est servi qu'avec ENVIRONMENT=development (désactivé sinon)
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+    
     # App
     APP_NAME: str = "Nexus Connect API"
     APP_VERSION: str = "2.0.0"
@@ -19,6 +172,47 @@ class Settings(BaseSettings):
     # CORS
     CORS_ORIGINS: str = "http://localhost:3000,http://127.0.0.1:3000,https://news-azure-ten.vercel.app"
     
+    @property
+    def jwks_url(self) -> str:
+        """JWKS endpoint (explicit setting or the project's GoTrue default)"""
+        if self.SUPABASE_JWKS_URL:
+            return self.SUPABASE_JWKS_URL
+        return f"{self.SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json"
+    
+    @property
+    def server_timing_enabled(self) -> bool:
+        return self.SERVER_TIMING_ENABLED
+    
+    @property
+    def call_budget_mode(self) -> str:
+        return (self.CALL_BUDGET_MODE or "off").lower()
+    
+    @property
+    def metrics_enabled(self) -> bool:
+        """Metrics are public only in development; elsewhere they require METRICS_TOKEN"""
+        return self.METRICS_ENABLED and (bool(self.METRICS_TOKEN) or self.ENVIRONMENT.lower() == "development")
+    
+    @property
+    def rate_limit_rules(self) -> Dict[str, Tuple[int, float]]:
+        """Parse rate limits from 'rule:requests/seconds' pairs"""
+        rules = {}
+        for item in self.RATE_LIMIT_RULES.split(","):
+            if ":" in item and "/" in item:
+                name, limit = item.split(":", 1)
+                requests, seconds = limit.split("/", 1)
+                rules[name.strip()] = (int(requests), float(seconds))
+        return rules
+    
+    @property
+    def logo_thumbnail_sizes(self) -> Dict[str, int]:
+        """Parse thumbnail variants from 'name:pixels' pairs"""
+        sizes = {}
+        for item in self.LOGO_THUMBNAIL_SIZES.split(","):
+            if ":" in item:
+                name, pixels = item.split(":", 1)
+                sizes[name.strip()] = int(pixels)
+        return sizes
+    
     @property
     def cors_origins_list(self) -> List[str]:
         """Parse CORS origins from comma-separated string"""
@@ -0,0 +1,17 @@
+"""
+Test defaults: the settings are read when the backend modules are imported,
+so the environment is filled before any test module imports them
+"""
+import os
+
+import jwt
+
+os.environ.setdefault("SUPABASE_URL", "http://supabase.local")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "test-jwt-secret-test-jwt-secret-test")
+# Clés au format JWT : supabase-py refuse toute autre forme à la création d'un client
+os.environ.setdefault("SUPABASE_ANON_KEY", jwt.encode({"role": "anon", "iss": "supabase"}, os.environ["SUPABASE_JWT_SECRET"]))
+os.environ.setdefault("SUPABASE_SERVICE_ROLE_KEY", jwt.encode({"role": "service_role", "iss": "supabase"}, os.environ["SUPABASE_JWT_SECRET"]))
+# Budgets d'appels vérifiés sur chaque requête des tests (réponse 500 en cas de dépassement)
+os.environ.setdefault("CALL_BUDGET_MODE", "raise")
+# Pas de connexion réseau au démarrage de l'application
+os.environ.setdefault("SUPABASE_HTTP_PREWARM", "false")
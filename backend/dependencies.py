@@ -1,43 +1,80 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from supabase import Client
-from services.supabase_client import get_supabase_admin
-from typing import Dict, Optional
+from config import get_settings
+from services.supabase_client import get_supabase_admin, execute, run_sync
+from services.jwt_verifier import verify_access_token
+from services.cache import get_user_cache
+from typing import Dict, Optional, Tuple
+import jwt
 import logging
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 security = HTTPBearer()
 
 
+def _invalid_token(detail: str = "Invalid authentication token") -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+async def _verify_token(token: str, supabase: Client) -> Tuple[str, Optional[str]]:
+    """
+    Resolve (user_id, email) for an access token
+    In "local" mode the JWT is checked in-process; GoTrue is only called
+    when local verification is inconclusive (or in "remote" mode)
+    """
+    if settings.AUTH_VERIFICATION_MODE == "local":
+        try:
+            claims = await verify_access_token(token)
+        except jwt.InvalidTokenError as e:
+            logger.info(f"Local token verification rejected token: {e}")
+            raise _invalid_token()
+        if claims:
+            return claims['sub'], claims.get('email')
+
+    # Verify token with Supabase
+    user_response = await run_sync(supabase.auth.get_user, token, call_site="dependencies.verify_token")
+
+    if not user_response or not user_response.user:
+        raise _invalid_token()
+
+    return user_response.user.id, user_response.user.email
+
+
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     supabase: Client = Depends(get_supabase_admin)
 ) -> Dict:
     """
     Dependency to get current authenticated user
-    Verifies Supabase JWT token and returns user data
+    Verifies Supabase JWT token (locally or through GoTrue, see
+    AUTH_VERIFICATION_MODE) and returns user data
     """
     try:
-        # Verify token with Supabase
-        user_response = supabase.auth.get_user(credentials.credentials)
+        user_id, email = await _verify_token(credentials.credentials, supabase)
         
-        if not user_response or not user_response.user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid authentication token",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
+        user_cache = get_user_cache()
+        cached_user = user_cache.get(user_id)
+        if cached_user is not None:
+            return dict(cached_user)
         
         # Get user profile from database
-        profile_response = supabase.table('user_profiles')\
-            .select('*')\
-            .eq('user_id', user_response.user.id)\
-            .single()\
-            .execute()
+        profile_response = await execute(
+            supabase.table('user_profiles')
+            .select('*')
+            .eq('user_id', user_id)
+            .single(),
+            call_site="dependencies.current_user"
+        )
         
         if not profile_response.data:
             # Profile should exist (created by trigger), but handle edge case
-            logger.warning(f"User profile not found for user_id: {user_response.user.id}")
+            logger.warning(f"User profile not found for user_id: {user_id}")
             profile_data = {
                 'id': None,
                 'first_name': None,
@@ -48,14 +85,16 @@ async def get_current_user(
             profile_data = profile_response.data
         
         # Return combined user data
-        return {
-            'id': user_response.user.id,
-            'email': user_response.user.email,
+        user = {
+            'id': user_id,
+            'email': email,
             'first_name': profile_data.get('first_name'),
             'last_name': profile_data.get('last_name'),
             'has_profile': profile_data.get('has_profile', False),
             'profile_id': profile_data.get('id')
         }
+        user_cache.set(user_id, user)
+        return dict(user)
         
     except HTTPException:
         raise
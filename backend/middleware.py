@@ -0,0 +1,172 @@
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from typing import Optional
+import asyncio
+import json
+import logging
+import time
+
+from config import get_settings
+from services.call_budget import current_request_calls, route_budget, stop_tracking, track_request_calls
+from services.metrics import ADMISSION_QUEUE_WAIT, ADMISSION_REJECTED, HTTP_REQUEST_DURATION, HTTP_REQUESTS, HTTP_REQUESTS_IN_FLIGHT
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status code and in-flight count of every HTTP request
+    Requests are labelled with their route template (/api/entrepreneurs/{entrepreneur_id}),
+    never the raw path, to keep the number of series bounded
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        HTTP_REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_FLIGHT.dec()
+            # Le routeur FastAPI ajoute la route trouvée au scope ; sinon la requête est regroupée
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - started, method=method, route=route)
+            HTTP_REQUESTS.inc(method=method, route=route, status=str(status_code))
+
+
+class CallBudgetMiddleware:
+    """
+    Counts and times the Supabase calls made while serving each request
+    - server_timing_enabled: Server-Timing header listing every call
+    - call_budget_mode: compares the count with the route's @call_budget;
+      "warn" logs, "raise" answers 500 instead of the response (tests / CI)
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.server_timing = settings.server_timing_enabled
+        self.mode = settings.call_budget_mode
+
+    def _over_budget(self, scope: Scope, count: int):
+        budget = route_budget(scope.get("route"))
+        if self.mode == "off" or budget is None or count <= budget:
+            return None
+        calls = current_request_calls()
+        sites = ", ".join(f"{call.call_site} ({call.target})" for call in calls.calls)
+        route = getattr(scope.get("route"), "path", scope["path"])
+        return f"{scope['method']} {route} made {count} Supabase calls, budget {budget}: {sites}"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        token = track_request_calls()
+        calls = current_request_calls()
+        replaced = False
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal replaced
+            if replaced:
+                return
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                if self.server_timing:
+                    headers.append((b"server-timing", calls.server_timing(time.perf_counter() - started).encode()))
+                    # Lisible par l'API Performance du front (autre origine en développement)
+                    headers.append((b"timing-allow-origin", b"*"))
+                violation = self._over_budget(scope, len(calls))
+                if violation and self.mode == "raise":
+                    # La réponse d'origine est remplacée : le dépassement doit faire échouer le test
+                    replaced = True
+                    body = json.dumps({"detail": violation}).encode()
+                    headers = [h for h in headers if h[0] in (b"server-timing", b"timing-allow-origin")]
+                    headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+                    await send({"type": "http.response.start", "status": 500, "headers": headers})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                if violation:
+                    logger.warning(violation)
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            stop_tracking(token)
+
+
+class AdmissionControlMiddleware:
+    """
+    Caps the requests served at once by this worker: past `max_concurrent`
+    a request waits for a slot in a queue of at most `max_queue`, for at
+    most `queue_timeout` seconds, and is answered 503 + Retry-After when
+    the queue is full or the wait times out, so latency stays bounded
+    Health checks and metrics are never queued
+    """
+
+    EXEMPT_PATHS = ("/health", "/api/health", "/api/metrics")
+
+    def __init__(self, app: ASGIApp, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.app = app
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+
+    async def _reject(self, reason: str, scope: Scope, receive: Receive, send: Send) -> None:
+        ADMISSION_REJECTED.inc(reason=reason)
+        response = JSONResponse(
+            {"detail": "Server busy, please retry later"},
+            status_code=503,
+            headers={"Retry-After": str(max(1, round(self.queue_timeout)))},
+        )
+        await response(scope, receive, send)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        if self._slots is None:
+            # Créé à la première requête, dans la boucle d'événements du serveur
+            self._slots = asyncio.Semaphore(self.max_concurrent)
+
+        if self._slots.locked():
+            if self.waiting >= self.max_queue:
+                await self._reject("queue_full", scope, receive, send)
+                return
+            started = time.perf_counter()
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                await self._reject("timeout", scope, receive, send)
+                return
+            finally:
+                self.waiting -= 1
+                ADMISSION_QUEUE_WAIT.observe(time.perf_counter() - started)
+        else:
+            await self._slots.acquire()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._slots.release()
@@ -1,8 +1,8 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import Dict, Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 
 class MessageResponse(BaseModel):
@@ -28,6 +28,7 @@ class LogoUploadResponse(MessageResponse):
 
     url: str
     filename: str
+    variants: Dict[str, str] = Field(default_factory=dict)
 
 
 class LogoDeleteResponse(MessageResponse):
@@ -44,3 +45,13 @@ class PlatformStatsResponse(BaseModel):
     total_users: int
     total_entrepreneurs: int
     countries_covered: int
+    total_views: int = 0
+
+
+class ProfileViewsResponse(BaseModel):
+    """Nombre de vues d'un profil (écrites + en attente dans ce worker)."""
+
+    model_config = ConfigDict(extra="ignore")
+
+    entrepreneur_id: str
+    views: int
@@ -24,6 +24,16 @@ class ContactMessage(ContactMessageCreate):
     created_at: datetime
 
 
+class ContactMessageAccepted(BaseModel):
+    """Contact message accepted for asynchronous insertion (queued mode)"""
+
+    model_config = ConfigDict(extra="ignore")
+
+    id: str
+    status: Literal["queued"] = "queued"
+    created_at: datetime
+
+
 class StatsResponse(BaseModel):
     """Application statistics schema"""
 
@@ -124,14 +124,52 @@ class EntrepreneurListResponse(BaseModel):
     """Response for entrepreneur list"""
     data: List[EntrepreneurPublic]
     count: int
-    page: int
+    page: Optional[int] = None
     page_size: int
+    next_cursor: Optional[str] = None
+
+
+class EntrepreneurBatchRequest(BaseModel):
+    """Payload for POST /entrepreneurs/batch and /entrepreneurs/batch/contacts"""
+    ids: List[str] = Field(..., min_length=1)
+
+
+class EntrepreneurBatchResponse(BaseModel):
+    """Published profiles in request order, plus the requested ids that were not found"""
+    items: List[EntrepreneurPublic]
+    missing: List[str] = Field(default_factory=list)
+
+
+class EntrepreneurContactBatchItem(EntrepreneurContactInfo):
+    """Contact information of one profile in a batch lookup"""
+    id: str
+
+
+class EntrepreneurContactBatchResponse(BaseModel):
+    """Contacts in request order, plus the requested ids that were not found"""
+    items: List[EntrepreneurContactBatchItem]
+    missing: List[str] = Field(default_factory=list)
+
+
+class EntrepreneurFacetCount(BaseModel):
+    """Number of published profiles for one facet value"""
+    value: str
+    count: int
+
+
+class EntrepreneurFacetsResponse(BaseModel):
+    """Grouped counts used to render the directory filters"""
+    total: int
+    country_code: List[EntrepreneurFacetCount] = Field(default_factory=list)
+    city: List[EntrepreneurFacetCount] = Field(default_factory=list)
+    profile_type: List[EntrepreneurFacetCount] = Field(default_factory=list)
+    tags: List[EntrepreneurFacetCount] = Field(default_factory=list)
 
 
 class EntrepreneurDraftPayload(BaseModel):
     """Payload for saving entrepreneur draft progress"""
     form_data: Dict[str, Any]
-    current_step: int = 1
+    current_step: int = Field(1, ge=1)
 
 
 class EntrepreneurDraftResponse(EntrepreneurDraftPayload):
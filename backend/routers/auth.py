@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
 from models.common import MessageResponse, TokenRefreshResponse
 from models.user import UserCreate, UserLogin, UserResponse, AuthResponse
-from services.supabase_client import get_supabase_admin
+from services.supabase_client import get_supabase_admin, get_supabase_client, execute, run_sync
+from services.call_budget import AUTH_CALLS, call_budget
+from services.rate_limit import enforce_rate_limit, rate_limit
 from dependencies import get_current_user
 from supabase import Client
 import logging
@@ -10,7 +12,8 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
 
-@router.post("/register", response_model=AuthResponse, status_code=status.HTTP_201_CREATED)
+@router.post("/register", response_model=AuthResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("auth.register"))])
+@call_budget(2)
 async def register(
     user_data: UserCreate,
     supabase: Client = Depends(get_supabase_admin)
@@ -23,8 +26,8 @@ async def register(
     - Returns access token and user data
     """
     try:
-        # Register user with Supabase Auth
-        auth_response = supabase.auth.sign_up({
+        # Register user with Supabase Auth (client dédié : la session ne touche pas au client admin partagé)
+        auth_response = await run_sync(get_supabase_client().auth.sign_up, {
             "email": user_data.email,
             "password": user_data.password,
             "options": {
@@ -33,7 +36,7 @@ async def register(
                     "last_name": user_data.last_name
                 }
             }
-        })
+        }, call_site="auth.register")
         
         if not auth_response.user:
             raise HTTPException(
@@ -42,11 +45,13 @@ async def register(
             )
         
         # Check if user profile was created (by trigger)
-        profile_response = supabase.table('user_profiles')\
-            .select('*')\
-            .eq('user_id', auth_response.user.id)\
-            .single()\
-            .execute()
+        profile_response = await execute(
+            supabase.table('user_profiles')
+            .select('*')
+            .eq('user_id', auth_response.user.id)
+            .single(),
+            call_site="auth.register"
+        )
         
         # Return auth response
         return AuthResponse(
@@ -80,9 +85,11 @@ async def register(
         )
 
 
-@router.post("/login", response_model=AuthResponse)
+@router.post("/login", response_model=AuthResponse, dependencies=[Depends(rate_limit("auth.login"))])
+@call_budget(2)
 async def login(
     user_data: UserLogin,
+    request: Request,
     supabase: Client = Depends(get_supabase_admin)
 ):
     """
@@ -90,13 +97,17 @@ async def login(
     
     - Authenticates with Supabase Auth
     - Returns access token and user data
+    - Rate limited per client IP and per account (auth.login, auth.login_account)
     """
     try:
-        # Login with Supabase
-        auth_response = supabase.auth.sign_in_with_password({
+        # Limite par compte : freine le test de mots de passe réparti sur plusieurs adresses
+        await enforce_rate_limit(request, "auth.login_account", identity=user_data.email.lower())
+        
+        # Login with Supabase (client dédié : la session ne touche pas au client admin partagé)
+        auth_response = await run_sync(get_supabase_client().auth.sign_in_with_password, {
             "email": user_data.email,
             "password": user_data.password
-        })
+        }, call_site="auth.login")
         
         if not auth_response.user:
             raise HTTPException(
@@ -105,11 +116,13 @@ async def login(
             )
         
         # Get user profile
-        profile_response = supabase.table('user_profiles')\
-            .select('*')\
-            .eq('user_id', auth_response.user.id)\
-            .single()\
-            .execute()
+        profile_response = await execute(
+            supabase.table('user_profiles')
+            .select('*')
+            .eq('user_id', auth_response.user.id)
+            .single(),
+            call_site="auth.login"
+        )
         
         return AuthResponse(
             access_token=auth_response.session.access_token,
@@ -143,6 +156,7 @@ async def login(
 
 
 @router.get("/me", response_model=UserResponse)
+@call_budget(AUTH_CALLS)
 async def get_me(current_user: dict = Depends(get_current_user)):
     """
     Get current authenticated user
@@ -159,6 +173,7 @@ async def get_me(current_user: dict = Depends(get_current_user)):
 
 
 @router.post("/logout", response_model=MessageResponse)
+@call_budget(AUTH_CALLS)
 async def logout(
     current_user: dict = Depends(get_current_user),
     supabase: Client = Depends(get_supabase_admin)
@@ -179,9 +194,9 @@ async def logout(
 
 
 @router.post("/refresh", response_model=TokenRefreshResponse)
+@call_budget(AUTH_CALLS + 1)
 async def refresh_token(
-    current_user: dict = Depends(get_current_user),
-    supabase: Client = Depends(get_supabase_admin)
+    current_user: dict = Depends(get_current_user)
 ):
     """
     Refresh access token
@@ -191,7 +206,7 @@ async def refresh_token(
     """
     try:
         # Get new session
-        session = supabase.auth.refresh_session()
+        session = await run_sync(get_supabase_client().auth.refresh_session, call_site="auth.refresh")
         
         if not session:
             raise HTTPException(
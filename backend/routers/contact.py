@@ -1,35 +1,34 @@
-from fastapi import APIRouter, HTTPException, Depends, status
-from models.contact import ContactMessageCreate, ContactMessage, StatsResponse
-from services.supabase_client import get_supabase_admin
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
+from typing import Union
+from models.contact import ContactMessageCreate, ContactMessage, ContactMessageAccepted, StatsResponse
+from config import get_settings
+from services.supabase_client import get_supabase_admin, execute
+from services.http_cache import cached_json_response, remember_response, stale_response
+from services.platform_stats import get_platform_stats
+from services.call_budget import call_budget
+from services.rate_limit import rate_limit
+from services.contact_queue import get_contact_queue
 from supabase import Client
 import logging
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 router = APIRouter(prefix="/contact", tags=["Contact"])
 
 
-def _error_message(error) -> str:
-    if not error:
-        return ""
-    if isinstance(error, dict):
-        return str(error.get("message") or error.get("hint") or error)
-    message = getattr(error, "message", None)
-    return str(message or error)
-
-
-def _extract_count(result) -> int:
-    if hasattr(result, "count") and result.count is not None:
-        return result.count
-    data = getattr(result, "data", None)
-    if isinstance(data, list):
-        return len(data)
-    return 0
-
-
-@router.post("", response_model=ContactMessage, status_code=status.HTTP_201_CREATED)
-async def create_contact_message(message_data: ContactMessageCreate, supabase: Client = Depends(get_supabase_admin)):
+@router.post("", response_model=Union[ContactMessage, ContactMessageAccepted], status_code=status.HTTP_201_CREATED, dependencies=[Depends(rate_limit("contact.create"))])
+@call_budget(1)
+async def create_contact_message(message_data: ContactMessageCreate, response: Response, supabase: Client = Depends(get_supabase_admin)):
+    """
+    Store a contact message (201), or with CONTACT_QUEUE_ENABLED spool it
+    locally and answer 202 at once; the queue inserts it in the background
+    """
     try:
-        result = supabase.table('contact_messages').insert(message_data.model_dump()).execute()
+        if settings.CONTACT_QUEUE_ENABLED:
+            row = await get_contact_queue().enqueue(message_data.model_dump())
+            response.status_code = status.HTTP_202_ACCEPTED
+            return ContactMessageAccepted(id=row['id'], created_at=row['created_at'])
+        result = await execute(supabase.table('contact_messages').insert(message_data.model_dump()), call_site="contact.create")
         if not result.data:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to create contact message")
         return ContactMessage.model_validate(result.data[0])
@@ -41,31 +40,27 @@ async def create_contact_message(message_data: ContactMessageCreate, supabase: C
 
 
 @router.get("/stats", response_model=StatsResponse)
-async def get_stats(supabase: Client = Depends(get_supabase_admin)):
+@call_budget(1)
+async def get_stats(request: Request, supabase: Client = Depends(get_supabase_admin)):
     try:
-        # Utilisateurs inscrits = lignes dans user_profiles
-        users_result = supabase.table('user_profiles').select('id', head=True, count='exact').execute()
-        if getattr(users_result, "error", None):
-            logger.warning(f"user count error: {_error_message(users_result.error)}")
-        total_users = _extract_count(users_result)
+        # Même instantané que /api/stats : utilisateurs inscrits, profils publiés et vues écrites
+        platform_stats = await get_platform_stats(supabase)
 
-        # Profils publiés = vue publique (status filtré à 'published')
-        published_result = supabase.table('entrepreneurs_public').select('id', head=True, count='exact').execute()
-        if getattr(published_result, "error", None):
-            message = _error_message(published_result.error)
-            logger.error(f"Entrepreneur count error: {message}")
-            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to retrieve entrepreneur statistics.")
-
-        total_profiles = _extract_count(published_result)
-
-        return StatsResponse(
-            total_users=total_users,
-            total_profiles=total_profiles,
-            total_views=0,
+        stats = StatsResponse(
+            total_users=platform_stats['total_users'],
+            total_profiles=platform_stats['total_published'],
+            total_views=platform_stats['total_views'],
             total_problems=0
         )
-    except HTTPException:
-        raise
+        body = stats.model_dump_json().encode()
+        remember_response(request, body)
+        return cached_json_response(request, body)
     except Exception as e:
+        # Supabase indisponible : derniers chiffres valides, marqués périmés
+        stale = stale_response(request, e)
+        if stale is not None:
+            return stale
+        if isinstance(e, HTTPException):
+            raise
         logger.error(f"Get stats error: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve stats: {str(e)}")
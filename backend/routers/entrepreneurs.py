@@ -1,26 +1,172 @@
-from fastapi import APIRouter, HTTPException, Depends, Query, status
-from typing import List, Optional, Dict, Any
-from datetime import datetime, timezone
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response, status
+from typing import List, Optional, Dict, Any, Union
+from datetime import datetime
+import asyncio
+import base64
+import binascii
+import json
+import uuid
 
 from models.entrepreneur import (
     EntrepreneurCreate,
     EntrepreneurUpdate,
     EntrepreneurPublic,
     EntrepreneurFull,
+    PortfolioItem,
     EntrepreneurContactInfo,
     EntrepreneurStatusUpdate,
     EntrepreneurStatusChange,
+    EntrepreneurListResponse,
+    EntrepreneurBatchRequest,
+    EntrepreneurBatchResponse,
+    EntrepreneurContactBatchItem,
+    EntrepreneurContactBatchResponse,
+    EntrepreneurFacetsResponse,
+    EntrepreneurDraftPayload,
+    EntrepreneurDraftResponse,
 )
-from services.supabase_client import get_supabase_admin
+from config import get_settings
+from services.supabase_client import get_supabase_admin, execute
+from services.cache import invalidate_user
+from services.response_cache import DIRECTORY_TAG, get_response_cache, invalidate_profile, profile_tag
+from services.http_cache import cached_json_response, remember_response, stale_response
+from services.serialization import TrustedRowSerializer, dumps
+from services.draft_buffer import get_draft_buffer
+from services.directory_snapshot import get_directory_snapshot
+from services.view_counter import get_view_counter, viewer_key
+from services.call_budget import AUTH_CALLS, call_budget
+from services.rate_limit import enforce_rate_limit, rate_limit
+from urllib.parse import urlencode
 from dependencies import get_current_user
 from supabase import Client
 import logging
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 router = APIRouter(prefix="/entrepreneurs", tags=["Entrepreneurs"])
 
 LOCKED_FIELDS = {"first_name", "last_name", "company_name", "email", "phone"}
 VALID_STATUSES = {"draft", "published", "deactivated"}
+# Colonnes de tri pouvant être NULL (rating) : NULLS LAST quel que soit le sens
+NULLABLE_SORT_FIELDS = {"rating"}
+
+# Lectures publiques : lignes PostgREST mises en forme une fois puis encodées directement (sans model_validate)
+_PUBLIC_ROWS = TrustedRowSerializer(
+    EntrepreneurPublic,
+    defaults={"status": "draft", "tags": []},
+    nested={"portfolio": PortfolioItem.model_fields},
+)
+
+# Identifiants par requête PostgREST in_ (garde l'URL d'une requête sous quelques Ko)
+BATCH_QUERY_CHUNK = 100
+BATCH_QUERY_CALLS = -(-settings.BATCH_MAX_IDS // BATCH_QUERY_CHUNK)
+
+
+def _list_cache_key(country_code: Optional[str], city: Optional[str], profile_type: Optional[str], tags: Optional[str], min_rating: Optional[float], sort_by: str, sort_order: str, limit: int, offset: int, cursor: Optional[str]) -> str:
+    """Cache key of a directory page, built from the normalised query parameters"""
+    params = {
+        "country_code": country_code.upper() if country_code else "",
+        "city": city.strip().lower() if city else "",
+        "profile_type": profile_type or "",
+        "tags": ",".join(sorted(t.strip() for t in tags.split(','))) if tags else "",
+        "min_rating": min_rating or "",
+        "sort": f"{sort_by}.{sort_order}",
+        "page": f"cursor:{cursor}" if cursor is not None else f"{offset}:{limit}",
+        "limit": limit,
+    }
+    return "entrepreneurs:list?" + urlencode(params)
+
+
+def _facets_cache_key(country_code: Optional[str], city: Optional[str], profile_type: Optional[str], tags: Optional[str], min_rating: Optional[float], limit: int) -> str:
+    """Cache key of the facet counts, same normalisation as the directory pages"""
+    params = {
+        "country_code": country_code.upper() if country_code else "",
+        "city": city.strip().lower() if city else "",
+        "profile_type": profile_type or "",
+        "tags": ",".join(sorted(t.strip() for t in tags.split(','))) if tags else "",
+        "min_rating": min_rating or "",
+        "limit": limit,
+    }
+    return "entrepreneurs:facets?" + urlencode(params)
+
+
+def _profile_cache_key(entrepreneur_id: str) -> str:
+    return f"entrepreneurs:{entrepreneur_id}"
+
+
+def _parse_batch_ids(raw_ids: List[str], max_ids: int = settings.BATCH_MAX_IDS) -> List[str]:
+    """Canonical UUIDs in request order without duplicates; accepts comma-separated values"""
+    ids: List[str] = []
+    invalid: List[str] = []
+    for raw in raw_ids:
+        for part in raw.split(","):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                value = str(uuid.UUID(part))
+            except ValueError:
+                invalid.append(part)
+                continue
+            if value not in ids:
+                ids.append(value)
+    if invalid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid ids: {', '.join(invalid[:10])}")
+    if not ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="At least one id is required")
+    if len(ids) > max_ids:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {max_ids} ids per request")
+    return ids
+
+
+async def _batch_profiles(ids: List[str], supabase: Client) -> bytes:
+    """
+    Serialized EntrepreneurBatchResponse for the given ids
+    Profiles come from the per-profile response cache when possible; the
+    others are fetched with one in_ query per chunk and cached in turn
+    """
+    cache = get_response_cache()
+    cached = await cache.get_many([_profile_cache_key(entrepreneur_id) for entrepreneur_id in ids])
+    bodies = {entrepreneur_id: cached[_profile_cache_key(entrepreneur_id)] for entrepreneur_id in ids if _profile_cache_key(entrepreneur_id) in cached}
+    to_fetch = [entrepreneur_id for entrepreneur_id in ids if entrepreneur_id not in bodies]
+    if to_fetch:
+        # Versions lues avant la lecture PostgREST : une invalidation pendant l'appel périme l'entrée écrite
+        versions = await cache.tag_versions([profile_tag(entrepreneur_id) for entrepreneur_id in to_fetch])
+        results = await asyncio.gather(*(
+            execute(supabase.table('entrepreneurs_public').select('*').in_('id', to_fetch[i:i + BATCH_QUERY_CHUNK]), call_site="entrepreneurs.batch")
+            for i in range(0, len(to_fetch), BATCH_QUERY_CHUNK)
+        ))
+        for result in results:
+            for profile in _PUBLIC_ROWS.shape_many(result.data or []):
+                entrepreneur_id = str(profile['id'])
+                body = dumps(profile)
+                bodies[entrepreneur_id] = body
+                tag = profile_tag(entrepreneur_id)
+                await cache.set(_profile_cache_key(entrepreneur_id), body, {tag: versions.get(tag, 0)})
+    items = b",".join(bodies[entrepreneur_id] for entrepreneur_id in ids if entrepreneur_id in bodies)
+    missing = [entrepreneur_id for entrepreneur_id in ids if entrepreneur_id not in bodies]
+    # Mêmes octets que GET /entrepreneurs/{id} pour chaque profil, assemblés sans re-sérialisation
+    return b'{"items":[' + items + b'],"missing":' + json.dumps(missing).encode() + b'}'
+
+
+async def _batch_contacts(request: Request, raw_ids: List[str], supabase: Client) -> EntrepreneurContactBatchResponse:
+    """Contact details of published profiles; each requested id takes one entrepreneurs.contact token"""
+    ids = _parse_batch_ids(raw_ids, settings.BATCH_CONTACTS_MAX_IDS)
+    await enforce_rate_limit(request, "entrepreneurs.contact", cost=len(ids))
+    result = await execute(supabase.rpc('get_entrepreneur_contacts_batch', {'entrepreneur_ids': ids}), call_site="entrepreneurs.batch_contacts", coalesce=True)
+    rows = {str(row['id']): row for row in result.data or []}
+    return EntrepreneurContactBatchResponse(
+        items=[EntrepreneurContactBatchItem.model_validate(rows[entrepreneur_id]) for entrepreneur_id in ids if entrepreneur_id in rows],
+        missing=[entrepreneur_id for entrepreneur_id in ids if entrepreneur_id not in rows],
+    )
+
+
+def _rpc_outcome(result) -> Dict[str, Any]:
+    """JSONB result of the transactional profile RPCs ({"status": ..., ...})"""
+    data = result.data
+    if isinstance(data, list):
+        data = data[0] if data else None
+    return data or {}
 
 
 def _sanitize_profile(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
@@ -33,54 +179,162 @@ def _sanitize_profile(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]
     return sanitized
 
 
-@router.get("", response_model=List[EntrepreneurPublic])
-async def list_entrepreneurs(search: Optional[str] = Query(None), country_code: Optional[str] = Query(None), city: Optional[str] = Query(None), profile_type: Optional[str] = Query(None), tags: Optional[str] = Query(None), min_rating: Optional[float] = Query(None, ge=0, le=5), sort_by: str = Query("created_at"), sort_order: str = Query("desc"), limit: int = Query(50, ge=1, le=100), offset: int = Query(0, ge=0), supabase: Client = Depends(get_supabase_admin)):
-    try:
-        query = supabase.table('entrepreneurs_public').select('*')
-        if country_code:
-            query = query.eq('country_code', country_code.upper())
-        if city:
-            query = query.ilike('city', f'%{city}%')
-        if profile_type:
-            query = query.eq('profile_type', profile_type)
-        if min_rating:
-            query = query.gte('rating', min_rating)
-        if tags:
-            tag_list = [t.strip() for t in tags.split(',')]
-            query = query.contains('tags', tag_list)
-        if search:
-            search_query = supabase.table('entrepreneurs') \
-                .select('id') \
-                .eq('status', 'published') \
-                .or_(f"first_name.ilike.%{search}%,last_name.ilike.%{search}%,company_name.ilike.%{search}%,activity_name.ilike.%{search}%,description.ilike.%{search}%") \
-                .execute()
-            if search_query.data:
-                matching_ids = [item['id'] for item in search_query.data]
-                query = query.in_('id', matching_ids)
-            else:
-                return []
-        ascending = (sort_order.lower() == "asc")
+def _encode_cursor(sort_by: str, sort_order: str, row: Dict[str, Any]) -> str:
+    """Opaque cursor holding the (sort key, id) of the last row of a page"""
+    payload = {"s": sort_by, "o": sort_order, "v": row.get(sort_by), "id": row["id"]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort_by: str, sort_order: str) -> Optional[Dict[str, Any]]:
+    """Decode a cursor; an empty cursor starts from the first page"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        if payload["s"] != sort_by or payload["o"] != sort_order:
+            raise ValueError("cursor does not match the requested ordering")
+        # Les valeurs sont injectées dans un filtre PostgREST : on les valide strictement
+        uuid.UUID(payload["id"])
         if sort_by == "rating":
-            query = query.order('rating', desc=not ascending)
+            # Note NULL : dernière page des profils notés dépassée
+            payload["v"] = None if payload["v"] is None else float(payload["v"])
         else:
-            query = query.order('created_at', desc=not ascending)
-        query = query.range(offset, offset + limit - 1)
-        result = query.execute()
-        if not result.data:
-            return []
-        return [
-            EntrepreneurPublic.model_validate(_sanitize_profile(item))
-            for item in result.data
-        ]
+            datetime.fromisoformat(payload["v"])
+        return payload
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Curseur de pagination invalide")
+
+
+def _keyset_filter(column: str, value: Any, last_id: str, ascending: bool, nullable: bool = False) -> str:
+    """
+    PostgREST or-filter for rows strictly after (value, id) in the given
+    order; a nullable column is ordered NULLS LAST in both directions
+    """
+    op = "gt" if ascending else "lt"
+    if value is None:
+        return f'and({column}.is.null,id.{op}.{last_id})'
+    keyset = f'{column}.{op}."{value}",and({column}.eq."{value}",id.{op}.{last_id})'
+    return f'{keyset},{column}.is.null' if nullable else keyset
+
+
+def _facet_params(search: Optional[str], country_code: Optional[str], city: Optional[str], profile_type: Optional[str], tags: Optional[str], min_rating: Optional[float], limit: int) -> Dict[str, Any]:
+    """Arguments of the get_entrepreneur_facets RPC (same filters as search_entrepreneurs)"""
+    return {
+        "search_query": search,
+        "filter_country_code": country_code.upper() if country_code else None,
+        "filter_city": city,
+        "filter_profile_type": profile_type,
+        "filter_tags": [t.strip() for t in tags.split(',')] if tags else None,
+        "filter_min_rating": min_rating or None,
+        "facet_limit": limit,
+    }
+
+
+def _search_params(search: str, country_code: Optional[str], city: Optional[str], profile_type: Optional[str], tags: Optional[str], min_rating: Optional[float], sort_by: str, sort_order: str, limit: int, offset: int) -> Dict[str, Any]:
+    """Arguments of the search_entrepreneurs RPC (filters + ranked full-text search + page)"""
+    return {
+        "search_query": search,
+        "filter_country_code": country_code.upper() if country_code else None,
+        "filter_city": city,
+        "filter_profile_type": profile_type,
+        "filter_tags": [t.strip() for t in tags.split(',')] if tags else None,
+        "filter_min_rating": min_rating or None,
+        "sort_by": sort_by,
+        "sort_ascending": sort_order.lower() == "asc",
+        "page_limit": limit,
+        "page_offset": offset,
+    }
+
+
+def _directory_query(supabase: Client, country_code: Optional[str], city: Optional[str], profile_type: Optional[str], tags: Optional[str], min_rating: Optional[float], sort_by: str, sort_order: str, limit: int, offset: int, after: Optional[Dict[str, Any]]):
+    """PostgREST query of a directory page (filters, total order, keyset or offset page)"""
+    query = supabase.table('entrepreneurs_public').select('*')
+    if country_code:
+        query = query.eq('country_code', country_code.upper())
+    if city:
+        query = query.ilike('city', f'%{city}%')
+    if profile_type:
+        query = query.eq('profile_type', profile_type)
+    if min_rating:
+        query = query.gte('rating', min_rating)
+    if tags:
+        tag_list = [t.strip() for t in tags.split(',')]
+        query = query.contains('tags', tag_list)
+    ascending = (sort_order == "asc")
+    nullable = sort_by in NULLABLE_SORT_FIELDS
+    # id départage les ex aequo : ordre total, requis par le curseur ; profils sans note toujours en dernier
+    query = query.order(sort_by, desc=not ascending, nullsfirst=False if nullable else None).order('id', desc=not ascending)
+    if after:
+        query = query.or_(_keyset_filter(sort_by, after["v"], after["id"], ascending, nullable))
+    return query.range(offset, offset + limit - 1)
+
+
+@router.get("", response_model=Union[List[EntrepreneurPublic], EntrepreneurListResponse])
+@call_budget(1)
+async def list_entrepreneurs(request: Request, search: Optional[str] = Query(None), country_code: Optional[str] = Query(None), city: Optional[str] = Query(None), profile_type: Optional[str] = Query(None), tags: Optional[str] = Query(None), min_rating: Optional[float] = Query(None, ge=0, le=5), sort_by: Optional[str] = Query(None, description="created_at, rating ou relevance (défaut avec search)"), sort_order: str = Query("desc"), limit: int = Query(50, ge=1, le=100), offset: int = Query(0, ge=0), cursor: Optional[str] = Query(None, description="Pagination par curseur (created_at ou rating) : vide pour la première page, puis next_cursor"), supabase: Client = Depends(get_supabase_admin)):
+    try:
+        search = search.strip() if search else None
+        sort_by = sort_by or ("relevance" if search else "created_at")
+        if sort_by not in ("rating", "relevance") or (sort_by == "relevance" and not search):
+            sort_by = "created_at"
+        sort_order = "asc" if sort_order.lower() == "asc" else "desc"
+        if cursor is not None and search:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="La pagination par curseur n'est pas disponible avec la recherche")
+        after = _decode_cursor(cursor, sort_by, sort_order) if cursor is not None else None
+        # Les pages publiques (hors recherche libre) sont servies depuis le cache de réponses
+        cache_key = None
+        if not search:
+            cache_key = _list_cache_key(country_code, city, profile_type, tags, min_rating, sort_by, sort_order, limit, offset, cursor)
+            cached = await get_response_cache().get(cache_key)
+            if cached is not None:
+                return cached_json_response(request, cached)
+            # Versions lues avant la lecture : une invalidation pendant l'appel périme l'entrée écrite
+            versions = await get_response_cache().tag_versions([DIRECTORY_TAG])
+        if search:
+            await enforce_rate_limit(request, "entrepreneurs.search")
+            # Recherche plein texte indexée : filtres, tri et pagination en un seul appel
+            result = await execute(supabase.rpc('search_entrepreneurs', _search_params(search, country_code, city, profile_type, tags, min_rating, sort_by, sort_order, limit, offset)), call_site="entrepreneurs.search", coalesce=True)
+            rows = result.data or []
+        else:
+            rows = None
+            page_offset = offset if cursor is None else 0
+            # Annuaire en mémoire s'il est activé et à jour, PostgREST sinon
+            if settings.DIRECTORY_SNAPSHOT_ENABLED:
+                rows = get_directory_snapshot().page(country_code, city, profile_type, tags, min_rating, sort_by, sort_order, limit, page_offset, after)
+            if rows is None or settings.DIRECTORY_SNAPSHOT_CHECK:
+                result = await execute(_directory_query(supabase, country_code, city, profile_type, tags, min_rating, sort_by, sort_order, limit, page_offset, after), call_site="entrepreneurs.list")
+                if rows is not None:
+                    get_directory_snapshot().verify(rows, result.data or [], str(request.url.query))
+                rows = result.data or []
+        profiles = _PUBLIC_ROWS.shape_many(rows)
+        if cursor is None:
+            body = dumps(profiles)
+        else:
+            next_cursor = _encode_cursor(sort_by, sort_order, rows[-1]) if len(rows) == limit else None
+            # Même forme que EntrepreneurListResponse
+            body = dumps({"data": profiles, "count": len(profiles), "page": None, "page_size": limit, "next_cursor": next_cursor})
+        if cache_key is not None:
+            await get_response_cache().set(cache_key, body, versions)
+        remember_response(request, body)
+        return cached_json_response(request, body)
     except Exception as e:
+        # Supabase indisponible : dernière page valide, marquée périmée
+        stale = stale_response(request, e)
+        if stale is not None:
+            return stale
+        if isinstance(e, HTTPException):
+            raise
         logger.error(f"List entrepreneurs error: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve entrepreneurs: {str(e)}")
 
 
 @router.get("/me", response_model=EntrepreneurFull)
+@call_budget(AUTH_CALLS + 1)
 async def get_my_profile(current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
     try:
-        result = supabase.table('entrepreneurs').select('*').eq('user_id', current_user['id']).single().execute()
+        result = await execute(supabase.table('entrepreneurs').select('*').eq('user_id', current_user['id']).single(), call_site="entrepreneurs.get_me")
         if not result.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entrepreneur profile not found")
 
@@ -93,27 +347,24 @@ async def get_my_profile(current_user: dict = Depends(get_current_user), supabas
 
 
 @router.post("/me", response_model=EntrepreneurFull, status_code=status.HTTP_201_CREATED)
+@call_budget(AUTH_CALLS + 1)
 async def create_my_profile(entrepreneur_data: EntrepreneurCreate, current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
     try:
-        existing = supabase.table('entrepreneurs').select('id').eq('user_id', current_user['id']).execute()
-        if existing.data:
+        payload = entrepreneur_data.model_dump(mode="json", exclude_none=True)
+        # Insertion + user_profiles.has_profile dans une seule transaction (statut draft, first_saved_at = NOW())
+        result = await execute(supabase.rpc('create_entrepreneur_profile', {'p_user_id': current_user['id'], 'p_profile': payload}), call_site="entrepreneurs.create_me")
+        outcome = _rpc_outcome(result)
+        if outcome.get('status') == 'already_exists':
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Vous avez déjà un profil. Utilisez PUT pour le modifier.")
-
-        payload = entrepreneur_data.model_dump(exclude_none=True)
-        payload.update({
-            "user_id": current_user['id'],
-            "status": "draft",
-            "first_saved_at": datetime.now(timezone.utc).isoformat()
-        })
-
-        result = supabase.table('entrepreneurs').insert(payload).execute()
-        if not result.data:
+        if outcome.get('status') != 'created':
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Impossible de créer le profil")
 
-        # Mettre à jour le flag sur user_profiles
-        supabase.table('user_profiles').update({'has_profile': True}).eq('user_id', current_user['id']).execute()
+        profile = outcome['profile']
+        invalidate_user(current_user['id'])
+        get_directory_snapshot().mark_stale()
+        await invalidate_profile(profile.get('id'))
 
-        return EntrepreneurFull.model_validate(_sanitize_profile(result.data[0]))
+        return EntrepreneurFull.model_validate(_sanitize_profile(profile))
     except HTTPException:
         raise
     except Exception as e:
@@ -122,6 +373,7 @@ async def create_my_profile(entrepreneur_data: EntrepreneurCreate, current_user:
 
 
 @router.put("/me", response_model=EntrepreneurFull)
+@call_budget(AUTH_CALLS + 1)
 async def update_my_profile(entrepreneur_data: EntrepreneurUpdate, current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
     try:
         update_payload = entrepreneur_data.model_dump(exclude_none=True)
@@ -134,14 +386,18 @@ async def update_my_profile(entrepreneur_data: EntrepreneurUpdate, current_user:
         if not update_payload:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Aucune donnée à mettre à jour")
 
-        result = supabase.table('entrepreneurs') \
-            .update(update_payload) \
-            .eq('user_id', current_user['id']) \
-            .execute()
+        result = await execute(
+            supabase.table('entrepreneurs')
+            .update(update_payload)
+            .eq('user_id', current_user['id']),
+            call_site="entrepreneurs.update_me"
+        )
 
         if not result.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profil introuvable")
 
+        get_directory_snapshot().mark_stale()
+        await invalidate_profile(result.data[0].get('id'))
         return EntrepreneurFull.model_validate(_sanitize_profile(result.data[0]))
     except HTTPException:
         raise
@@ -150,21 +406,61 @@ async def update_my_profile(entrepreneur_data: EntrepreneurUpdate, current_user:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to update profile: {str(e)}")
 
 
+@router.get("/me/draft", response_model=EntrepreneurDraftResponse)
+@call_budget(AUTH_CALLS + 1)
+async def get_my_draft(current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
+    try:
+        # Un brouillon encore en mémoire (pas encore écrit) est plus récent que celui en base
+        pending = get_draft_buffer().get(current_user['id'])
+        if pending:
+            return EntrepreneurDraftResponse(form_data=pending.form_data, current_step=pending.current_step, updated_at=pending.updated_at)
+        result = await execute(supabase.table('entrepreneur_drafts').select('form_data, current_step, updated_at').eq('user_id', current_user['id']).limit(1), call_site="entrepreneurs.get_draft")
+        if not result.data:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No draft saved")
+        return EntrepreneurDraftResponse.model_validate(result.data[0])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Get draft error: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve draft: {str(e)}")
+
+
+@router.put("/me/draft", response_model=EntrepreneurDraftResponse)
+@call_budget(AUTH_CALLS + 1)
+async def save_my_draft(draft: EntrepreneurDraftPayload, current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
+    try:
+        if len(dumps(draft.form_data)) > settings.DRAFT_MAX_BYTES:
+            raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=f"Draft exceeds {settings.DRAFT_MAX_BYTES // 1024} KB")
+        # Écriture différée : les sauvegardes rapprochées sont fusionnées, seule la dernière est écrite
+        pending = await get_draft_buffer().put(current_user['id'], draft.form_data, draft.current_step, supabase)
+        return EntrepreneurDraftResponse(form_data=pending.form_data, current_step=pending.current_step, updated_at=pending.updated_at)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Save draft error: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to save draft: {str(e)}")
+
+
 @router.patch("/me/status", response_model=EntrepreneurStatusChange)
+@call_budget(AUTH_CALLS + 1)
 async def update_my_status(status_payload: EntrepreneurStatusUpdate, current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
     try:
         target_status = status_payload.status
         if target_status not in VALID_STATUSES:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Statut invalide")
 
-        result = supabase.table('entrepreneurs') \
-            .update({"status": target_status}) \
-            .eq('user_id', current_user['id']) \
-            .execute()
+        result = await execute(
+            supabase.table('entrepreneurs')
+            .update({"status": target_status})
+            .eq('user_id', current_user['id']),
+            call_site="entrepreneurs.set_status"
+        )
 
         if not result.data:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profil introuvable")
 
+        get_directory_snapshot().mark_stale()
+        await invalidate_profile(result.data[0].get('id'))
         message = {
             "draft": "Profil enregistré en brouillon.",
             "published": "Profil publié !",
@@ -180,14 +476,19 @@ async def update_my_status(status_payload: EntrepreneurStatusUpdate, current_use
 
 
 @router.delete("/me", status_code=status.HTTP_204_NO_CONTENT)
+@call_budget(AUTH_CALLS + 1)
 async def delete_my_profile(current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
     try:
-        existing = supabase.table('entrepreneurs').select('id').eq('user_id', current_user['id']).single().execute()
-        if not existing.data:
+        # Suppression + user_profiles.has_profile dans une seule transaction
+        result = await execute(supabase.rpc('delete_entrepreneur_profile', {'p_user_id': current_user['id']}), call_site="entrepreneurs.delete_me")
+        outcome = _rpc_outcome(result)
+        if outcome.get('status') == 'not_found':
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entrepreneur profile not found")
-
-        supabase.table('entrepreneurs').delete().eq('user_id', current_user['id']).execute()
-        supabase.table('user_profiles').update({'has_profile': False}).eq('user_id', current_user['id']).execute()
+        if outcome.get('status') != 'deleted':
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to delete profile")
+        invalidate_user(current_user['id'])
+        get_directory_snapshot().discard(outcome.get('id'))
+        await invalidate_profile(outcome.get('id'))
         return None
     except HTTPException:
         raise
@@ -196,24 +497,132 @@ async def delete_my_profile(current_user: dict = Depends(get_current_user), supa
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to delete profile: {str(e)}")
 
 
-@router.get("/{entrepreneur_id}", response_model=EntrepreneurPublic)
-async def get_entrepreneur(entrepreneur_id: str, supabase: Client = Depends(get_supabase_admin)):
+@router.get("/batch", response_model=EntrepreneurBatchResponse)
+@call_budget(BATCH_QUERY_CALLS)
+async def get_entrepreneurs_batch(request: Request, ids: List[str] = Query(..., description="Profile ids, comma-separated or repeated"), supabase: Client = Depends(get_supabase_admin)):
     try:
-        result = supabase.table('entrepreneurs_public').select('*').eq('id', entrepreneur_id).single().execute()
-        if not result.data:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entrepreneur non trouvé")
-        return EntrepreneurPublic.model_validate(_sanitize_profile(result.data))
+        ids = _parse_batch_ids(ids)
+        await enforce_rate_limit(request, "entrepreneurs.batch", cost=len(ids))
+        body = await _batch_profiles(ids, supabase)
+        return cached_json_response(request, body)
     except HTTPException:
         raise
     except Exception as e:
+        logger.error(f"Batch entrepreneurs error: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve entrepreneurs: {str(e)}")
+
+
+@router.post("/batch", response_model=EntrepreneurBatchResponse)
+@call_budget(BATCH_QUERY_CALLS)
+async def post_entrepreneurs_batch(request: Request, payload: EntrepreneurBatchRequest, supabase: Client = Depends(get_supabase_admin)):
+    try:
+        ids = _parse_batch_ids(payload.ids)
+        await enforce_rate_limit(request, "entrepreneurs.batch", cost=len(ids))
+        body = await _batch_profiles(ids, supabase)
+        return Response(content=body, media_type="application/json")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch entrepreneurs error: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve entrepreneurs: {str(e)}")
+
+
+@router.get("/batch/contacts", response_model=EntrepreneurContactBatchResponse)
+@call_budget(1)
+async def get_entrepreneur_contacts_batch(request: Request, ids: List[str] = Query(..., description="Profile ids, comma-separated or repeated"), supabase: Client = Depends(get_supabase_admin)):
+    try:
+        return await _batch_contacts(request, ids, supabase)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch contacts error: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve contact info: {str(e)}")
+
+
+@router.post("/batch/contacts", response_model=EntrepreneurContactBatchResponse)
+@call_budget(1)
+async def post_entrepreneur_contacts_batch(request: Request, payload: EntrepreneurBatchRequest, supabase: Client = Depends(get_supabase_admin)):
+    try:
+        return await _batch_contacts(request, payload.ids, supabase)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch contacts error: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve contact info: {str(e)}")
+
+
+@router.get("/facets", response_model=EntrepreneurFacetsResponse)
+@call_budget(1)
+async def get_entrepreneur_facets(request: Request, search: Optional[str] = Query(None), country_code: Optional[str] = Query(None), city: Optional[str] = Query(None), profile_type: Optional[str] = Query(None), tags: Optional[str] = Query(None), min_rating: Optional[float] = Query(None, ge=0, le=5), limit: int = Query(50, ge=1, le=200, description="Valeurs max par facette (les plus fréquentes)"), supabase: Client = Depends(get_supabase_admin)):
+    """
+    Published profile counts per country_code, city, profile_type and tag,
+    narrowed by the same filters as the directory list
+    """
+    try:
+        search = search.strip() if search else None
+        # Comme les pages de l'annuaire : mis en cache hors recherche libre, invalidé avec l'annuaire
+        cache_key = None
+        if not search:
+            cache_key = _facets_cache_key(country_code, city, profile_type, tags, min_rating, limit)
+            cached = await get_response_cache().get(cache_key)
+            if cached is not None:
+                return cached_json_response(request, cached)
+            versions = await get_response_cache().tag_versions([DIRECTORY_TAG])
+        else:
+            # Recherche libre non mise en cache : même règle que la liste
+            await enforce_rate_limit(request, "entrepreneurs.search")
+        # Un seul agrégat côté base (RPC get_entrepreneur_facets)
+        result = await execute(supabase.rpc('get_entrepreneur_facets', _facet_params(search, country_code, city, profile_type, tags, min_rating, limit)), call_site="entrepreneurs.facets", coalesce=True)
+        body = EntrepreneurFacetsResponse.model_validate(result.data or {"total": 0}).model_dump_json().encode()
+        if cache_key is not None:
+            await get_response_cache().set(cache_key, body, versions)
+        return cached_json_response(request, body)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Entrepreneur facets error: {str(e)}")
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve facets: {str(e)}")
+
+
+@router.get("/{entrepreneur_id}", response_model=EntrepreneurPublic)
+@call_budget(1)
+async def get_entrepreneur(entrepreneur_id: str, request: Request, supabase: Client = Depends(get_supabase_admin)):
+    try:
+        # Forme canonique de l'id : même clé et même tag que le lot et l'invalidation
+        try:
+            entrepreneur_id = str(uuid.UUID(entrepreneur_id))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entrepreneur non trouvé")
+        cache_key = _profile_cache_key(entrepreneur_id)
+        body = await get_response_cache().get(cache_key)
+        if body is None:
+            versions = await get_response_cache().tag_versions([profile_tag(entrepreneur_id)])
+            result = await execute(supabase.table('entrepreneurs_public').select('*').eq('id', entrepreneur_id).single(), call_site="entrepreneurs.get")
+            if not result.data:
+                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entrepreneur non trouvé")
+            body = dumps(_PUBLIC_ROWS.shape_many([result.data])[0])
+            await get_response_cache().set(cache_key, body, versions)
+            remember_response(request, body)
+        if settings.VIEW_COUNTER_ENABLED:
+            # Vue comptée en mémoire (y compris les réponses 304), écrite en lot par le compteur
+            get_view_counter().record(entrepreneur_id, viewer_key(request), supabase)
+        return cached_json_response(request, body)
+    except Exception as e:
+        # Supabase indisponible : dernière fiche valide, marquée périmée (vue non comptée)
+        stale = stale_response(request, e)
+        if stale is not None:
+            return stale
+        if isinstance(e, HTTPException):
+            raise
         logger.error(f"Get entrepreneur error: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to retrieve entrepreneur: {str(e)}")
 
 
-@router.get("/{entrepreneur_id}/contact", response_model=EntrepreneurContactInfo)
+@router.get("/{entrepreneur_id}/contact", response_model=EntrepreneurContactInfo, dependencies=[Depends(rate_limit("entrepreneurs.contact"))])
+@call_budget(1)
 async def get_entrepreneur_contact(entrepreneur_id: str, supabase: Client = Depends(get_supabase_admin)):
     try:
-        result = supabase.rpc('get_entrepreneur_contacts', {'entrepreneur_id': entrepreneur_id}).execute()
+        result = await execute(supabase.rpc('get_entrepreneur_contacts', {'entrepreneur_id': entrepreneur_id}), call_site="entrepreneurs.contact", coalesce=True)
         if not result.data or len(result.data) == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entrepreneur non trouvé")
         return EntrepreneurContactInfo.model_validate(result.data[0])
@@ -225,15 +634,24 @@ async def get_entrepreneur_contact(entrepreneur_id: str, supabase: Client = Depe
 
 
 @router.delete("/{entrepreneur_id}", status_code=status.HTTP_204_NO_CONTENT)
+@call_budget(AUTH_CALLS + 1)
 async def delete_entrepreneur(entrepreneur_id: str, current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
     try:
-        existing = supabase.table('entrepreneurs').select('user_id').eq('id', entrepreneur_id).single().execute()
-        if not existing.data:
+        try:
+            uuid.UUID(entrepreneur_id)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entrepreneur profile not found")
+        result = await execute(supabase.rpc('delete_entrepreneur_profile', {'p_user_id': current_user['id'], 'p_entrepreneur_id': entrepreneur_id}), call_site="entrepreneurs.delete")
+        outcome = _rpc_outcome(result)
+        if outcome.get('status') == 'not_found':
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Entrepreneur profile not found")
-        if existing.data['user_id'] != current_user['id']:
+        if outcome.get('status') == 'not_owner':
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this profile")
-        supabase.table('entrepreneurs').delete().eq('id', entrepreneur_id).execute()
-        supabase.table('user_profiles').update({'has_profile': False}).eq('user_id', current_user['id']).execute()
+        if outcome.get('status') != 'deleted':
+            raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to delete profile")
+        invalidate_user(current_user['id'])
+        get_directory_snapshot().discard(entrepreneur_id)
+        await invalidate_profile(entrepreneur_id)
         return None
     except HTTPException:
         raise
@@ -1,39 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from supabase import Client
-from models.common import PlatformStatsResponse
-from services.supabase_client import get_supabase_admin
+from models.common import PlatformStatsResponse, ProfileViewsResponse
+from services.supabase_client import get_supabase_admin, execute
+from services.http_cache import cached_json_response, remember_response, stale_response
+from services.platform_stats import get_platform_stats
+from services.call_budget import call_budget
+from services.view_counter import get_view_counter
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/stats", tags=["Statistics"])
 
 
 @router.get("", status_code=status.HTTP_200_OK, response_model=PlatformStatsResponse)
-async def get_global_stats(supabase: Client = Depends(get_supabase_admin)):
+@call_budget(1)
+async def get_global_stats(request: Request, supabase: Client = Depends(get_supabase_admin)):
     """
     Get global statistics for the platform.
     - Total registered users
     - Total entrepreneur profiles
     - Number of countries covered
+    - Total profile views (written by the view counter)
     """
     try:
-        # Note: Supabase-py v2 doesn't have a direct count on auth users.
-        # This is a simplified approach. For an exact user count, a custom function or table might be needed.
-        users_count_res = supabase.table('user_profiles').select('id', count='exact').execute()
-        entrepreneurs_count_res = supabase.table('entrepreneurs').select('id', count='exact').execute()
+        # Agrégat côté serveur (RPC get_platform_stats), partagé avec /api/contact/stats
+        platform_stats = await get_platform_stats(supabase)
 
-        # For countries, we get distinct country codes
-        countries_res = supabase.table('entrepreneurs').select('country_code').execute()
-        countries_count = len(set(item['country_code'] for item in countries_res.data))
-
-        return PlatformStatsResponse(
-            total_users=users_count_res.count or 0,
-            total_entrepreneurs=entrepreneurs_count_res.count or 0,
-            countries_covered=countries_count,
+        stats = PlatformStatsResponse(
+            total_users=platform_stats['total_users'],
+            total_entrepreneurs=platform_stats['total_entrepreneurs'],
+            countries_covered=platform_stats['countries_covered'],
+            total_views=platform_stats['total_views'],
         )
+        body = stats.model_dump_json().encode()
+        remember_response(request, body)
+        return cached_json_response(request, body)
     except Exception as e:
+        # Supabase indisponible : derniers chiffres valides, marqués périmés
+        stale = stale_response(request, e)
+        if stale is not None:
+            return stale
+        if isinstance(e, HTTPException):
+            raise
         logger.error(f"Failed to fetch stats: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Could not fetch platform statistics."
         )
+
+
+@router.get("/entrepreneurs/{entrepreneur_id}", response_model=ProfileViewsResponse)
+@call_budget(1)
+async def get_profile_views(entrepreneur_id: str, supabase: Client = Depends(get_supabase_admin)):
+    """Views of one profile: written count plus the views still pending in this worker"""
+    try:
+        try:
+            entrepreneur_id = str(uuid.UUID(entrepreneur_id))
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid entrepreneur id")
+        result = await execute(supabase.table('entrepreneur_views').select('views').eq('entrepreneur_id', entrepreneur_id).limit(1), call_site="stats.profile_views")
+        written = result.data[0]['views'] if result.data else 0
+        return ProfileViewsResponse(entrepreneur_id=entrepreneur_id, views=written + get_view_counter().pending(entrepreneur_id))
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Failed to fetch profile views: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Could not fetch profile views."
+        )
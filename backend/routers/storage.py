@@ -1,32 +1,89 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, status
-from services.supabase_client import get_supabase_admin
-from models.common import LogoDeleteResponse, LogoUploadResponse, MessageResponse
+from fastapi import APIRouter, HTTPException, Depends, Request, status
+from config import get_settings
+from services.supabase_client import get_supabase_admin, run_sync
+from services.uploads import UploadError, UploadTooLarge, receive_file, sniff_image_type
+from services.image_pipeline import ORIGINAL_VARIANT, ImageProcessingError, pipeline_enabled, process_logo, variant_path, variant_paths
+from models.common import LogoDeleteResponse, LogoUploadResponse
+from services.call_budget import AUTH_CALLS, call_budget
 from dependencies import get_current_user
 from supabase import Client
+import asyncio
 import logging
 import uuid
-from typing import Dict
 
 logger = logging.getLogger(__name__)
+settings = get_settings()
 router = APIRouter(prefix="/storage", tags=["Storage"])
 
+# Noms de fichiers uniques (uuid) : les objets ne changent jamais et peuvent être mis en cache longtemps
+LOGO_CACHE_CONTROL = "31536000"
 
-@router.post("/upload-logo", response_model=LogoUploadResponse)
-async def upload_logo(file: UploadFile = File(...), current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
+# Authentification + un envoi par variante (original et miniatures)
+LOGO_UPLOAD_CALLS = AUTH_CALLS + 1 + len(settings.logo_thumbnail_sizes)
+
+
+LOGO_UPLOAD_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+@router.post("/upload-logo", response_model=LogoUploadResponse, openapi_extra=LOGO_UPLOAD_OPENAPI)
+@call_budget(LOGO_UPLOAD_CALLS)
+async def upload_logo(request: Request, current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
+    received = None
     try:
         allowed_types = ['image/jpeg', 'image/png', 'image/webp', 'image/svg+xml']
-        if file.content_type not in allowed_types:
+        max_size = settings.LOGO_MAX_BYTES
+        # Lecture en flux : la limite est appliquée au fil des morceaux, le fichier est mis en tampon sur disque
+        try:
+            received = await receive_file(request, "file", max_size)
+        except UploadTooLarge:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"File size exceeds {max_size // (1024 * 1024)} MB limit")
+        except UploadError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        # Type réel déterminé par les octets magiques, pas par le Content-Type annoncé
+        detected = sniff_image_type(received.head)
+        if not detected:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid file type. Allowed: {', '.join(allowed_types)}")
-        max_size = 5 * 1024 * 1024
-        contents = await file.read()
-        if len(contents) > max_size:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="File size exceeds 5 MB limit")
-        file_ext = file.filename.split('.')[-1] if '.' in file.filename else 'png'
-        unique_filename = f"{current_user['id']}/{uuid.uuid4()}.{file_ext}"
-        result = supabase.storage.from_('logos').upload(path=unique_filename, file=contents, file_options={"content-type": file.content_type})
+        content_type, file_ext = detected
+        bucket = supabase.storage.from_('logos')
+        base_path = f"{current_user['id']}/{uuid.uuid4()}"
+        # Les SVG (vectoriels) sont stockés tels quels ; les images matricielles passent par le pipeline si activé
+        if pipeline_enabled() and content_type != 'image/svg+xml':
+            try:
+                processed = await process_logo(received.file)
+            except ImageProcessingError as e:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+            paths = {name: variant_path(base_path, name, processed.ext) for name in processed.variants}
+            # Un dictionnaire par envoi : storage3 retire "cache-control" de celui qu'il reçoit
+            await asyncio.gather(*(
+                run_sync(bucket.upload, path=paths[name], file=data, file_options={"content-type": processed.content_type, "cache-control": LOGO_CACHE_CONTROL}, call_site="storage.upload_logo")
+                for name, data in processed.variants.items()
+            ))
+            urls = {name: bucket.get_public_url(path) for name, path in paths.items()}
+            unique_filename = paths.pop(ORIGINAL_VARIANT)
+            return LogoUploadResponse(
+                url=urls.pop(ORIGINAL_VARIANT),
+                filename=unique_filename,
+                variants=urls,
+                message="Logo uploaded successfully"
+            )
+        unique_filename = f"{base_path}.{file_ext}"
+        result = await run_sync(bucket.upload, path=unique_filename, file=received.file, file_options={"content-type": content_type, "cache-control": LOGO_CACHE_CONTROL}, call_site="storage.upload_logo")
         if not result:
             raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Failed to upload file")
-        public_url = supabase.storage.from_('logos').get_public_url(unique_filename)
+        public_url = bucket.get_public_url(unique_filename)
         return LogoUploadResponse(
             url=public_url,
             filename=unique_filename,
@@ -37,14 +94,19 @@ async def upload_logo(file: UploadFile = File(...), current_user: dict = Depends
     except Exception as e:
         logger.error(f"Upload logo error: {str(e)}")
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Failed to upload logo: {str(e)}")
+    finally:
+        if received:
+            received.close()
 
 
 @router.delete("/delete-logo/{filename}", response_model=LogoDeleteResponse)
+@call_budget(AUTH_CALLS + 1)
 async def delete_logo(filename: str, current_user: dict = Depends(get_current_user), supabase: Client = Depends(get_supabase_admin)):
     try:
         if not filename.startswith(f"{current_user['id']}/"):
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to delete this file")
-        result = supabase.storage.from_('logos').remove([filename])
+        # Supprime aussi les miniatures générées par le pipeline (chemins absents ignorés)
+        result = await run_sync(supabase.storage.from_('logos').remove, list(variant_paths(filename)), call_site="storage.delete_logo")
         return LogoDeleteResponse(message="Logo deleted successfully", filename=filename)
     except HTTPException:
         raise
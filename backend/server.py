@@ -1,7 +1,22 @@
 import os
-from fastapi import FastAPI
+import hmac
+from fastapi import FastAPI, HTTPException, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from config import get_settings
+from services.cache import get_user_cache
+from services.response_cache import get_response_cache
+from services.supabase_client import POOLED_SERVICES, get_supabase_admin, prewarm_connections, close_http_pools, run_sync
+from services.circuit_breaker import get_breaker
+from services.http_cache import stale_cache_stats
+from services.image_pipeline import pipeline_enabled, shutdown_image_pipeline
+from services.draft_buffer import get_draft_buffer
+from services.single_flight import get_single_flight
+from services.directory_snapshot import get_directory_snapshot
+from services.view_counter import get_view_counter
+from services.rate_limit import get_rate_limiter
+from services.contact_queue import get_contact_queue
+from services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_metrics
+from middleware import AdmissionControlMiddleware, CallBudgetMiddleware, MetricsMiddleware
 from routers import auth, entrepreneurs, contact, storage, stats
 import logging
 from pathlib import Path
@@ -31,6 +46,16 @@ app = FastAPI(
     openapi_url="/api/openapi.json"
 )
 
+# Contrôle d'admission : ajouté en premier pour rester à l'intérieur de CORS et des métriques
+# (les réponses 503 portent les en-têtes CORS et sont comptées)
+if settings.ADMISSION_MAX_CONCURRENT > 0:
+    app.add_middleware(
+        AdmissionControlMiddleware,
+        max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+        max_queue=settings.ADMISSION_MAX_QUEUE,
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    )
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -40,6 +65,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Appels Supabase par requête : Server-Timing et budget d'appels des routes (développement / tests)
+if settings.server_timing_enabled or settings.call_budget_mode != "off":
+    app.add_middleware(CallBudgetMiddleware)
+
+# Latence / codes de statut par route (exposés sur /api/metrics)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers with /api prefix
 app.include_router(auth.router, prefix="/api")
 app.include_router(entrepreneurs.router, prefix="/api")
@@ -85,10 +118,34 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "version": settings.APP_VERSION
+        "version": settings.APP_VERSION,
+        "caches": {
+            "user_profiles": get_user_cache().stats(),
+            "responses": get_response_cache().stats(),
+            "stale": stale_cache_stats()
+        },
+        "breakers": {service: get_breaker(service).stats() for service in POOLED_SERVICES},
+        "drafts": get_draft_buffer().stats(),
+        "single_flight": get_single_flight().stats(),
+        "directory": get_directory_snapshot().stats(),
+        "views": get_view_counter().stats(),
+        "rate_limit": get_rate_limiter().stats(),
+        "contact_queue": get_contact_queue().stats()
     }
 
 
+@app.get("/api/metrics", include_in_schema=False)
+async def metrics(request: Request):
+    """Prometheus metrics (text exposition format)"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        if not hmac.compare_digest(request.headers.get("authorization", ""), expected):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid metrics token")
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 # Startup event
 @app.on_event("startup")
 async def startup_event():
@@ -96,6 +153,19 @@ async def startup_event():
     logger.info(f"📍 Environment: {settings.ENVIRONMENT}")
     logger.info(f"🔗 Supabase URL: {settings.SUPABASE_URL}")
     logger.info(f"🌐 CORS Origins: {settings.cors_origins_list}")
+    if settings.SUPABASE_HTTP_PREWARM:
+        warmed = await run_sync(prewarm_connections, call_site="startup.prewarm")
+        logger.info(f"🔥 Supabase connections pre-warmed: {warmed}")
+    if settings.METRICS_ENABLED and not settings.metrics_enabled:
+        logger.warning("⚠️ /api/metrics is disabled: METRICS_TOKEN is required outside development")
+    if settings.LOGO_PIPELINE_ENABLED and not pipeline_enabled():
+        logger.warning("⚠️ LOGO_PIPELINE_ENABLED is set but Pillow is not installed; logos are stored unprocessed")
+    if settings.DIRECTORY_SNAPSHOT_ENABLED:
+        await get_directory_snapshot().start(get_supabase_admin())
+    if settings.CONTACT_QUEUE_ENABLED:
+        await get_contact_queue().start(get_supabase_admin())
+    if settings.VIEW_COUNTER_ENABLED:
+        await get_view_counter().restore(get_supabase_admin())
     logger.info("✅ Server started successfully!")
 
 
@@ -103,6 +173,14 @@ async def startup_event():
 @app.on_event("shutdown")
 async def shutdown_event():
     logger.info("👋 Server shutting down...")
+    # Avant la fermeture des pools HTTP : les brouillons, les vues et les messages en attente doivent être écrits
+    await get_draft_buffer().flush_all(settings.DRAFT_FLUSH_DRAIN_SECONDS)
+    await get_view_counter().drain(settings.VIEW_FLUSH_DRAIN_SECONDS)
+    if settings.CONTACT_QUEUE_ENABLED:
+        await get_contact_queue().stop(settings.CONTACT_QUEUE_DRAIN_SECONDS)
+    await get_directory_snapshot().stop()
+    close_http_pools()
+    shutdown_image_pipeline()
 
 
 if __name__ == "__main__":
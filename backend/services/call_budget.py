@@ -0,0 +1,83 @@
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Pire cas de get_current_user : vérification GoTrue (mode remote) + lecture de user_profiles (cache vide)
+AUTH_CALLS = 2
+
+
+@dataclass
+class UpstreamCall:
+    service: str
+    target: str
+    call_site: str
+    duration: float
+
+
+class RequestCalls:
+    """
+    Supabase calls made while serving one request
+    Filled from the worker threads by timed_call (the context, hence this
+    object, is copied into them). A call shared through single-flight is
+    recorded by the request that started it
+    """
+
+    def __init__(self):
+        self.calls: List[UpstreamCall] = []
+
+    def __len__(self) -> int:
+        return len(self.calls)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(call.duration for call in self.calls)
+
+    def server_timing(self, elapsed: float) -> str:
+        """Server-Timing header value: whole request, Supabase total, then one entry per call"""
+        entries = [
+            f"app;dur={elapsed * 1000:.1f}",
+            f'supabase;dur={self.total_seconds * 1000:.1f};desc="{len(self.calls)} calls"',
+        ]
+        for index, call in enumerate(self.calls, 1):
+            entries.append(f'sb{index};dur={call.duration * 1000:.1f};desc="{call.service} {call.target} ({call.call_site})"')
+        return ", ".join(entries)
+
+
+_current: ContextVar[Optional[RequestCalls]] = ContextVar("supabase_request_calls", default=None)
+
+
+def current_request_calls() -> Optional[RequestCalls]:
+    return _current.get()
+
+
+def track_request_calls() -> Any:
+    """Start recording for the current request; returns the token for stop_tracking()"""
+    return _current.set(RequestCalls())
+
+
+def stop_tracking(token: Any) -> None:
+    _current.reset(token)
+
+
+def record_call(service: str, target: str, call_site: str, duration: float) -> None:
+    calls = _current.get()
+    if calls is not None:
+        calls.calls.append(UpstreamCall(service, target, call_site, duration))
+
+
+def call_budget(max_calls: int) -> Callable[[F], F]:
+    """
+    Declare the maximum number of Supabase calls of a route (dependencies
+    included), checked by CallBudgetMiddleware when CALL_BUDGET_MODE is set
+    Place it under the @router decorator
+    """
+    def decorate(endpoint: F) -> F:
+        endpoint.__call_budget__ = max_calls
+        return endpoint
+    return decorate
+
+
+def route_budget(route: Any) -> Optional[int]:
+    return getattr(getattr(route, "endpoint", None), "__call_budget__", None)
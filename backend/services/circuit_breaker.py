@@ -0,0 +1,152 @@
+from functools import lru_cache
+from math import ceil
+from typing import Any, Dict, Optional
+import json
+import logging
+import time
+
+import httpx
+from fastapi import HTTPException, status
+from gotrue.errors import AuthRetryableError
+from postgrest.exceptions import APIError
+from storage3.exceptions import StorageApiError
+
+from config import get_settings
+from services.metrics import SUPABASE_BREAKER_RECOVERY, SUPABASE_BREAKER_REJECTED, SUPABASE_BREAKER_STATE, SUPABASE_BREAKER_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Erreurs PostgREST / PostgreSQL qui signalent une base indisponible ou saturée (pas une requête invalide)
+_POSTGREST_UNAVAILABLE_CODES = {"PGRST000", "PGRST001", "PGRST002", "PGRST003", "57014", "53300", "53400", "57P01", "57P03"}
+
+
+class UpstreamUnavailable(HTTPException):
+    """
+    Raised instead of calling a Supabase service whose breaker is open
+    An HTTPException, so routers (except HTTPException: raise) answer 503
+    with Retry-After instead of a 500
+    """
+
+    def __init__(self, service: str, retry_after: float):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Service temporarily unavailable ({service})",
+            headers={"Retry-After": str(max(1, ceil(retry_after)))},
+        )
+        self.service = service
+
+
+def _status_code(value: Any) -> int:
+    # Statut HTTP (3 chiffres) ; les codes SQLSTATE numériques ("23514") n'en sont pas
+    text = str(value)
+    return int(text) if text.isdigit() and len(text) == 3 else 0
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Whether an error means the service is down or overloaded (timeouts, connection errors, 5xx)"""
+    if isinstance(error, (UpstreamUnavailable, httpx.TransportError, AuthRetryableError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    if isinstance(error, APIError):
+        # Réponse non JSON (passerelle) : code = statut HTTP
+        return _status_code(error.code) >= 500 or str(error.code) in _POSTGREST_UNAVAILABLE_CODES
+    if isinstance(error, StorageApiError):
+        return _status_code(error.status) >= 500
+    # Page d'erreur HTML d'une passerelle à la place du JSON attendu (storage3)
+    return isinstance(error, json.JSONDecodeError)
+
+
+class CircuitBreaker:
+    """
+    Breaker of one Supabase service
+    - closed: calls go through; `failure_threshold` consecutive upstream
+      failures open it
+    - open: calls are rejected (UpstreamUnavailable) for `reset_seconds`
+    - half_open: up to `half_open_probes` concurrent calls probe the
+      service; a success closes the breaker, a failure opens it again
+    Only upstream failures count (is_upstream_failure): a 4xx means the
+    service answered. Used from the event loop only (no lock)
+    """
+
+    def __init__(self, service: str, failure_threshold: int, reset_seconds: float, half_open_probes: int):
+        self.service = service
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.half_open_probes = max(1, half_open_probes)
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        # Début de la panne (premier passage à open), pour mesurer le temps de rétablissement
+        self._outage_started: Optional[float] = None
+        self._probes = 0
+        self.rejected = 0
+        SUPABASE_BREAKER_STATE.inc(0, service=service)
+
+    def _transition(self, state: str) -> None:
+        logger.warning(f"Supabase {self.service} circuit breaker: {self.state} -> {state}")
+        self.state = state
+        SUPABASE_BREAKER_STATE.set(_STATE_VALUES[state], service=self.service)
+        SUPABASE_BREAKER_TRANSITIONS.inc(service=self.service, state=state)
+
+    def _reject(self, retry_after: float) -> None:
+        self.rejected += 1
+        SUPABASE_BREAKER_REJECTED.inc(service=self.service)
+        raise UpstreamUnavailable(self.service, retry_after)
+
+    def acquire(self) -> bool:
+        """Before a call: raises UpstreamUnavailable when it must be shed; returns whether it is a probe"""
+        if self.state == OPEN:
+            remaining = self._opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0:
+                self._reject(remaining)
+            self._transition(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            if self._probes >= self.half_open_probes:
+                self._reject(1)
+            self._probes += 1
+            return True
+        return False
+
+    def release(self, probe: bool, failed: Optional[bool]) -> None:
+        """After a call: failed is None when it was cancelled (no outcome)"""
+        if probe:
+            self._probes -= 1
+        if failed is None:
+            return
+        if failed:
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.failures + 1 >= self.failure_threshold):
+                self._open()
+            elif self.state == CLOSED:
+                self.failures += 1
+            return
+        self.failures = 0
+        if self.state == HALF_OPEN:
+            self._transition(CLOSED)
+            if self._outage_started is not None:
+                SUPABASE_BREAKER_RECOVERY.observe(time.monotonic() - self._outage_started, service=self.service)
+                self._outage_started = None
+
+    def _open(self) -> None:
+        self.failures = 0
+        self._opened_at = time.monotonic()
+        if self._outage_started is None:
+            self._outage_started = self._opened_at
+        self._transition(OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "rejected": self.rejected}
+
+
+@lru_cache(maxsize=None)
+def get_breaker(service: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        service,
+        settings.SUPABASE_BREAKER_FAILURE_THRESHOLD,
+        settings.SUPABASE_BREAKER_RESET_SECONDS,
+        settings.SUPABASE_BREAKER_HALF_OPEN_PROBES,
+    )
@@ -0,0 +1,253 @@
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import uuid
+
+from anyio import to_thread
+from postgrest.types import ReturnMethod
+from supabase import Client
+
+from config import get_settings
+from services.circuit_breaker import is_upstream_failure
+from services.supabase_client import execute
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+class ContactQueue:
+    """
+    Write-behind ingestion of contact messages
+    enqueue() appends the message to a local SQLite spool (committed to
+    disk before it returns; concurrent messages share one commit) and wakes
+    a background worker that upserts the spooled rows into contact_messages
+    in batches of `batch_size`
+
+    Rows carry their own id, so a batch retried after an ambiguous failure
+    is not inserted twice (duplicates ignored). Unavailability (timeouts,
+    5xx, open breaker) is retried with exponential backoff up to
+    `max_backoff`; rows rejected by PostgREST on their own are marked dead
+    and kept in the spool. Rows still spooled at shutdown are sent after
+    the next start
+    """
+
+    def __init__(self, path: Path, batch_size: int, poll_seconds: float, max_backoff: float):
+        self.path = path
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_backoff = max_backoff
+        self._db: Optional[sqlite3.Connection] = None
+        # Connexion partagée entre les threads du pool : un seul accès à la fois
+        self._db_lock = threading.Lock()
+        self._supabase: Optional[Client] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        # Messages en attente d'écriture dans le spool, avec la future de leur requête
+        self._appending: List[Tuple[str, asyncio.Future]] = []
+        self._committer: Optional[asyncio.Future] = None
+        self._failures = 0
+        self.accepted = 0
+        self.written = 0
+        self.retries = 0
+        self.dead = 0
+
+    # ------------------------------------------------------------------
+    # Spool SQLite (appelé dans les threads du pool)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            # WAL + FULL : chaque message est sur disque avant la réponse 202
+            db.execute("PRAGMA synchronous=FULL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS spool ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, dead INTEGER NOT NULL DEFAULT 0)"
+            )
+            self._db = db
+        return self._db
+
+    def _append(self, payloads: List[str]) -> None:
+        with self._db_lock:
+            db = self._connect()
+            db.execute("BEGIN")
+            db.executemany("INSERT INTO spool (payload) VALUES (?)", [(payload,) for payload in payloads])
+            db.execute("COMMIT")
+
+    def _take(self) -> List[Tuple[int, str]]:
+        with self._db_lock:
+            return self._connect().execute(
+                "SELECT seq, payload FROM spool WHERE dead = 0 ORDER BY seq LIMIT ?", (self.batch_size,)
+            ).fetchall()
+
+    def _settle(self, written: List[int], dead: List[int]) -> None:
+        with self._db_lock:
+            db = self._connect()
+            db.execute("BEGIN")
+            db.executemany("DELETE FROM spool WHERE seq = ?", [(seq,) for seq in written])
+            db.executemany("UPDATE spool SET dead = 1 WHERE seq = ?", [(seq,) for seq in dead])
+            db.execute("COMMIT")
+
+    def _counts(self) -> Tuple[int, int]:
+        with self._db_lock:
+            pending, dead = self._connect().execute(
+                "SELECT COUNT(*) - COALESCE(SUM(dead), 0), COALESCE(SUM(dead), 0) FROM spool"
+            ).fetchone()
+        return pending, dead
+
+    def _close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    # ------------------------------------------------------------------
+    # File d'attente
+
+    async def enqueue(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Spool a validated message with a new id and created_at; durable once this returns"""
+        row = {**message, "id": str(uuid.uuid4()), "created_at": datetime.now(timezone.utc).isoformat()}
+        committed = asyncio.get_running_loop().create_future()
+        self._appending.append((json.dumps(row), committed))
+        if self._committer is None or self._committer.done():
+            self._committer = asyncio.ensure_future(self._commit_appending())
+        await committed
+        self.accepted += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+        return row
+
+    async def _commit_appending(self) -> None:
+        # Validation groupée : les messages arrivés pendant une écriture partagent la suivante (un fsync par lot)
+        while self._appending:
+            batch, self._appending = self._appending, []
+            try:
+                await to_thread.run_sync(self._append, [payload for payload, _ in batch])
+            except Exception as e:
+                for _, committed in batch:
+                    if not committed.done():
+                        committed.set_exception(e)
+            else:
+                for _, committed in batch:
+                    if not committed.done():
+                        committed.set_result(None)
+
+    async def _insert(self, payloads: List[Dict[str, Any]]) -> None:
+        query = self._supabase.table('contact_messages').upsert(payloads, ignore_duplicates=True, returning=ReturnMethod.minimal)
+        await execute(query, call_site="contact.queue_flush")
+
+    async def _write_batch(self, rows: List[Tuple[int, str]]) -> None:
+        """Insert one batch; when PostgREST rejects it, rows are sent one by one and the rejected ones marked dead"""
+        try:
+            await self._insert([json.loads(payload) for _, payload in rows])
+        except Exception as e:
+            if is_upstream_failure(e):
+                raise
+        else:
+            await to_thread.run_sync(self._settle, [seq for seq, _ in rows], [])
+            self.written += len(rows)
+            return
+        # Erreur de la requête (contrainte, type invalide) : isoler les lignes en cause, qui échoueraient toujours
+        for seq, payload in rows:
+            try:
+                await self._insert([json.loads(payload)])
+            except Exception as e:
+                if is_upstream_failure(e):
+                    raise
+                logger.error(f"Contact message {seq} rejected, kept in the spool as dead: {e}")
+                await to_thread.run_sync(self._settle, [], [seq])
+                self.dead += 1
+            else:
+                await to_thread.run_sync(self._settle, [seq], [])
+                self.written += 1
+
+    async def flush(self) -> int:
+        """Send every spooled row, batch by batch; returns the number of rows written"""
+        written = self.written
+        while True:
+            rows = await to_thread.run_sync(self._take)
+            if not rows:
+                return self.written - written
+            await self._write_batch(rows)
+
+    def _backoff(self) -> float:
+        # Exponentiel avec gigue, plafonné à max_backoff
+        delay = min(self.max_backoff, 0.5 * 2 ** min(self._failures, 16))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+                self._failures = 0
+            except Exception as e:
+                self._failures += 1
+                self.retries += 1
+                delay = self._backoff()
+                logger.warning(f"Contact queue flush failed, retrying in {delay:.1f}s: {e}")
+                await asyncio.sleep(delay)
+                # Les lignes sont restées dans le spool : nouvel essai immédiat après l'attente
+                self._wakeup.set()
+
+    async def start(self, supabase: Client) -> None:
+        """Open the spool and start the worker; rows left by a previous run are sent first"""
+        self._supabase = supabase
+        self._wakeup = asyncio.Event()
+        pending, dead = await to_thread.run_sync(self._counts)
+        if pending or dead:
+            logger.info(f"Contact queue: {pending} spooled message(s) to send, {dead} dead")
+        if pending:
+            self._wakeup.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float) -> None:
+        """Stop the worker and drain the spool for at most `timeout` seconds; what is left stays on disk"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._supabase is not None:
+            try:
+                await asyncio.wait_for(self.flush(), timeout)
+            except Exception as e:
+                pending, _ = await to_thread.run_sync(self._counts)
+                logger.error(f"Contact queue drain incomplete, {pending} message(s) kept in {self.path}: {e!r}")
+        await to_thread.run_sync(self._close)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None,
+            "accepted": self.accepted,
+            "written": self.written,
+            "retries": self.retries,
+            "dead": self.dead,
+        }
+
+
+@lru_cache()
+def get_contact_queue() -> ContactQueue:
+    path = Path(settings.CONTACT_QUEUE_PATH)
+    return ContactQueue(
+        path if path.is_absolute() else BACKEND_DIR / path,
+        settings.CONTACT_QUEUE_BATCH_SIZE,
+        settings.CONTACT_QUEUE_POLL_SECONDS,
+        settings.CONTACT_QUEUE_MAX_BACKOFF_SECONDS,
+    )
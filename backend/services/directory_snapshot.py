@@ -0,0 +1,394 @@
+from bisect import bisect_left, bisect_right
+from itertools import chain
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import asyncio
+import logging
+import time
+
+from supabase import Client
+
+from config import get_settings
+from services.response_cache import DIRECTORY_TAG, get_response_cache
+from services.supabase_client import execute
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SORT_FIELDS = ("created_at", "rating")
+# Champs indexés (valeur -> identifiants) ; city est stockée en minuscules pour le filtre ILIKE '%…%'
+INDEXED_FIELDS = ("country_code", "city", "profile_type", "tags")
+# Lignes par requête PostgREST (sous la limite max-rows par défaut de Supabase)
+LOAD_PAGE_SIZE = 1000
+# Fenêtre relue à chaque sondage : updated_at vaut le début de la transaction, qui peut valider après le sondage précédent
+WATERMARK_OVERLAP_SECONDS = 30
+# Jokers de ILIKE / PostgREST : un filtre city qui en contient est laissé à PostgREST
+_LIKE_WILDCARDS = frozenset("%_*\\")
+
+SortKey = Tuple[bool, float, str]
+
+
+def _timestamp(value: Any) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return None
+
+
+def _sort_key(value: Optional[float], entrepreneur_id: str) -> SortKey:
+    # NULL après toutes les valeurs dans les deux sens (NULLS LAST de la requête PostgREST) ; id départage
+    return (value is None, value or 0.0, entrepreneur_id)
+
+
+def _after_descending(key: SortKey, cursor_key: SortKey) -> bool:
+    # Ordre décroissant NULLS LAST : tout NULL suit une valeur, sinon clé strictement inférieure
+    if key[0] != cursor_key[0]:
+        return key[0]
+    return key < cursor_key
+
+
+class DirectoryRecord:
+    """One published profile: the entrepreneurs_public row and its filter / sort keys"""
+    __slots__ = ("id", "row", "country_code", "city", "profile_type", "tags", "rating", "updated_at", "created_key", "rating_key")
+
+    def __init__(self, row: Dict[str, Any]):
+        self.id = str(row["id"])
+        self.row = row
+        self.country_code = row.get("country_code")
+        self.city = row["city"].lower() if row.get("city") else None
+        self.profile_type = row.get("profile_type")
+        self.tags = frozenset(row.get("tags") or ())
+        self.rating = float(row["rating"]) if row.get("rating") is not None else None
+        self.updated_at = row.get("updated_at")
+        self.created_key = _sort_key(_timestamp(row.get("created_at")), self.id)
+        self.rating_key = _sort_key(self.rating, self.id)
+
+    def sort_key(self, field: str) -> SortKey:
+        return self.rating_key if field == "rating" else self.created_key
+
+    def postings(self) -> Iterator[Tuple[str, Any]]:
+        for field in ("country_code", "city", "profile_type"):
+            value = getattr(self, field)
+            if value:
+                yield field, value
+        for tag in self.tags:
+            yield "tags", tag
+
+
+class DirectorySnapshot:
+    """
+    Published directory (entrepreneurs_public) held in worker memory, so the
+    filtered and sorted pages of GET /entrepreneurs are answered without a
+    PostgREST call
+
+    Records keep inverted indexes (country_code, city, profile_type, tags)
+    and the created_at / rating orderings, (key, id) sorted like the
+    PostgREST query. Loaded at startup, then every `poll_seconds` the rows
+    whose updated_at moved are re-read (the view for upserts, the table for
+    unpublished ids); deleted rows are only seen by the full reload every
+    `reload_seconds`, except those deleted by this worker (discard())
+
+    page() returns None (caller falls back to PostgREST) until the first
+    load, and after mark_stale() until the next poll has completed
+    """
+
+    def __init__(self, poll_seconds: float, reload_seconds: float):
+        self.poll_seconds = poll_seconds
+        self.reload_seconds = reload_seconds
+        self._records: Dict[str, DirectoryRecord] = {}
+        self._postings: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        self._orders: Dict[str, List[DirectoryRecord]] = {field: [] for field in SORT_FIELDS}
+        self._keys: Dict[str, List[SortKey]] = {field: [] for field in SORT_FIELDS}
+        self._watermark: Optional[float] = None
+        self._loaded_at: Optional[float] = None
+        self._dirty = 0
+        self._synced = 0
+        self._supabase: Optional[Client] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self.served = 0
+        self.fallbacks = 0
+        self.mismatches = 0
+        self.refresh_failures = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._loaded_at is not None and self._synced >= self._dirty
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    # ------------------------------------------------------------------
+    # Requêtes
+
+    def page(self, country_code: Optional[str], city: Optional[str], profile_type: Optional[str], tags: Optional[str], min_rating: Optional[float], sort_by: str, sort_order: str, limit: int, offset: int = 0, after: Optional[Dict[str, Any]] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Rows of a directory page with the filters and order of the PostgREST
+        query in list_entrepreneurs (after: decoded cursor); None when the
+        page must come from PostgREST
+        """
+        if not self.ready or (city and _LIKE_WILDCARDS.intersection(city)):
+            self.fallbacks += 1
+            return None
+        candidates = self._candidates(country_code, city, profile_type, tags)
+        ascending = sort_order == "asc"
+        cursor_key = None
+        if after:
+            if sort_by == "rating":
+                value = None if after["v"] is None else float(after["v"])
+            else:
+                value = _timestamp(after["v"])
+            cursor_key = _sort_key(value, str(after["id"]))
+        rows = []
+        for record in self._ordered(sort_by, ascending, candidates, cursor_key):
+            if min_rating and (record.rating is None or record.rating < min_rating):
+                continue
+            if offset:
+                offset -= 1
+                continue
+            rows.append(record.row)
+            if len(rows) == limit:
+                break
+        self.served += 1
+        return rows
+
+    def _candidates(self, country_code: Optional[str], city: Optional[str], profile_type: Optional[str], tags: Optional[str]) -> Optional[Set[str]]:
+        """Ids matching the indexed filters (intersection, smallest first); None without such filters"""
+        sets: List[Set[str]] = []
+        if country_code:
+            sets.append(self._postings["country_code"].get(country_code.upper(), set()))
+        if profile_type:
+            sets.append(self._postings["profile_type"].get(profile_type, set()))
+        if tags:
+            sets.extend(self._postings["tags"].get(tag.strip(), set()) for tag in tags.split(','))
+        if city:
+            # ILIKE '%city%' : union des villes connues qui contiennent le texte
+            needle = city.lower()
+            matched: Set[str] = set()
+            for value, ids in self._postings["city"].items():
+                if needle in value:
+                    matched |= ids
+            sets.append(matched)
+        if not sets:
+            return None
+        sets.sort(key=len)
+        result = set(sets[0])
+        for ids in sets[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+
+    def _ordered(self, sort_by: str, ascending: bool, candidates: Optional[Set[str]], cursor_key: Optional[SortKey]) -> Iterable[DirectoryRecord]:
+        order = self._orders[sort_by]
+        if candidates is not None and len(candidates) * 8 < len(order):
+            # Peu de candidats : les trier coûte moins que parcourir tout l'ordre
+            records = sorted((self._records[entrepreneur_id] for entrepreneur_id in candidates), key=lambda record: record.sort_key(sort_by), reverse=not ascending)
+            if not ascending:
+                # Tri stable : NULL remis en dernier, ordre décroissant conservé dans chaque groupe
+                records.sort(key=lambda record: record.sort_key(sort_by)[0])
+            if cursor_key is None:
+                return records
+            if ascending:
+                return (record for record in records if record.sort_key(sort_by) > cursor_key)
+            return (record for record in records if _after_descending(record.sort_key(sort_by), cursor_key))
+        keys = self._keys[sort_by]
+        if ascending:
+            start = bisect_right(keys, cursor_key) if cursor_key is not None else 0
+            positions: Iterable[int] = range(start, len(order))
+        else:
+            # Valeurs décroissantes puis NULL (id décroissant) : deux parcours à rebours de l'ordre croissant
+            first_null = bisect_left(keys, (True, 0.0, ""))
+            if cursor_key is None:
+                positions = chain(range(first_null - 1, -1, -1), range(len(order) - 1, first_null - 1, -1))
+            elif cursor_key[0]:
+                positions = range(bisect_left(keys, cursor_key) - 1, first_null - 1, -1)
+            else:
+                positions = chain(range(bisect_left(keys, cursor_key) - 1, -1, -1), range(len(order) - 1, first_null - 1, -1))
+        records = (order[position] for position in positions)
+        if candidates is None:
+            return records
+        return (record for record in records if record.id in candidates)
+
+    def verify(self, rows: List[Dict[str, Any]], expected: List[Dict[str, Any]], description: str) -> None:
+        """Compare a page served from memory with the PostgREST one (DIRECTORY_SNAPSHOT_CHECK)"""
+        got = [(str(row["id"]), row.get("updated_at")) for row in rows]
+        want = [(str(row["id"]), row.get("updated_at")) for row in expected]
+        if got != want:
+            self.mismatches += 1
+            logger.error(f"Directory snapshot mismatch for {description}: memory {[i for i, _ in got]} != PostgREST {[i for i, _ in want]}")
+
+    # ------------------------------------------------------------------
+    # Mise à jour
+
+    def _add(self, record: DirectoryRecord) -> None:
+        self._records[record.id] = record
+        for field, value in record.postings():
+            self._postings[field].setdefault(value, set()).add(record.id)
+        for field in SORT_FIELDS:
+            key = record.sort_key(field)
+            position = bisect_left(self._keys[field], key)
+            self._keys[field].insert(position, key)
+            self._orders[field].insert(position, record)
+
+    def _remove(self, entrepreneur_id: str) -> bool:
+        record = self._records.pop(entrepreneur_id, None)
+        if record is None:
+            return False
+        for field, value in record.postings():
+            ids = self._postings[field].get(value)
+            if ids is not None:
+                ids.discard(entrepreneur_id)
+                if not ids:
+                    del self._postings[field][value]
+        for field in SORT_FIELDS:
+            position = bisect_left(self._keys[field], record.sort_key(field))
+            del self._keys[field][position]
+            del self._orders[field][position]
+        return True
+
+    def _replace_all(self, rows: List[Dict[str, Any]]) -> None:
+        records = [DirectoryRecord(row) for row in rows]
+        postings: Dict[str, Dict[Any, Set[str]]] = {field: {} for field in INDEXED_FIELDS}
+        for record in records:
+            for field, value in record.postings():
+                postings[field].setdefault(value, set()).add(record.id)
+        orders = {field: sorted(records, key=lambda record, field=field: record.sort_key(field)) for field in SORT_FIELDS}
+        # Remplacement en bloc, sans await : une requête voit l'ancien ou le nouvel état, jamais un mélange
+        self._records = {record.id: record for record in records}
+        self._postings = postings
+        self._orders = orders
+        self._keys = {field: [record.sort_key(field) for record in orders[field]] for field in SORT_FIELDS}
+
+    def _advance_watermark(self, rows: Iterable[Dict[str, Any]]) -> None:
+        for row in rows:
+            updated = _timestamp(row.get("updated_at"))
+            if updated is not None and (self._watermark is None or updated > self._watermark):
+                self._watermark = updated
+
+    async def _fetch_all(self, query_factory, call_site: str) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        while True:
+            result = await execute(query_factory().range(len(rows), len(rows) + LOAD_PAGE_SIZE - 1), call_site=call_site)
+            batch = result.data or []
+            rows.extend(batch)
+            if len(batch) < LOAD_PAGE_SIZE:
+                return rows
+
+    async def reload(self) -> None:
+        """Full load of the published directory"""
+        dirty = self._dirty
+        supabase = self._supabase
+        rows = await self._fetch_all(lambda: supabase.table('entrepreneurs_public').select('*').order('id'), "directory_snapshot.load")
+        previous = {entrepreneur_id: record.updated_at for entrepreneur_id, record in self._records.items()}
+        self._replace_all(rows)
+        self._watermark = None
+        self._advance_watermark(rows)
+        was_loaded = self._loaded_at is not None
+        self._loaded_at = time.monotonic()
+        self._synced = dirty
+        if was_loaded and previous != {entrepreneur_id: record.updated_at for entrepreneur_id, record in self._records.items()}:
+            await self._invalidate_pages()
+        logger.info(f"Directory snapshot loaded: {len(rows)} published profiles")
+
+    async def poll(self) -> int:
+        """Apply the rows changed since the last poll; returns the number of changes"""
+        dirty = self._dirty
+        supabase = self._supabase
+        since = datetime.fromtimestamp((self._watermark or 0) - WATERMARK_OVERLAP_SECONDS, timezone.utc).isoformat()
+        published, unpublished = await asyncio.gather(
+            self._fetch_all(lambda: supabase.table('entrepreneurs_public').select('*').gte('updated_at', since).order('updated_at').order('id'), "directory_snapshot.poll"),
+            self._fetch_all(lambda: supabase.table('entrepreneurs').select('id,updated_at').gte('updated_at', since).neq('status', 'published').order('id'), "directory_snapshot.poll"),
+        )
+        changes = 0
+        for row in published:
+            current = self._records.get(str(row["id"]))
+            if current is not None and current.updated_at == row.get("updated_at"):
+                continue
+            self._remove(str(row["id"]))
+            self._add(DirectoryRecord(row))
+            changes += 1
+        for row in unpublished:
+            changes += self._remove(str(row["id"]))
+        self._advance_watermark(published + unpublished)
+        self._synced = dirty
+        if changes:
+            await self._invalidate_pages()
+        return changes
+
+    async def _invalidate_pages(self) -> None:
+        # Les pages en cache ont pu être calculées sur l'ancien état (autre worker, cache Redis partagé)
+        try:
+            await get_response_cache().invalidate_tags([DIRECTORY_TAG])
+        except Exception as e:
+            logger.warning(f"Response cache invalidation failed: {e}")
+
+    def mark_stale(self) -> None:
+        """A profile was written by this worker: fall back to PostgREST until the next poll, run now"""
+        self._dirty += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def discard(self, entrepreneur_id: Optional[str]) -> None:
+        """A profile was deleted by this worker (polling only sees deletions at the next full reload)"""
+        if entrepreneur_id:
+            self._remove(str(entrepreneur_id))
+        self.mark_stale()
+
+    # ------------------------------------------------------------------
+    # Cycle de vie
+
+    async def start(self, supabase: Client) -> None:
+        """Initial load, then the background refresh loop; a failed load is retried by the loop"""
+        self._supabase = supabase
+        self._wakeup = asyncio.Event()
+        try:
+            await self.reload()
+        except Exception as e:
+            self.refresh_failures += 1
+            logger.error(f"Directory snapshot load failed, serving from PostgREST: {e}")
+        self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.reload_seconds:
+                    await self.reload()
+                else:
+                    await self.poll()
+            except Exception as e:
+                self.refresh_failures += 1
+                logger.error(f"Directory snapshot refresh failed: {e}")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": settings.DIRECTORY_SNAPSHOT_ENABLED,
+            "ready": self.ready,
+            "profiles": len(self._records),
+            "served": self.served,
+            "fallbacks": self.fallbacks,
+            "mismatches": self.mismatches,
+            "refresh_failures": self.refresh_failures,
+        }
+
+
+@lru_cache()
+def get_directory_snapshot() -> DirectorySnapshot:
+    return DirectorySnapshot(settings.DIRECTORY_SNAPSHOT_POLL_SECONDS, settings.DIRECTORY_SNAPSHOT_RELOAD_SECONDS)
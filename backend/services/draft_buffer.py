@@ -0,0 +1,180 @@
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Dict, Optional, Set
+import asyncio
+import logging
+import time
+
+from supabase import Client
+
+from config import get_settings
+from services.cache import TTLCache
+from services.supabase_client import execute
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+@dataclass
+class PendingDraft:
+    form_data: Dict[str, Any]
+    current_step: int
+    updated_at: datetime
+    supabase: Client
+    buffered_since: float = field(default_factory=time.monotonic)
+
+
+class DraftWriteBuffer:
+    """
+    Write-behind buffer for form drafts: successive saves of a user replace
+    each other in memory and only the latest is upserted, once the user has
+    been quiet for `quiet_seconds`, when the form step changes, or at the
+    latest `max_delay_seconds` after the first unsaved change
+
+    Writes of one user are serialized so an older draft never overwrites a
+    newer one; flush_all() must run on shutdown
+    """
+
+    def __init__(self, quiet_seconds: float, max_delay_seconds: float):
+        self.quiet_seconds = quiet_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self._pending: Dict[str, PendingDraft] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._locks: Dict[str, list] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        # Dernière étape connue par utilisateur, pour détecter un changement d'étape après un flush
+        self._steps = TTLCache(10000, 3600)
+        self.saves = 0
+        self.writes = 0
+        self.failures = 0
+
+    def get(self, user_id: str) -> Optional[PendingDraft]:
+        """Draft not written yet (read-your-writes for GET)"""
+        return self._pending.get(user_id)
+
+    async def put(self, user_id: str, form_data: Dict[str, Any], current_step: int, supabase: Client) -> PendingDraft:
+        previous = self._pending.get(user_id)
+        last_step = previous.current_step if previous else self._steps.get(user_id)
+        draft = PendingDraft(
+            form_data=form_data,
+            current_step=current_step,
+            updated_at=datetime.now(timezone.utc),
+            supabase=supabase,
+            buffered_since=previous.buffered_since if previous else time.monotonic(),
+        )
+        self._pending[user_id] = draft
+        self._steps.set(user_id, current_step)
+        self.saves += 1
+
+        step_changed = last_step is not None and last_step != current_step
+        overdue = time.monotonic() - draft.buffered_since >= self.max_delay_seconds
+        if self.quiet_seconds <= 0 or step_changed or overdue:
+            # En cas d'échec le brouillon reste en attente et sera retenté
+            await self._flush_logged(user_id)
+        else:
+            self._schedule(user_id, self.quiet_seconds)
+        return draft
+
+    def _schedule(self, user_id: str, delay: float) -> None:
+        timer = self._timers.pop(user_id, None)
+        if timer:
+            timer.cancel()
+        self._timers[user_id] = asyncio.get_running_loop().call_later(delay, self._flush_in_background, user_id)
+
+    def _flush_in_background(self, user_id: str) -> None:
+        self._timers.pop(user_id, None)
+        task = asyncio.ensure_future(self._flush_logged(user_id))
+        # Référence conservée jusqu'à la fin de la tâche (sinon elle peut être collectée)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_logged(self, user_id: str) -> None:
+        try:
+            await self.flush(user_id)
+        except Exception as e:
+            logger.error(f"Draft flush failed for {user_id}: {e}")
+
+    def _acquire_lock(self, user_id: str) -> asyncio.Lock:
+        entry = self._locks.setdefault(user_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        return entry[0]
+
+    def _release_lock(self, user_id: str) -> None:
+        entry = self._locks[user_id]
+        entry[1] -= 1
+        if entry[1] == 0:
+            del self._locks[user_id]
+
+    async def flush(self, user_id: str) -> None:
+        """Upsert the latest pending draft of a user, if any"""
+        lock = self._acquire_lock(user_id)
+        try:
+            async with lock:
+                draft = self._pending.pop(user_id, None)
+                timer = self._timers.pop(user_id, None)
+                if timer:
+                    timer.cancel()
+                if draft is None:
+                    return
+                try:
+                    await execute(
+                        draft.supabase.table('entrepreneur_drafts').upsert({
+                            'user_id': user_id,
+                            'form_data': draft.form_data,
+                            'current_step': draft.current_step,
+                        }, on_conflict='user_id'),
+                        call_site="drafts.flush",
+                    )
+                    self.writes += 1
+                except Exception:
+                    self.failures += 1
+                    # Remis en attente (sauf si une version plus récente est arrivée) et retenté plus tard
+                    if user_id not in self._pending:
+                        self._pending[user_id] = draft
+                        self._schedule(user_id, max(self.quiet_seconds, 1.0))
+                    raise
+        finally:
+            self._release_lock(user_id)
+
+    def _cancel_timers(self) -> None:
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+
+    async def flush_all(self, timeout: float) -> None:
+        """
+        Write every pending draft now (shutdown); failed writes are retried
+        with backoff for at most `timeout` seconds, then the drafts still
+        pending are dropped and their users logged
+        """
+        deadline = time.monotonic() + timeout
+        self._cancel_timers()
+        # Écritures déjà lancées par un minuteur : terminées avant le drainage
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        attempt = 0
+        while self._pending:
+            results = await asyncio.gather(*(self.flush(user_id) for user_id in list(self._pending)), return_exceptions=True)
+            # Un échec replanifie le brouillon : c'est cette boucle qui retente, pas le minuteur
+            self._cancel_timers()
+            remaining = deadline - time.monotonic()
+            if not self._pending or remaining <= 0:
+                break
+            errors = [result for result in results if isinstance(result, Exception)]
+            delay = min(remaining, 0.25 * 2 ** attempt)
+            logger.warning(f"{len(self._pending)} draft(s) not flushed, retrying in {delay:.2f}s: {errors[0] if errors else ''}")
+            await asyncio.sleep(delay)
+            attempt += 1
+        if self._pending:
+            dropped = sorted(self._pending)
+            logger.error(f"{len(dropped)} draft(s) could not be written and were dropped, users: {', '.join(dropped)}")
+            self._pending.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": len(self._pending), "saves": self.saves, "writes": self.writes, "failures": self.failures}
+
+
+@lru_cache()
+def get_draft_buffer() -> DraftWriteBuffer:
+    return DraftWriteBuffer(settings.DRAFT_FLUSH_QUIET_SECONDS, settings.DRAFT_FLUSH_MAX_DELAY_SECONDS)
@@ -0,0 +1,84 @@
+from hashlib import blake2b
+from typing import Dict, Optional
+import time
+
+from fastapi import Request, Response, status
+
+from config import get_settings
+from services.cache import TTLCache
+from services.circuit_breaker import is_upstream_failure
+from services.metrics import STALE_RESPONSES
+
+settings = get_settings()
+
+# Dernière réponse valide de chaque lecture publique : (horodatage, corps)
+_last_good = TTLCache(settings.STALE_CACHE_SIZE, settings.STALE_CACHE_MAX_AGE_SECONDS)
+
+
+def compute_etag(body: bytes) -> str:
+    """Strong ETag derived from the serialized response body"""
+    return f'"{blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match uses the weak comparison (RFC 9110 §13.1.2)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def cache_control(max_age: Optional[int] = None) -> str:
+    max_age = settings.PUBLIC_CACHE_MAX_AGE_SECONDS if max_age is None else max_age
+    return (
+        f"public, max-age={max_age}, "
+        f"stale-while-revalidate={settings.PUBLIC_CACHE_STALE_WHILE_REVALIDATE_SECONDS}"
+    )
+
+
+def cached_json_response(request: Request, body: bytes, max_age: Optional[int] = None) -> Response:
+    """
+    JSON response carrying ETag and Cache-Control validators
+    Answers 304 Not Modified (no body) when the client already has this version
+    """
+    etag = compute_etag(body)
+    headers = {"ETag": etag, "Cache-Control": cache_control(max_age)}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def _request_key(request: Request) -> str:
+    # Paramètres triés : même clé quel que soit leur ordre dans l'URL
+    return f"{request.url.path}?{sorted(request.query_params.multi_items())}"
+
+
+def remember_response(request: Request, body: bytes) -> None:
+    """Keep a freshly built public body as the last good copy of this URL (see stale_response)"""
+    _last_good.set(_request_key(request), (time.time(), body))
+
+
+def stale_response(request: Request, error: Exception) -> Optional[Response]:
+    """
+    Last good copy of this URL when `error` means Supabase is unavailable
+    (open breaker, timeout, 5xx), marked with Age and Warning: 110 and not
+    cacheable downstream; None when there is no copy or for other errors
+    """
+    if not is_upstream_failure(error):
+        return None
+    entry = _last_good.get(_request_key(request))
+    if entry is None:
+        return None
+    stored_at, body = entry
+    response = cached_json_response(request, body, max_age=0)
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["Age"] = str(max(0, int(time.time() - stored_at)))
+    response.headers["Warning"] = '110 - "Response is Stale"'
+    STALE_RESPONSES.inc(route=getattr(request.scope.get("route"), "path", None) or request.url.path)
+    return response
+
+
+def stale_cache_stats() -> Dict[str, int]:
+    return _last_good.stats()
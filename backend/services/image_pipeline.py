@@ -0,0 +1,154 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import partial
+from importlib.util import find_spec
+from typing import IO, Dict, Optional, Tuple
+import asyncio
+import io
+import logging
+
+from anyio import CapacityLimiter, to_thread
+
+from config import get_settings
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Formats de sortie pris en charge : nom Pillow, content-type, extension
+OUTPUT_FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "avif": ("AVIF", "image/avif", "avif"),
+}
+
+ORIGINAL_VARIANT = "original"
+
+# Métadonnées de la source jamais recopiées dans les variantes (vie privée, poids)
+METADATA_KEYS = ("icc_profile", "exif", "xmp", "XML:com.adobe.xmp")
+
+
+class ImageProcessingError(Exception):
+    """Upload could not be decoded or exceeds the pipeline limits"""
+
+
+@dataclass
+class ProcessedLogo:
+    """Re-encoded logo: the resized image under 'original' plus one entry per thumbnail"""
+    content_type: str
+    ext: str
+    width: int
+    height: int
+    variants: Dict[str, bytes]
+
+
+def pipeline_enabled() -> bool:
+    """LOGO_PIPELINE_ENABLED and the optional Pillow dependency is installed"""
+    return settings.LOGO_PIPELINE_ENABLED and find_spec("PIL") is not None
+
+
+def _encode(image, pillow_format: str, quality: int) -> bytes:
+    # Les encodeurs relisent image.info (profil ICC, EXIF, XMP de la source) : retirés avant l'écriture
+    for key in METADATA_KEYS:
+        image.info.pop(key, None)
+    buffer = io.BytesIO()
+    image.save(buffer, format=pillow_format, quality=quality, icc_profile=None)
+    return buffer.getvalue()
+
+
+def _process_logo(data: bytes, output_format: str, quality: int, max_dimension: int,
+                  thumbnails: Dict[str, int], max_pixels: int) -> ProcessedLogo:
+    """Decode, normalise and re-encode one logo (runs in a worker process)"""
+    from PIL import Image, ImageOps
+
+    pillow_format, content_type, ext = OUTPUT_FORMATS[output_format]
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            # Contrôle sur l'en-tête, avant décodage des pixels (bombes de décompression)
+            if source.width * source.height > max_pixels:
+                raise ImageProcessingError("Image dimensions too large")
+            source.seek(0)
+            image = ImageOps.exif_transpose(source)
+            has_alpha = image.mode in ("RGBA", "LA", "PA") or (image.mode == "P" and "transparency" in image.info)
+            image = image.convert("RGBA" if has_alpha else "RGB")
+    except ImageProcessingError:
+        raise
+    except Exception as e:
+        raise ImageProcessingError(f"Cannot decode image: {e}") from None
+
+    resized = image.copy()
+    resized.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+    variants = {ORIGINAL_VARIANT: _encode(resized, pillow_format, quality)}
+    for name, size in thumbnails.items():
+        thumbnail = resized.copy()
+        thumbnail.thumbnail((size, size), Image.Resampling.LANCZOS)
+        variants[name] = _encode(thumbnail, pillow_format, quality)
+    return ProcessedLogo(content_type=content_type, ext=ext, width=resized.width, height=resized.height, variants=variants)
+
+
+_executor: Optional[ProcessPoolExecutor] = None
+_limiter: Optional[CapacityLimiter] = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=settings.LOGO_PIPELINE_WORKERS)
+    return _executor
+
+
+def _get_limiter() -> CapacityLimiter:
+    # Created lazily: anyio primitives need a running event loop
+    global _limiter
+    if _limiter is None:
+        _limiter = CapacityLimiter(max(1, settings.LOGO_PIPELINE_MAX_JOBS))
+    return _limiter
+
+
+async def process_logo(file: IO[bytes]) -> ProcessedLogo:
+    """
+    Resize and re-encode an uploaded logo off the event loop
+    At most LOGO_PIPELINE_MAX_JOBS images are read and processed at once
+    """
+    output_format = settings.LOGO_OUTPUT_FORMAT.lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise RuntimeError(f"Unsupported LOGO_OUTPUT_FORMAT: {settings.LOGO_OUTPUT_FORMAT}")
+
+    global _executor
+    async with _get_limiter():
+        # Lecture sous le limiteur : la mémoire reste bornée à LOGO_PIPELINE_MAX_JOBS fichiers
+        data = await to_thread.run_sync(file.read)
+        job = partial(
+            _process_logo, data, output_format, settings.LOGO_OUTPUT_QUALITY,
+            settings.LOGO_MAX_DIMENSION, settings.logo_thumbnail_sizes, settings.LOGO_MAX_PIXELS,
+        )
+        if settings.LOGO_PIPELINE_WORKERS <= 0:
+            return await to_thread.run_sync(job)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(_get_executor(), job)
+        except BrokenProcessPool:
+            # Un worker a été tué (mémoire, signal) : le pool est recréé au prochain appel
+            logger.error("Logo pipeline process pool broke; recreating it")
+            _executor = None
+            raise
+
+
+def variant_path(base_path: str, variant: str, ext: str) -> str:
+    """Storage path of a variant: '<base>.<ext>' for the original, '<base>_<variant>.<ext>' otherwise"""
+    if variant == ORIGINAL_VARIANT:
+        return f"{base_path}.{ext}"
+    return f"{base_path}_{variant}.{ext}"
+
+
+def variant_paths(filename: str) -> Tuple[str, ...]:
+    """All storage paths that may belong to the logo stored at `filename`"""
+    base_path, _, ext = filename.rpartition(".")
+    if not base_path:
+        return (filename,)
+    return (filename, *(variant_path(base_path, name, ext) for name in settings.logo_thumbnail_sizes))
+
+
+def shutdown_image_pipeline() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,90 @@
+from functools import lru_cache
+from typing import Any, Dict, Optional
+import logging
+
+import jwt
+from jwt import PyJWKClient, PyJWKClientError
+
+from config import get_settings
+from services.supabase_client import run_sync
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+HMAC_ALGORITHMS = {"HS256"}
+ASYMMETRIC_ALGORITHMS = {"RS256", "ES256"}
+REQUIRED_CLAIMS = ["exp", "sub"]
+
+
+@lru_cache()
+def get_jwks_client() -> PyJWKClient:
+    """
+    Get JWKS client for the Supabase project
+    Signing keys are cached in-process for JWKS_CACHE_TTL_SECONDS
+    """
+    return PyJWKClient(
+        settings.jwks_url,
+        cache_keys=True,
+        lifespan=settings.JWKS_CACHE_TTL_SECONDS,
+    )
+
+
+def _cached_signing_key(token: str):
+    """Key of this token from the in-process JWKS cache, or None when a fetch is needed (miss, expiry, unknown kid)"""
+    cache = get_jwks_client().jwk_set_cache
+    jwk_set = cache.get() if cache is not None else None
+    if jwk_set is None:
+        return None
+    kid = jwt.get_unverified_header(token).get("kid")
+    for signing_key in jwk_set.keys:
+        if signing_key.key_id == kid:
+            return signing_key.key
+    return None
+
+
+async def _resolve_signing_key(token: str, algorithm: Optional[str]):
+    """Return the key able to verify this token, or None if none is available"""
+    if algorithm in HMAC_ALGORITHMS:
+        return settings.SUPABASE_JWT_SECRET or None
+
+    if algorithm in ASYMMETRIC_ALGORITHMS:
+        key = _cached_signing_key(token)
+        if key is not None:
+            return key
+        try:
+            # Téléchargement (ou rafraîchissement) du JWKS : appel HTTP bloquant, hors de la boucle d'événements
+            signing_key = await run_sync(get_jwks_client().get_signing_key_from_jwt, token, call_site="auth.jwks")
+            return signing_key.key
+        except PyJWKClientError as e:
+            logger.warning(f"JWKS signing key unavailable: {e}")
+            return None
+
+    return None
+
+
+async def verify_access_token(token: str) -> Optional[Dict[str, Any]]:
+    """
+    Verify a Supabase access token in-process (signature, expiry, audience)
+
+    Returns the token claims when valid, or None when verification is
+    inconclusive (no secret/JWKS key for the token's algorithm) so the caller
+    can fall back to GoTrue.
+    Raises jwt.InvalidTokenError when the token is definitively invalid,
+    including an algorithm Supabase does not sign with ("none", HS384, ...).
+    """
+    header = jwt.get_unverified_header(token)
+    algorithm = header.get("alg")
+    if algorithm not in HMAC_ALGORITHMS | ASYMMETRIC_ALGORITHMS:
+        raise jwt.InvalidAlgorithmError(f"Unsupported token algorithm: {algorithm}")
+
+    key = await _resolve_signing_key(token, algorithm)
+    if key is None:
+        return None
+
+    return jwt.decode(
+        token,
+        key,
+        algorithms=[algorithm],
+        audience=settings.SUPABASE_JWT_AUDIENCE,
+        options={"require": REQUIRED_CLAIMS},
+    )
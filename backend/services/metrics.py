@@ -0,0 +1,235 @@
+from bisect import bisect_left
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+import time
+
+from services.call_budget import record_call
+
+# Bornes (secondes) des histogrammes de latence : de 5 ms à 10 s
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonic counter, one series per label combination"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in values
+        ]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+    kind = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Cumulative histogram with fixed bucket bounds"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Par série : [compteurs par borne (non cumulés) + dépassement, somme, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            series = sorted((key, ([*counts], total_sum, count)) for key, (counts, total_sum, count) in self._series.items())
+        lines = self._header()
+        for key, (counts, total_sum, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total_sum)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status code", ("method", "route", "status"),
+))
+HTTP_REQUEST_DURATION = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template", ("method", "route"),
+))
+HTTP_REQUESTS_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served",
+))
+SUPABASE_CALL_DURATION = REGISTRY.register(Histogram(
+    "supabase_call_duration_seconds", "Duration of Supabase calls (in the worker thread)", ("service", "target", "call_site"),
+))
+SUPABASE_CALL_ERRORS = REGISTRY.register(Counter(
+    "supabase_call_errors_total", "Supabase calls that raised", ("service", "target", "call_site"),
+))
+SUPABASE_COALESCED_CALLS = REGISTRY.register(Counter(
+    "supabase_coalesced_calls_total", "Supabase reads served by an identical call already in flight", ("target", "call_site"),
+))
+SUPABASE_POOL_WAIT = REGISTRY.register(Histogram(
+    "supabase_threadpool_wait_seconds", "Time spent waiting for a worker thread before a Supabase call", ("service",),
+))
+SUPABASE_BREAKER_STATE = REGISTRY.register(Gauge(
+    "supabase_breaker_state", "Circuit breaker state by Supabase service (0 closed, 1 half-open, 2 open)", ("service",),
+))
+SUPABASE_BREAKER_TRANSITIONS = REGISTRY.register(Counter(
+    "supabase_breaker_transitions_total", "Circuit breaker state changes by new state", ("service", "state"),
+))
+SUPABASE_BREAKER_REJECTED = REGISTRY.register(Counter(
+    "supabase_breaker_rejected_calls_total", "Supabase calls shed (not sent) because the breaker was open", ("service",),
+))
+SUPABASE_BREAKER_RECOVERY = REGISTRY.register(Histogram(
+    "supabase_breaker_recovery_seconds", "Time from a breaker opening to the service answering again", ("service",),
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600),
+))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "http_rate_limited_total", "Requests rejected with 429 by rate limit rule", ("rule",),
+))
+ADMISSION_QUEUE_WAIT = REGISTRY.register(Histogram(
+    "http_admission_wait_seconds", "Time requests waited for a concurrency slot (admission control)",
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "http_admission_rejected_total", "Requests answered 503 by admission control (queue_full or timeout)", ("reason",),
+))
+STALE_RESPONSES = REGISTRY.register(Counter(
+    "http_stale_responses_total", "Public reads answered with the last good copy during a Supabase outage", ("route",),
+))
+
+# Module racine de la classe appelée -> service Supabase
+_SERVICE_BY_MODULE = {"gotrue": "auth", "supabase_auth": "auth", "storage3": "storage", "postgrest": "postgrest"}
+
+
+def describe_call(func: Callable[..., Any]) -> Tuple[str, str]:
+    """(service, target) labels for a bound supabase-py method, e.g. ('storage', 'logos.upload')"""
+    owner = getattr(func, "__self__", None)
+    name = getattr(func, "__name__", "call")
+    if owner is None:
+        return "other", name
+    for cls in type(owner).__mro__:
+        service = _SERVICE_BY_MODULE.get(cls.__module__.split(".")[0])
+        if service:
+            break
+    else:
+        service = "other"
+    bucket = getattr(owner, "id", None) if service == "storage" else None
+    return service, f"{bucket}.{name}" if bucket else name
+
+
+def describe_query(query: Any) -> str:
+    """PostgREST target of a request builder: the table name or 'rpc/<function>'"""
+    path = getattr(query, "path", None)
+    return path.lstrip("/") if isinstance(path, str) and path else "unknown"
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+def timed_call(func: Callable[..., Any], service: str, target: str, call_site: Optional[str]) -> Callable[..., Any]:
+    """
+    Wrap a blocking call so it records the thread-pool wait, its duration and
+    failures when it eventually runs, and adds it to the calls of the current
+    request (services.call_budget)
+    """
+    submitted = time.perf_counter()
+    site = call_site or "unspecified"
+
+    def run(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        SUPABASE_POOL_WAIT.observe(started - submitted, service=service)
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            SUPABASE_CALL_ERRORS.inc(service=service, target=target, call_site=site)
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            SUPABASE_CALL_DURATION.observe(duration, service=service, target=target, call_site=site)
+            record_call(service, target, site, duration)
+
+    return run
@@ -0,0 +1,54 @@
+from typing import Dict, Optional
+import asyncio
+import logging
+import time
+
+from supabase import Client
+
+from config import get_settings
+from services.supabase_client import execute
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+STATS_FIELDS = ("total_users", "total_entrepreneurs", "total_published", "countries_covered", "total_views")
+
+
+class PlatformStatsSnapshot:
+    """
+    Last result of the get_platform_stats RPC, refreshed at most every
+    STATS_REFRESH_SECONDS; concurrent callers share a single refresh
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._data: Optional[Dict[str, int]] = None
+        self._fetched_at = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+
+    def _is_fresh(self) -> bool:
+        return self._data is not None and time.monotonic() - self._fetched_at < self.refresh_seconds
+
+    async def get(self, supabase: Client) -> Dict[str, int]:
+        if self._is_fresh():
+            return self._data
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._is_fresh():
+                result = await execute(supabase.rpc('get_platform_stats'), call_site="platform_stats.refresh", coalesce=True)
+                row = result.data[0] if isinstance(result.data, list) and result.data else (result.data or {})
+                self._data = {field: int(row.get(field) or 0) for field in STATS_FIELDS}
+                self._fetched_at = time.monotonic()
+            return self._data
+
+    def invalidate(self) -> None:
+        self._fetched_at = 0.0
+
+
+_snapshot = PlatformStatsSnapshot(settings.STATS_REFRESH_SECONDS)
+
+
+async def get_platform_stats(supabase: Client) -> Dict[str, int]:
+    """Users, entrepreneurs (all / published), distinct countries and profile views, from the shared snapshot"""
+    return await _snapshot.get(supabase)
@@ -0,0 +1,153 @@
+from collections import OrderedDict
+from functools import lru_cache
+from math import ceil
+from typing import Callable, Dict, Optional, Tuple
+import logging
+import time
+
+from fastapi import HTTPException, Request, status
+
+from config import get_settings
+from services.metrics import RATE_LIMITED
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+RULES = settings.rate_limit_rules
+
+# Seau à jetons atomique côté Redis (horloge du serveur Redis, commune à tous les workers)
+_TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local updated = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local wait = 0
+if tokens >= cost then
+    tokens = tokens - cost
+else
+    wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return tostring(wait)
+"""
+
+
+def client_address(request: Request) -> str:
+    """
+    Client IP: the address TRUSTED_PROXY_HOPS entries from the right of
+    X-Forwarded-For (the one written by our own proxy), or the peer address
+    """
+    forwarded = request.headers.get("x-forwarded-for")
+    if forwarded and settings.TRUSTED_PROXY_HOPS > 0:
+        addresses = [address.strip() for address in forwarded.split(",") if address.strip()]
+        if addresses:
+            return addresses[max(0, len(addresses) - settings.TRUSTED_PROXY_HOPS)]
+    return request.client.host if request.client else ""
+
+
+class MemoryRateLimiter:
+    """
+    Token buckets of this worker, the least recently used dropped beyond
+    `max_keys` (a dropped bucket starts full again)
+    With several workers each one applies the full limit
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def acquire(self, key: str, capacity: int, per_seconds: float, cost: int = 1) -> float:
+        """Take `cost` tokens; returns 0 when allowed, else the seconds until they are available"""
+        now = time.monotonic()
+        rate = capacity / per_seconds
+        bucket = self._buckets.pop(key, None)
+        tokens = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * rate)
+        wait = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            wait = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def stats(self) -> Dict[str, int]:
+        return {"backend": "memory", "keys": len(self._buckets)}
+
+
+class RedisRateLimiter:
+    """
+    Same contract backed by a Redis-compatible server (limits shared by all workers)
+    Requires the optional 'redis' package
+    """
+
+    def __init__(self, url: str, prefix: str = "nexus:ratelimit:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis_asyncio.from_url(url)
+        self._script = self._redis.register_script(_TOKEN_BUCKET_SCRIPT)
+        self._prefix = prefix
+
+    async def acquire(self, key: str, capacity: int, per_seconds: float, cost: int = 1) -> float:
+        wait = await self._script(keys=[self._prefix + key], args=[capacity, capacity / per_seconds, cost])
+        return float(wait)
+
+    def stats(self) -> Dict[str, int]:
+        return {"backend": "redis"}
+
+
+@lru_cache()
+def get_rate_limiter():
+    """Rate limiter selected by RATE_LIMIT_BACKEND (memory or redis)"""
+    if settings.RATE_LIMIT_BACKEND.lower() == "redis":
+        url = settings.RATE_LIMIT_URL or settings.RESPONSE_CACHE_URL
+        if not url:
+            raise RuntimeError("RATE_LIMIT_URL is required when RATE_LIMIT_BACKEND=redis")
+        logger.info("Rate limiter: redis")
+        return RedisRateLimiter(url)
+    return MemoryRateLimiter(settings.RATE_LIMIT_MAX_KEYS)
+
+
+async def enforce_rate_limit(request: Request, rule: str, identity: Optional[str] = None, cost: int = 1) -> None:
+    """
+    Take `cost` tokens (one per profile for batch routes) from the bucket of
+    `rule` (RATE_LIMIT_RULES) for this client, or for `identity` (user id,
+    e-mail) when given
+    Raises 429 with Retry-After when the bucket does not hold enough tokens
+    """
+    limit = RULES.get(rule)
+    if not settings.RATE_LIMIT_ENABLED or limit is None:
+        return
+    capacity, per_seconds = limit
+    # Jamais plus que la capacité : une requête coûteuse reste possible une fois le seau plein
+    cost = max(1, min(cost, capacity))
+    try:
+        wait = await get_rate_limiter().acquire(f"{rule}:{identity or client_address(request)}", capacity, per_seconds, cost)
+    except Exception as e:
+        # Limiteur partagé indisponible : la requête passe plutôt que d'échouer
+        logger.warning(f"Rate limiter unavailable, {rule} not limited: {e}")
+        return
+    if wait > 0:
+        RATE_LIMITED.inc(rule=rule)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please retry later",
+            headers={"Retry-After": str(max(1, ceil(wait)))},
+        )
+
+
+def rate_limit(rule: str) -> Callable:
+    """Route dependency applying enforce_rate_limit per client IP, before the handler runs"""
+
+    async def dependency(request: Request) -> None:
+        await enforce_rate_limit(request, rule)
+
+    return dependency
@@ -0,0 +1,190 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+import logging
+
+from config import get_settings
+from services.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+# Tag posé sur toutes les pages de l'annuaire ; chaque fiche a aussi son propre tag
+DIRECTORY_TAG = "directory"
+
+
+def profile_tag(entrepreneur_id: str) -> str:
+    return f"entrepreneur:{entrepreneur_id}"
+
+
+class MemoryResponseCache:
+    """
+    In-process cache of serialized JSON responses (LRU + TTL)
+    Invalidation is tag-based: each entry remembers the version of its tags
+    read before the upstream fetch (tag_versions) and becomes stale as soon
+    as one of them is bumped, including by a write that lands during the fetch
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self._entries = TTLCache(max_size, ttl_seconds)
+        self._tag_versions: Dict[str, int] = {}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        body, tag_versions = entry
+        if any(self._tag_versions.get(tag, 0) != version for tag, version in tag_versions.items()):
+            self._entries.invalidate(key)
+            return None
+        return body
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """Cached bodies for the keys that are present and fresh"""
+        found = {}
+        for key in keys:
+            body = await self.get(key)
+            if body is not None:
+                found[key] = body
+        return found
+
+    async def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        """Current versions of the tags, to read before fetching what will be cached under them"""
+        return {tag: self._tag_versions.get(tag, 0) for tag in tags}
+
+    async def set(self, key: str, body: bytes, tag_versions: Dict[str, int]) -> None:
+        self._entries.set(key, (body, dict(tag_versions)))
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        for tag in tags:
+            self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"backend": "memory", **self._entries.stats()}
+
+
+class RedisResponseCache:
+    """
+    Same contract backed by a Redis-compatible server (shared by all workers)
+    Requires the optional 'redis' package
+    """
+
+    def __init__(self, url: str, ttl_seconds: int, prefix: str = "nexus:responses:"):
+        try:
+            from redis import asyncio as redis_asyncio
+        except ImportError as e:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis requires the 'redis' package") from e
+        self._redis = redis_asyncio.from_url(url)
+        self._ttl = int(ttl_seconds)
+        self._prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self._prefix}tag:{tag}"
+
+    async def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        tags = list(tags)
+        if not tags:
+            return {}
+        values = await self._redis.mget([self._tag_key(tag) for tag in tags])
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = await self._redis.hgetall(self._prefix + key)
+        body = entry.pop(b"body", None) if entry else None
+        if body is None:
+            self.misses += 1
+            return None
+        stored = {field.decode()[2:]: int(value) for field, value in entry.items()}
+        if await self.tag_versions(stored) != stored:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return body
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        """Same as get() for several keys: one pipelined HGETALL round trip plus one MGET of the tag versions"""
+        if not keys:
+            return {}
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(self._prefix + key)
+            entries = await pipe.execute()
+        candidates = {}
+        for key, entry in zip(keys, entries):
+            body = entry.pop(b"body", None) if entry else None
+            if body is not None:
+                candidates[key] = (body, {field.decode()[2:]: int(value) for field, value in entry.items()})
+        current = await self.tag_versions({tag for _, stored in candidates.values() for tag in stored})
+        found = {
+            key: body for key, (body, stored) in candidates.items()
+            if all(current.get(tag, 0) == version for tag, version in stored.items())
+        }
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    async def set(self, key: str, body: bytes, tag_versions: Dict[str, int]) -> None:
+        mapping = {"body": body, **{f"v:{tag}": version for tag, version in tag_versions.items()}}
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.delete(self._prefix + key)
+            pipe.hset(self._prefix + key, mapping=mapping)
+            pipe.expire(self._prefix + key, self._ttl)
+            await pipe.execute()
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(self._tag_key(tag))
+            await pipe.execute()
+
+    def stats(self) -> Dict[str, int]:
+        return {"backend": "redis", "hits": self.hits, "misses": self.misses}
+
+
+class NullResponseCache:
+    """Cache disabled (RESPONSE_CACHE_BACKEND=none)"""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return None
+
+    async def get_many(self, keys: List[str]) -> Dict[str, bytes]:
+        return {}
+
+    async def tag_versions(self, tags: Iterable[str]) -> Dict[str, int]:
+        return {}
+
+    async def set(self, key: str, body: bytes, tag_versions: Dict[str, int]) -> None:
+        return None
+
+    async def invalidate_tags(self, tags: Iterable[str]) -> None:
+        return None
+
+    def stats(self) -> Dict[str, int]:
+        return {"backend": "none"}
+
+
+@lru_cache()
+def get_response_cache():
+    """Response cache selected by RESPONSE_CACHE_BACKEND (memory, redis or none)"""
+    backend = settings.RESPONSE_CACHE_BACKEND.lower()
+    if backend == "redis":
+        if not settings.RESPONSE_CACHE_URL:
+            raise RuntimeError("RESPONSE_CACHE_URL is required when RESPONSE_CACHE_BACKEND=redis")
+        logger.info("Response cache: redis")
+        return RedisResponseCache(settings.RESPONSE_CACHE_URL, settings.RESPONSE_CACHE_TTL_SECONDS)
+    if backend == "none":
+        return NullResponseCache()
+    return MemoryResponseCache(settings.RESPONSE_CACHE_SIZE, settings.RESPONSE_CACHE_TTL_SECONDS)
+
+
+async def invalidate_profile(entrepreneur_id: Optional[str] = None) -> None:
+    """Drop cached directory pages (and the profile's own entry) after a write"""
+    tags = [DIRECTORY_TAG]
+    if entrepreneur_id:
+        tags.append(profile_tag(entrepreneur_id))
+    try:
+        await get_response_cache().invalidate_tags(tags)
+    except Exception as e:
+        # Le cache expire de lui-même (TTL) : une invalidation ratée ne doit pas faire échouer l'écriture
+        logger.warning(f"Response cache invalidation failed: {e}")
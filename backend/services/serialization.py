@@ -0,0 +1,70 @@
+from typing import Any, Dict, Iterable, List, Type
+import json
+
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import PydanticUndefined
+
+from config import get_settings
+
+settings = get_settings()
+
+try:
+    import orjson
+except ImportError:  # dépendance optionnelle : repli sur l'encodeur json de la bibliothèque standard
+    orjson = None
+
+
+def dumps(value: Any) -> bytes:
+    """Compact JSON bytes (orjson when installed)"""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+class TrustedRowSerializer:
+    """
+    Shapes PostgREST rows into the JSON form of a response model without
+    instantiating it: only the model's fields are kept, missing ones get the
+    model default and null lists become []. Values are trusted as returned by
+    the database (timestamps stay ISO strings)
+
+    check() validates shaped rows against the model; it runs on every
+    response when RESPONSE_SCHEMA_CHECK is set (development / CI) and in
+    benchmarks/bench_serialization.py
+    """
+
+    def __init__(self, model: Type[BaseModel], defaults: Dict[str, Any] = None, nested: Dict[str, Iterable[str]] = None):
+        self.model = model
+        self._adapter = TypeAdapter(List[model])
+        self._fields = []
+        self._list_fields = []
+        for name, field in model.model_fields.items():
+            default = None if field.default is PydanticUndefined else field.default
+            default = (defaults or {}).get(name, default)
+            self._fields.append((name, default))
+            if isinstance(default, list):
+                self._list_fields.append(name)
+        # Champs contenant une liste d'objets : seules les clés déclarées sont conservées
+        self._nested = {name: tuple(keys) for name, keys in (nested or {}).items()}
+
+    def shape(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        get = row.get
+        shaped = {name: get(name, default) for name, default in self._fields}
+        for name in self._list_fields:
+            if not shaped[name]:
+                shaped[name] = []
+        for name, keys in self._nested.items():
+            items = shaped[name]
+            if items:
+                shaped[name] = [{key: item.get(key) for key in keys} for item in items]
+        return shaped
+
+    def shape_many(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        shaped = [self.shape(row) for row in rows]
+        if settings.RESPONSE_SCHEMA_CHECK:
+            self.check(shaped)
+        return shaped
+
+    def check(self, shaped: List[Dict[str, Any]]) -> None:
+        """Raise pydantic.ValidationError if shaped rows do not conform to the model"""
+        self._adapter.validate_python(shaped)
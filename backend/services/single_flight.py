@@ -0,0 +1,75 @@
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+import asyncio
+import json
+
+from services.metrics import SUPABASE_COALESCED_CALLS
+
+T = TypeVar("T")
+
+# Méthodes HTTP coalescées par défaut (lectures) ; les RPC en POST doivent être marquées explicitement
+_READ_METHODS = {"GET", "HEAD"}
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one in-flight execution
+    The shared call runs in its own task, so a caller that goes away (client
+    disconnect) does not cancel it for the others. Results are shared
+    objects: callers must not mutate them
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]], **labels: str) -> T:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            SUPABASE_COALESCED_CALLS.inc(**labels)
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(func())
+        self._inflight[key] = task
+        self.executed += 1
+        task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._inflight), "executed": self.executed, "coalesced": self.coalesced}
+
+
+@lru_cache()
+def get_single_flight() -> SingleFlight:
+    return SingleFlight()
+
+
+def query_key(query: Any, coalesce: Optional[bool] = None) -> Optional[Hashable]:
+    """
+    Identity of a PostgREST request builder: method, path, query string, body
+    and the headers that change the result (credentials, Accept, Prefer)
+    None when the request must not be coalesced: writes unless coalesce=True
+    (read-only RPCs), or coalesce=False
+    """
+    method = getattr(query, "http_method", None)
+    if coalesce is False or not isinstance(method, str):
+        return None
+    if coalesce is None and method not in _READ_METHODS:
+        return None
+    headers = getattr(query, "headers", None) or {}
+    session_headers = getattr(getattr(query, "session", None), "headers", None) or {}
+    body = getattr(query, "json", None)
+    return (
+        method,
+        getattr(query, "path", ""),
+        str(getattr(query, "params", "")),
+        json.dumps(body, sort_keys=True, default=str) if body is not None else None,
+        headers.get("authorization") or session_headers.get("authorization"),
+        headers.get("accept"),
+        headers.get("prefer"),
+    )
@@ -1,23 +1,240 @@
-from supabase import create_client, Client
-from functools import lru_cache
+from supabase import Client, ClientOptions
+from supabase._sync.auth_client import SyncSupabaseAuthClient
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient as PostgrestHttpClient
+from storage3 import SyncStorageClient
+from storage3.utils import SyncClient as StorageHttpClient
+from gotrue.http_clients import SyncClient as AuthHttpClient
+from functools import lru_cache, partial
+from typing import Any, Callable, Dict, Optional
+from anyio import CapacityLimiter, to_thread
 from config import get_settings
+from services.circuit_breaker import get_breaker, is_upstream_failure
+from services.metrics import describe_call, describe_query, timed_call
+from services.single_flight import get_single_flight, query_key
+import httpx
 import logging
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
+POOLED_SERVICES = ("postgrest", "storage", "auth")
+
+
+class _SharedTransport(httpx.HTTPTransport):
+    """
+    Connection pool shared by every client of one Supabase service
+    close()/__exit__ are no-ops so that closing one client cannot tear down
+    the pool used by the others; shutdown() really closes it
+    """
+
+    def close(self) -> None:
+        pass
+
+    def __exit__(self, exc_type=None, exc_value=None, traceback=None) -> None:
+        pass
+
+    def shutdown(self) -> None:
+        super().close()
+
+
+@lru_cache(maxsize=None)
+def get_http_transport(service: str) -> _SharedTransport:
+    """Keep-alive connection pool (optionally HTTP/2) for one Supabase service"""
+    return _SharedTransport(
+        http2=settings.SUPABASE_HTTP2,
+        limits=httpx.Limits(
+            max_connections=settings.SUPABASE_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.SUPABASE_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.SUPABASE_HTTP_KEEPALIVE_EXPIRY,
+        ),
+    )
+
+
+class _PooledPostgrestClient(SyncPostgrestClient):
+    def create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return PostgrestHttpClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=get_http_transport("postgrest"),
+            follow_redirects=True,
+        )
+
+
+class _PooledStorageClient(SyncStorageClient):
+    def _create_session(self, base_url, headers, timeout, verify=True, proxy=None):
+        return StorageHttpClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            transport=get_http_transport("storage"),
+            follow_redirects=True,
+        )
+
+
+class PooledClient(Client):
+    """
+    Supabase client whose PostgREST, Storage and GoTrue sub-clients reuse
+    the process-wide connection pools instead of opening their own
+    """
+
+    @staticmethod
+    def _init_postgrest_client(rest_url, headers, schema, timeout=None, verify=True, proxy=None):
+        return _PooledPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout)
+
+    @staticmethod
+    def _init_storage_client(storage_url, headers, storage_client_timeout=None, verify=True, proxy=None):
+        return _PooledStorageClient(storage_url, headers, storage_client_timeout)
+
+    @staticmethod
+    def _init_supabase_auth_client(auth_url, client_options, verify=True, proxy=None):
+        return SyncSupabaseAuthClient(
+            url=auth_url,
+            auto_refresh_token=client_options.auto_refresh_token,
+            persist_session=client_options.persist_session,
+            storage=client_options.storage,
+            headers=client_options.headers,
+            flow_type=client_options.flow_type,
+            http_client=AuthHttpClient(
+                timeout=settings.SUPABASE_AUTH_TIMEOUT,
+                transport=get_http_transport("auth"),
+                follow_redirects=True,
+            ),
+        )
+
+
+class _AdminClient(PooledClient):
+    """
+    Process-wide service_role client: auth events never replace its key
+    (supabase-py would otherwise send the signed-in user's JWT as Authorization)
+    """
+
+    def _listen_to_auth_events(self, event, session):
+        self.options.headers["Authorization"] = self._create_auth_header(self.supabase_key)
+
+
+def _client_options() -> ClientOptions:
+    # Côté serveur : aucune session conservée ni rafraîchie en arrière-plan
+    return ClientOptions(
+        postgrest_client_timeout=settings.SUPABASE_POSTGREST_TIMEOUT,
+        storage_client_timeout=settings.SUPABASE_STORAGE_TIMEOUT,
+        persist_session=False,
+        auto_refresh_token=False,
+    )
+
+
+def _create_client(supabase_key: str, client_class: type = PooledClient) -> Client:
+    return client_class.create(settings.SUPABASE_URL, supabase_key, _client_options())
+
+
+def prewarm_connections() -> Dict[str, str]:
+    """
+    Open one connection per Supabase service (TCP + TLS handshake) so the
+    first requests find it in the keep-alive pool
+    Any HTTP status counts as warm; failures are logged, never raised
+    """
+    base_url = settings.SUPABASE_URL.rstrip('/')
+    targets = {
+        "postgrest": f"{base_url}/rest/v1/",
+        "storage": f"{base_url}/storage/v1/",
+        "auth": f"{base_url}/auth/v1/health",
+    }
+    headers = {"apikey": settings.SUPABASE_ANON_KEY}
+    results = {}
+    for service, url in targets.items():
+        try:
+            with httpx.Client(transport=get_http_transport(service), timeout=settings.SUPABASE_POSTGREST_TIMEOUT) as http:
+                response = http.head(url, headers=headers)
+            results[service] = f"HTTP {response.status_code}"
+        except Exception as e:
+            logger.warning(f"Supabase {service} pre-warm failed: {e}")
+            results[service] = "failed"
+    return results
+
+
+def close_http_pools() -> None:
+    """Close the shared connection pools (application shutdown)"""
+    for service in POOLED_SERVICES:
+        get_http_transport(service).shutdown()
+    get_http_transport.cache_clear()
+
+_limiter: Optional[CapacityLimiter] = None
+
+
+def _get_limiter() -> CapacityLimiter:
+    # Created lazily: anyio primitives need a running event loop
+    global _limiter
+    if _limiter is None:
+        _limiter = CapacityLimiter(settings.SUPABASE_THREADPOOL_SIZE)
+    return _limiter
+
+
+async def _offload(func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    if settings.SUPABASE_THREADPOOL_SIZE <= 0:
+        return func(*args, **kwargs)
+    return await to_thread.run_sync(partial(func, *args, **kwargs), limiter=_get_limiter())
+
+
+async def _guarded(service: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Offload a call through the circuit breaker of its service: raises
+    UpstreamUnavailable (503) without calling Supabase while it is open
+    """
+    if not settings.SUPABASE_BREAKER_ENABLED or service not in POOLED_SERVICES:
+        return await _offload(func, *args, **kwargs)
+    breaker = get_breaker(service)
+    probe = breaker.acquire()
+    failed = None
+    try:
+        result = await _offload(func, *args, **kwargs)
+        failed = False
+        return result
+    except Exception as e:
+        failed = is_upstream_failure(e)
+        raise
+    finally:
+        # failed reste None si l'appel est annulé : ni succès ni échec
+        breaker.release(probe, failed)
+
+
+async def run_sync(func: Callable[..., Any], *args: Any, call_site: Optional[str] = None, **kwargs: Any) -> Any:
+    """
+    Run a blocking supabase-py call (auth, storage, ...) in the bounded
+    worker thread pool so it does not stall the event loop
+    call_site labels the call in the Supabase metrics (e.g. "auth.login")
+    """
+    service, target = describe_call(func)
+    return await _guarded(service, timed_call(func, service, target, call_site), *args, **kwargs)
+
+
+async def execute(query, call_site: Optional[str] = None, coalesce: Optional[bool] = None) -> Any:
+    """
+    Execute a PostgREST request builder (table/rpc) off the event loop
+    Identical concurrent reads share one upstream call (single-flight): GET
+    requests by default, read-only RPCs with coalesce=True; coalesce=False opts out
+    """
+    target = describe_query(query)
+    key = query_key(query, coalesce) if settings.SINGLE_FLIGHT_ENABLED else None
+    if key is None:
+        return await _guarded("postgrest", timed_call(query.execute, "postgrest", target, call_site))
+    return await get_single_flight().do(
+        key,
+        lambda: _guarded("postgrest", timed_call(query.execute, "postgrest", target, call_site)),
+        target=target,
+        call_site=call_site or "unspecified",
+    )
+
 
 @lru_cache()
 def get_supabase_admin() -> Client:
     """
     Get Supabase client with service_role key (admin access)
-    Use for backend operations that bypass RLS
+    Use for backend operations that bypass RLS; never for sign-in / sign-up
+    (use get_supabase_client(), one per request)
     """
     try:
-        client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_SERVICE_ROLE_KEY
-        )
+        client = _create_client(settings.SUPABASE_SERVICE_ROLE_KEY, _AdminClient)
         logger.info("Supabase admin client initialized")
         return client
     except Exception as e:
@@ -29,12 +246,10 @@ def get_supabase_client(access_token: str = None) -> Client:
     """
     Get Supabase client with optional user token
     If token provided, RLS policies will be enforced for that user
+    Connections come from the shared pools, so creating one per request is cheap
     """
     try:
-        client = create_client(
-            settings.SUPABASE_URL,
-            settings.SUPABASE_ANON_KEY
-        )
+        client = _create_client(settings.SUPABASE_ANON_KEY)
         
         if access_token:
             # Set user session for RLS
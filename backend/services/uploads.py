@@ -0,0 +1,142 @@
+from dataclasses import dataclass, field
+from typing import IO, Dict, Optional
+import tempfile
+
+from fastapi import Request
+from multipart.multipart import MultipartParser, parse_options_header
+
+# Surcoût maximal toléré pour l'enveloppe multipart (boundary, en-têtes, autres champs)
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+SNIFF_BYTES = 512
+
+# Types acceptés, détectés depuis les premiers octets du fichier : (content-type, extension)
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ("image/jpeg", "jpg")),
+    (b"\x89PNG\r\n\x1a\n", ("image/png", "png")),
+)
+
+
+class UploadError(Exception):
+    """Invalid upload; the message is safe to return to the client"""
+
+
+class UploadTooLarge(UploadError):
+    pass
+
+
+@dataclass
+class ReceivedFile:
+    """File part spooled to a temporary file on disk (never fully held in memory)"""
+    file: IO[bytes]
+    size: int
+    filename: Optional[str]
+    head: bytes
+
+    def close(self) -> None:
+        self.file.close()
+
+
+def sniff_image_type(head: bytes):
+    """(content-type, extension) from magic bytes, or None if not an accepted image"""
+    for signature, detected in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return detected
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ("image/webp", "webp")
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith((b"<?xml", b"<svg", b"<!doctype svg")) and b"<svg" in head.lower():
+        return ("image/svg+xml", "svg")
+    return None
+
+
+@dataclass
+class _PartState:
+    headers: Dict[bytes, bytes] = field(default_factory=dict)
+    header_field: bytes = b""
+    header_value: bytes = b""
+    is_target: bool = False
+
+
+async def receive_file(request: Request, field_name: str, max_bytes: int) -> ReceivedFile:
+    """
+    Stream a multipart/form-data body and spool the `field_name` part to disk
+    The size cap is enforced while reading: the body is abandoned as soon as
+    the part (or the whole request) goes over the limit
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_bytes + MULTIPART_OVERHEAD_BYTES:
+        raise UploadTooLarge("File too large")
+
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise UploadError("Expected a multipart/form-data body")
+
+    spool = tempfile.TemporaryFile(buffering=0)
+    part = _PartState()
+    received = {"size": 0, "filename": None, "found": False, "head": b""}
+
+    def on_part_begin():
+        nonlocal part
+        part = _PartState()
+
+    def on_header_field(data, start, end):
+        part.header_field += data[start:end]
+
+    def on_header_value(data, start, end):
+        part.header_value += data[start:end]
+
+    def on_header_end():
+        part.headers[part.header_field.strip().lower()] = part.header_value.strip()
+        part.header_field = b""
+        part.header_value = b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(part.headers.get(b"content-disposition", b""))
+        if disposition.get(b"name", b"").decode() == field_name and not received["found"]:
+            part.is_target = True
+            received["found"] = True
+            filename = disposition.get(b"filename")
+            received["filename"] = filename.decode("utf-8", "replace") if filename else None
+
+    def on_part_data(data, start, end):
+        if not part.is_target:
+            return
+        chunk = data[start:end]
+        received["size"] += len(chunk)
+        if received["size"] > max_bytes:
+            raise UploadTooLarge("File too large")
+        if len(received["head"]) < SNIFF_BYTES:
+            received["head"] += chunk[:SNIFF_BYTES - len(received["head"])]
+        spool.write(chunk)
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+    })
+
+    try:
+        total = 0
+        async for chunk in request.stream():
+            total += len(chunk)
+            if total > max_bytes + MULTIPART_OVERHEAD_BYTES:
+                raise UploadTooLarge("File too large")
+            parser.write(chunk)
+        parser.finalize()
+    except UploadError:
+        spool.close()
+        raise
+    except Exception as e:
+        spool.close()
+        raise UploadError(f"Malformed multipart body: {e}") from e
+
+    if not received["found"]:
+        spool.close()
+        raise UploadError(f"Missing '{field_name}' file field")
+
+    spool.seek(0)
+    return ReceivedFile(file=spool, size=received["size"], filename=received["filename"], head=received["head"])
@@ -0,0 +1,217 @@
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional, Set
+import asyncio
+import logging
+import sqlite3
+import time
+
+from anyio import to_thread
+from fastapi import Request
+from supabase import Client
+
+from config import get_settings
+from services.cache import TTLCache
+from services.rate_limit import client_address
+from services.supabase_client import execute
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def viewer_key(request: Request) -> int:
+    """Client identity for deduplication: client address (see client_address) and User-Agent"""
+    return hash((client_address(request), request.headers.get("user-agent", "")))
+
+
+class ViewCounter:
+    """
+    Profile views counted in memory and written as per-profile deltas by a
+    single increment_entrepreneur_views call, `flush_seconds` after the
+    first unsaved view
+
+    A client viewing the same profile again within `dedup_seconds` is
+    counted once. Deltas of a failed write are merged back and retried with
+    the next flush; drain() must run on shutdown, and what it could not
+    write is kept in the `spool_path` SQLite file until restore() at the
+    next start
+    """
+
+    def __init__(self, flush_seconds: float, dedup_seconds: float, dedup_size: int, spool_path: Optional[Path] = None):
+        self.flush_seconds = flush_seconds
+        self.spool_path = spool_path
+        self._pending: Dict[str, int] = {}
+        self._seen = TTLCache(dedup_size, dedup_seconds)
+        self._supabase: Optional[Client] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self.recorded = 0
+        self.deduplicated = 0
+        self.written = 0
+        self.failures = 0
+
+    def record(self, entrepreneur_id: str, viewer: int, supabase: Client) -> bool:
+        """Count a view unless the viewer saw this profile recently; returns whether it was counted"""
+        key = (entrepreneur_id, viewer)
+        if self._seen.get(key) is not None:
+            self.deduplicated += 1
+            return False
+        self._seen.set(key, True)
+        self._pending[entrepreneur_id] = self._pending.get(entrepreneur_id, 0) + 1
+        self._supabase = supabase
+        self.recorded += 1
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_seconds, self._flush_in_background)
+        return True
+
+    def pending(self, entrepreneur_id: Optional[str] = None) -> int:
+        """Views not written yet, of one profile or in total"""
+        if entrepreneur_id is not None:
+            return self._pending.get(entrepreneur_id, 0)
+        return sum(self._pending.values())
+
+    def _flush_in_background(self) -> None:
+        self._timer = None
+        task = asyncio.ensure_future(self._flush_logged())
+        # Référence conservée jusqu'à la fin de la tâche (sinon elle peut être collectée)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush_logged(self) -> None:
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"View counter flush failed: {e}")
+            # Les deltas ont été remis en attente : nouvel essai au prochain intervalle
+            if self._pending and self._timer is None:
+                self._timer = asyncio.get_running_loop().call_later(self.flush_seconds, self._flush_in_background)
+
+    async def flush(self) -> int:
+        """Write the pending deltas in one call; returns the number of profiles written"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            deltas, self._pending = self._pending, {}
+            if not deltas:
+                return 0
+            try:
+                await execute(self._supabase.rpc('increment_entrepreneur_views', {'deltas': deltas}), call_site="views.flush")
+            except Exception:
+                self.failures += 1
+                for entrepreneur_id, count in deltas.items():
+                    self._pending[entrepreneur_id] = self._pending.get(entrepreneur_id, 0) + count
+                raise
+            self.written += sum(deltas.values())
+            return len(deltas)
+
+    # ------------------------------------------------------------------
+    # Spool SQLite des vues non écrites à l'arrêt (appelé dans les threads du pool)
+
+    def _open_spool(self) -> sqlite3.Connection:
+        self.spool_path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(self.spool_path))
+        db.execute("CREATE TABLE IF NOT EXISTS views (entrepreneur_id TEXT PRIMARY KEY, views INTEGER NOT NULL)")
+        return db
+
+    def _spool_add(self, deltas: Dict[str, int]) -> None:
+        db = self._open_spool()
+        try:
+            with db:
+                db.executemany(
+                    "INSERT INTO views (entrepreneur_id, views) VALUES (?, ?) "
+                    "ON CONFLICT (entrepreneur_id) DO UPDATE SET views = views + excluded.views",
+                    list(deltas.items()),
+                )
+        finally:
+            db.close()
+
+    def _spool_take(self) -> Dict[str, int]:
+        if not self.spool_path.exists():
+            return {}
+        db = self._open_spool()
+        try:
+            with db:
+                rows = db.execute("SELECT entrepreneur_id, views FROM views").fetchall()
+                db.execute("DELETE FROM views")
+        finally:
+            db.close()
+        return dict(rows)
+
+    async def restore(self, supabase: Client) -> int:
+        """Move the views spooled by the last shutdown back to the pending deltas (startup); returns their number"""
+        if self.spool_path is None:
+            return 0
+        deltas = await to_thread.run_sync(self._spool_take)
+        if not deltas:
+            return 0
+        for entrepreneur_id, count in deltas.items():
+            self._pending[entrepreneur_id] = self._pending.get(entrepreneur_id, 0) + count
+        self._supabase = supabase
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.flush_seconds, self._flush_in_background)
+        restored = sum(deltas.values())
+        logger.info(f"{restored} profile view(s) restored from {self.spool_path}")
+        return restored
+
+    async def drain(self, timeout: float) -> None:
+        """
+        Write the pending views now (shutdown); a failed write is retried
+        with backoff for at most `timeout` seconds, then the views still
+        pending are spooled to disk (or, without a spool, dropped and logged)
+        """
+        deadline = time.monotonic() + timeout
+        # Écriture déjà lancée par le minuteur : terminée avant le drainage
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        attempt = 0
+        while self._pending and self._supabase is not None:
+            try:
+                await self.flush()
+            except Exception as e:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                delay = min(remaining, 0.25 * 2 ** attempt)
+                logger.warning(f"{self.pending()} profile view(s) not written, retrying in {delay:.2f}s: {e}")
+                await asyncio.sleep(delay)
+                attempt += 1
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        deltas, self._pending = self._pending, {}
+        if self.spool_path is not None:
+            try:
+                await to_thread.run_sync(self._spool_add, deltas)
+                logger.warning(f"{sum(deltas.values())} profile view(s) kept in {self.spool_path} until the next start")
+                return
+            except Exception as e:
+                logger.error(f"Profile views could not be spooled to {self.spool_path}: {e}")
+        logger.error(f"{sum(deltas.values())} profile view(s) could not be written and were dropped")
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending(),
+            "recorded": self.recorded,
+            "deduplicated": self.deduplicated,
+            "written": self.written,
+            "failures": self.failures,
+        }
+
+
+@lru_cache()
+def get_view_counter() -> ViewCounter:
+    path = Path(settings.VIEW_SPOOL_PATH)
+    return ViewCounter(
+        settings.VIEW_FLUSH_SECONDS,
+        settings.VIEW_DEDUP_SECONDS,
+        settings.VIEW_DEDUP_MAX_ENTRIES,
+        path if path.is_absolute() else BACKEND_DIR / path,
+    )
@@ -0,0 +1,23 @@
+import pytest
+
+
+@pytest.fixture
+def fake_supabase(monkeypatch):
+    """
+    benchmarks.fake_supabase installed as the transport of the Supabase
+    connection pools (real clients, in-process HTTP), removed after the test
+    """
+    from benchmarks.fake_supabase import FakeSupabase
+    from config import get_settings
+    from services import supabase_client
+    from services.response_cache import get_response_cache
+
+    settings = get_settings()
+    fake = FakeSupabase(jwt_secret=settings.SUPABASE_JWT_SECRET, audience=settings.SUPABASE_JWT_AUDIENCE)
+    # Valeur d'origine enregistrée par monkeypatch, rétablie à la fin du test
+    monkeypatch.setattr(supabase_client, "get_http_transport", supabase_client.get_http_transport)
+    fake.install()
+    get_response_cache.cache_clear()
+    yield fake
+    supabase_client.get_supabase_admin.cache_clear()
+    get_response_cache.cache_clear()
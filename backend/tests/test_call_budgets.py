@@ -0,0 +1,100 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+from config import get_settings
+from services.call_budget import route_budget
+
+settings = get_settings()
+
+PROFILE = {
+    "profile_type": "freelance",
+    "first_name": "Awa",
+    "last_name": "Diallo",
+    "description": "Identités visuelles pour les PME.",
+    "tags": ["design"],
+    "phone": "+22100000000",
+    "whatsapp": "+22100000000",
+    "email": "awa@example.com",
+    "country_code": "SN",
+    "city": "Dakar",
+}
+
+
+def _png() -> bytes:
+    # Octets magiques PNG : le type est détecté sans décoder l'image
+    return b"\x89PNG\r\n\x1a\n" + bytes(1024)
+
+
+@pytest.fixture
+def client(fake_supabase, monkeypatch):
+    from server import app
+
+    assert settings.call_budget_mode == "raise"
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    monkeypatch.setattr(settings, "LOGO_PIPELINE_ENABLED", False)
+    fake_supabase.seed(50, 0)
+    return TestClient(app)
+
+
+def test_budgeted_routes_stay_within_budget(client, fake_supabase):
+    from server import app
+
+    published = [row["id"] for row in fake_supabase.store.tables["entrepreneurs_public"]]
+    served = []
+
+    def call(method, path, route, expected, **kwargs):
+        response = client.request(method, path, **kwargs)
+        # Dépassement de budget : réponse 500 de CallBudgetMiddleware (CALL_BUDGET_MODE=raise)
+        assert "Supabase calls, budget" not in response.text, response.text
+        assert response.status_code == expected, (method, path, response.status_code, response.text)
+        served.append((method, route))
+        return response
+
+    # Comptes
+    call("POST", "/api/auth/register", "/api/auth/register", 201, json={"email": "new@example.com", "password": "password123"})
+    session = call("POST", "/api/auth/login", "/api/auth/login", 200, json={"email": "new@example.com", "password": "password123"}).json()
+    auth = {"Authorization": f"Bearer {session['access_token']}"}
+    call("GET", "/api/auth/me", "/api/auth/me", 200, headers=auth)
+    # Le client admin n'a pas de session à rafraîchir : 401, budget vérifié quand même
+    call("POST", "/api/auth/refresh", "/api/auth/refresh", 401, headers=auth)
+
+    # Annuaire public
+    call("GET", "/api/entrepreneurs", "/api/entrepreneurs", 200, params={"limit": 5})
+    page = call("GET", "/api/entrepreneurs", "/api/entrepreneurs", 200, params={"limit": 5, "cursor": ""}).json()
+    call("GET", "/api/entrepreneurs", "/api/entrepreneurs", 200, params={"limit": 5, "cursor": page["next_cursor"]})
+    call("GET", "/api/entrepreneurs", "/api/entrepreneurs", 200, params={"search": "Société"})
+    call("GET", "/api/entrepreneurs/facets", "/api/entrepreneurs/facets", 200)
+    call("GET", "/api/entrepreneurs/facets", "/api/entrepreneurs/facets", 200, params={"search": "Société"})
+    call("GET", "/api/entrepreneurs/batch", "/api/entrepreneurs/batch", 200, params={"ids": ",".join(published[:settings.BATCH_MAX_IDS])})
+    call("POST", "/api/entrepreneurs/batch", "/api/entrepreneurs/batch", 200, json={"ids": published[:settings.BATCH_MAX_IDS]})
+    call("GET", "/api/entrepreneurs/batch/contacts", "/api/entrepreneurs/batch/contacts", 200, params={"ids": ",".join(published[:settings.BATCH_CONTACTS_MAX_IDS])})
+    call("POST", "/api/entrepreneurs/batch/contacts", "/api/entrepreneurs/batch/contacts", 200, json={"ids": published[:settings.BATCH_CONTACTS_MAX_IDS]})
+    call("GET", f"/api/entrepreneurs/{published[0]}", "/api/entrepreneurs/{entrepreneur_id}", 200)
+    call("GET", f"/api/entrepreneurs/{published[0]}/contact", "/api/entrepreneurs/{entrepreneur_id}/contact", 200)
+    call("GET", "/api/stats", "/api/stats", 200)
+    call("GET", f"/api/stats/entrepreneurs/{published[0]}", "/api/stats/entrepreneurs/{entrepreneur_id}", 200)
+    call("POST", "/api/contact", "/api/contact", 201, json={"name": "Visiteur", "email": "visitor@example.com", "subject": "Question", "message": "Bonjour"})
+    call("GET", "/api/contact/stats", "/api/contact/stats", 200)
+
+    # Profil de l'utilisateur connecté
+    call("PUT", "/api/entrepreneurs/me/draft", "/api/entrepreneurs/me/draft", 200, headers=auth, json={"form_data": {"first_name": "Awa"}, "current_step": 1})
+    call("GET", "/api/entrepreneurs/me/draft", "/api/entrepreneurs/me/draft", 200, headers=auth)
+    created = call("POST", "/api/entrepreneurs/me", "/api/entrepreneurs/me", 201, headers=auth, json=PROFILE).json()
+    call("GET", "/api/entrepreneurs/me", "/api/entrepreneurs/me", 200, headers=auth)
+    call("PUT", "/api/entrepreneurs/me", "/api/entrepreneurs/me", 200, headers=auth, json={"city": "Thiès"})
+    call("PATCH", "/api/entrepreneurs/me/status", "/api/entrepreneurs/me/status", 200, headers=auth, json={"status": "published"})
+    logo = call("POST", "/api/storage/upload-logo", "/api/storage/upload-logo", 200, headers=auth, files={"file": ("logo.png", io.BytesIO(_png()), "image/png")}).json()
+    call("DELETE", f"/api/storage/delete-logo/{logo['filename'].rpartition('/')[2]}", "/api/storage/delete-logo/{filename}", 403, headers=auth)
+    call("DELETE", "/api/entrepreneurs/me", "/api/entrepreneurs/me", 204, headers=auth)
+    call("DELETE", f"/api/entrepreneurs/{created['id']}", "/api/entrepreneurs/{entrepreneur_id}", 404, headers=auth)
+    call("POST", "/api/auth/logout", "/api/auth/logout", 200, headers=auth)
+
+    # Chaque route déclarant un budget a été appelée au moins une fois
+    budgeted = {
+        (method, route.path)
+        for route in app.routes if route_budget(route) is not None
+        for method in route.methods - {"HEAD"}
+    }
+    assert budgeted == set(served)
@@ -0,0 +1,38 @@
+import httpx
+import pytest
+from postgrest.exceptions import APIError
+
+from services.circuit_breaker import is_upstream_failure
+
+
+def _api_error(code):
+    return APIError({"code": code, "message": "error", "details": None, "hint": None})
+
+
+def _status_error(status_code):
+    request = httpx.Request("GET", "https://example.supabase.co/rest/v1/entrepreneurs")
+    response = httpx.Response(status_code, request=request)
+    return httpx.HTTPStatusError(f"HTTP {status_code}", request=request, response=response)
+
+
+@pytest.mark.parametrize("error,expected", [
+    # Violation de contrainte (unique, check) : la base a répondu
+    (_api_error("23505"), False),
+    (_api_error("23514"), False),
+    (_api_error("PGRST116"), False),
+    # Annulation sur statement_timeout, connexions épuisées
+    (_api_error("57014"), True),
+    (_api_error("53300"), True),
+    (_api_error("PGRST001"), True),
+    # Page d'erreur de passerelle : code = statut HTTP
+    (_api_error("502"), True),
+    (_api_error("404"), False),
+    (httpx.ReadTimeout("timed out"), True),
+    (httpx.ConnectError("connection refused"), True),
+    (_status_error(503), True),
+    (_status_error(500), True),
+    (_status_error(429), False),
+    (ValueError("bad input"), False),
+])
+def test_is_upstream_failure(error, expected):
+    assert is_upstream_failure(error) is expected
@@ -0,0 +1,172 @@
+import asyncio
+import logging
+
+import httpx
+from postgrest.exceptions import APIError
+
+from services import contact_queue
+from services.contact_queue import ContactQueue
+
+
+class _Client:
+    """Stands for the Supabase client: the upsert builder is (rows, ignore_duplicates)"""
+
+    def table(self, name):
+        assert name == "contact_messages"
+        return self
+
+    def upsert(self, rows, ignore_duplicates=False, returning=None):
+        return rows, ignore_duplicates
+
+
+class _ContactMessages:
+    """
+    contact_messages as PostgREST would store it (primary key id, duplicates
+    ignored), behind an execute() stand-in that can fail
+    """
+
+    def __init__(self, monkeypatch):
+        self.rows = {}
+        self.calls = 0
+        # Avant l'écriture (panne) ou après (réponse perdue : ambigu)
+        self.fail_before = 0
+        self.fail_after = 0
+        self.hang = False
+        monkeypatch.setattr(contact_queue, "execute", self.execute)
+
+    async def execute(self, query, call_site=None):
+        rows, ignore_duplicates = query
+        assert ignore_duplicates
+        self.calls += 1
+        if self.hang:
+            await asyncio.sleep(60)
+        if self.fail_before > 0:
+            self.fail_before -= 1
+            raise httpx.ConnectError("connection refused")
+        if any(row["email"] == "invalid" for row in rows):
+            raise APIError({"code": "23514", "message": "violates check constraint", "details": None, "hint": None})
+        for row in rows:
+            self.rows.setdefault(row["id"], row)
+        if self.fail_after > 0:
+            self.fail_after -= 1
+            raise httpx.ReadTimeout("timed out")
+
+
+def _queue(tmp_path, batch_size=10):
+    return ContactQueue(tmp_path / "contact.sqlite3", batch_size=batch_size, poll_seconds=60, max_backoff=0.01)
+
+
+def _message(index, email=None):
+    return {"name": f"Nom {index}", "email": email or f"user{index}@example.com", "subject": "Sujet", "message": "Bonjour"}
+
+
+def test_spooled_messages_are_sent_after_a_restart(monkeypatch, tmp_path):
+    table = _ContactMessages(monkeypatch)
+
+    async def before_restart():
+        queue = _queue(tmp_path)
+        rows = [await queue.enqueue(_message(index)) for index in range(3)]
+        # Arrêt sans client : rien n'est envoyé, le spool reste sur disque
+        await queue.stop(timeout=1)
+        return rows
+
+    rows = asyncio.run(before_restart())
+    assert table.rows == {}
+
+    async def after_restart():
+        queue = _queue(tmp_path)
+        await queue.start(_Client())
+        for _ in range(100):
+            if len(table.rows) == 3:
+                break
+            await asyncio.sleep(0.01)
+        await queue.stop(timeout=1)
+        return queue
+
+    queue = asyncio.run(after_restart())
+    assert sorted(table.rows) == sorted(row["id"] for row in rows)
+    assert queue.stats()["written"] == 3
+
+
+def test_batch_retried_after_an_upstream_failure_is_not_duplicated(monkeypatch, tmp_path):
+    table = _ContactMessages(monkeypatch)
+    # Lot écrit mais réponse perdue, puis panne franche
+    table.fail_after = 1
+    table.fail_before = 1
+    queue = _queue(tmp_path)
+    queue._supabase = _Client()
+
+    async def scenario():
+        rows = [await queue.enqueue(_message(index)) for index in range(4)]
+        for _ in range(2):
+            try:
+                await queue.flush()
+            except httpx.HTTPError:
+                pass
+        assert await queue.flush() == 4
+        return rows
+
+    rows = asyncio.run(scenario())
+    assert table.calls == 3
+    assert sorted(table.rows) == sorted(row["id"] for row in rows)
+    assert asyncio.run(asyncio.to_thread(queue._counts)) == (0, 0)
+
+
+def test_rejected_batch_is_split_and_bad_rows_marked_dead(monkeypatch, tmp_path, caplog):
+    table = _ContactMessages(monkeypatch)
+    queue = _queue(tmp_path)
+    queue._supabase = _Client()
+
+    async def scenario():
+        good = [await queue.enqueue(_message(index)) for index in range(3)]
+        bad = await queue.enqueue(_message(3, email="invalid"))
+        return good, bad
+
+    with caplog.at_level(logging.ERROR, logger="services.contact_queue"):
+        good, bad = asyncio.run(scenario())
+        assert asyncio.run(queue.flush()) == 3
+
+    assert sorted(table.rows) == sorted(row["id"] for row in good)
+    assert queue.stats()["dead"] == 1
+    # La ligne rejetée reste dans le spool, marquée morte, et n'est plus renvoyée
+    assert asyncio.run(asyncio.to_thread(queue._counts)) == (0, 1)
+    calls = table.calls
+    assert asyncio.run(queue.flush()) == 0 and table.calls == calls
+    assert "rejected, kept in the spool as dead" in caplog.text
+
+
+def test_stop_drains_within_the_timeout(monkeypatch, tmp_path):
+    table = _ContactMessages(monkeypatch)
+
+    async def scenario():
+        queue = _queue(tmp_path, batch_size=2)
+        await queue.start(_Client())
+        await asyncio.sleep(0)
+        for index in range(5):
+            await queue.enqueue(_message(index))
+        await queue.stop(timeout=5)
+
+    asyncio.run(scenario())
+    assert len(table.rows) == 5
+    assert asyncio.run(asyncio.to_thread(_queue(tmp_path)._counts)) == (0, 0)
+
+
+def test_stop_leaves_undrained_messages_on_disk(monkeypatch, tmp_path, caplog):
+    table = _ContactMessages(monkeypatch)
+    table.hang = True
+
+    async def scenario():
+        queue = _queue(tmp_path)
+        queue._supabase = _Client()
+        for index in range(3):
+            await queue.enqueue(_message(index))
+        started = asyncio.get_running_loop().time()
+        await queue.stop(timeout=0.2)
+        return asyncio.get_running_loop().time() - started
+
+    with caplog.at_level(logging.ERROR, logger="services.contact_queue"):
+        elapsed = asyncio.run(scenario())
+    assert elapsed < 2
+    assert table.rows == {}
+    assert "3 message(s) kept in" in caplog.text
+    assert asyncio.run(asyncio.to_thread(_queue(tmp_path)._counts)) == (3, 0)
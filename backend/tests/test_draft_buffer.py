@@ -0,0 +1,61 @@
+import asyncio
+import logging
+
+from services import draft_buffer
+from services.draft_buffer import DraftWriteBuffer
+
+
+class _Client:
+    """Stands for the Supabase client: the upsert builder is the user id"""
+
+    def table(self, name):
+        return self
+
+    def upsert(self, row, on_conflict=None):
+        return row["user_id"]
+
+
+def _failing(monkeypatch, failures):
+    """execute() stand-in failing the first `failures[user_id]` writes of each user"""
+    written = []
+
+    async def execute(user_id, call_site=None):
+        if failures.get(user_id, 0) > 0:
+            failures[user_id] -= 1
+            raise ConnectionError("PostgREST unavailable")
+        written.append(user_id)
+
+    monkeypatch.setattr(draft_buffer, "execute", execute)
+    return written
+
+
+def test_flush_all_retries_failed_writes(monkeypatch):
+    written = _failing(monkeypatch, {"u1": 2})
+    buffer = DraftWriteBuffer(quiet_seconds=60, max_delay_seconds=600)
+
+    async def scenario():
+        await buffer.put("u1", {"step": 1}, 1, _Client())
+        await buffer.put("u2", {"step": 1}, 1, _Client())
+        await buffer.flush_all(timeout=5)
+
+    asyncio.run(scenario())
+    assert sorted(written) == ["u1", "u2"]
+    assert buffer.stats()["pending"] == 0
+    assert buffer.stats()["failures"] == 2
+
+
+def test_flush_all_logs_dropped_drafts(monkeypatch, caplog):
+    written = _failing(monkeypatch, {"u1": 1000})
+    buffer = DraftWriteBuffer(quiet_seconds=60, max_delay_seconds=600)
+
+    async def scenario():
+        await buffer.put("u1", {"step": 1}, 1, _Client())
+        await buffer.put("u2", {"step": 1}, 1, _Client())
+        await buffer.flush_all(timeout=0.3)
+
+    with caplog.at_level(logging.ERROR, logger=draft_buffer.__name__):
+        asyncio.run(scenario())
+    assert written == ["u2"]
+    assert buffer.stats()["pending"] == 0
+    dropped = [record.getMessage() for record in caplog.records if record.levelno == logging.ERROR]
+    assert dropped and "u1" in dropped[-1]
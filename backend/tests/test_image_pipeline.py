@@ -0,0 +1,40 @@
+import io
+
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+from PIL import ImageCms, features
+
+from services.image_pipeline import OUTPUT_FORMATS, _process_logo
+
+
+def _photo_with_metadata() -> bytes:
+    """PNG carrying an sRGB ICC profile, EXIF (camera, GPS) and XMP"""
+    exif = Image.Exif()
+    exif[0x010F] = "Camera"
+    exif[0x8825] = {1: "N", 2: (6.0, 22.0, 0.0)}
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 480), "orange").save(
+        buffer,
+        format="PNG",
+        icc_profile=ImageCms.ImageCmsProfile(ImageCms.createProfile("sRGB")).tobytes(),
+        exif=exif.tobytes(),
+        xmp=b"<x:xmpmeta xmlns:x='adobe:ns:meta/'/>",
+    )
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("output_format", sorted(OUTPUT_FORMATS))
+def test_variants_carry_no_metadata(output_format):
+    if not features.check(output_format):
+        pytest.skip(f"Pillow built without {output_format}")
+    logo = _process_logo(_photo_with_metadata(), output_format, 80, 256, {"small": 64}, 40_000_000)
+
+    assert set(logo.variants) == {"original", "small"}
+    for name, data in logo.variants.items():
+        with Image.open(io.BytesIO(data)) as image:
+            assert image.format == OUTPUT_FORMATS[output_format][0]
+            assert not image.info.get("icc_profile"), name
+            assert not image.info.get("exif"), name
+            assert not image.info.get("xmp"), name
+            assert len(image.getexif()) == 0, name
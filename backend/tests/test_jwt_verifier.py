@@ -0,0 +1,139 @@
+import asyncio
+import base64
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt import PyJWKClient
+from jwt.algorithms import RSAAlgorithm
+
+from config import get_settings
+from services import jwt_verifier
+from services.jwt_verifier import verify_access_token
+
+settings = get_settings()
+
+
+def _claims(**overrides):
+    now = int(time.time())
+    claims = {"sub": "user-1", "email": "a@example.com", "aud": settings.SUPABASE_JWT_AUDIENCE, "role": "authenticated", "iat": now, "exp": now + 3600}
+    claims.update(overrides)
+    return {key: value for key, value in claims.items() if value is not None}
+
+
+def _hs256(claims, secret=None):
+    return jwt.encode(claims, secret or settings.SUPABASE_JWT_SECRET, algorithm="HS256")
+
+
+def _verify(token):
+    return asyncio.run(verify_access_token(token))
+
+
+def test_valid_token_returns_its_claims():
+    claims = _verify(_hs256(_claims()))
+    assert claims["sub"] == "user-1" and claims["email"] == "a@example.com"
+
+
+@pytest.mark.parametrize("token,error", [
+    (lambda: _hs256(_claims(exp=int(time.time()) - 10)), jwt.ExpiredSignatureError),
+    (lambda: _hs256(_claims(aud="other")), jwt.InvalidAudienceError),
+    (lambda: _hs256(_claims(), secret="not-the-project-secret-not-the-project"), jwt.InvalidSignatureError),
+    (lambda: _hs256(_claims(sub=None)), jwt.MissingRequiredClaimError),
+])
+def test_invalid_tokens_are_rejected(token, error):
+    with pytest.raises(error):
+        _verify(token())
+
+
+def _unsigned(claims):
+    def part(value):
+        return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+    return f"{part({'alg': 'none', 'typ': 'JWT'})}.{part(claims)}."
+
+
+@pytest.mark.parametrize("token", [
+    lambda: _unsigned(_claims()),
+    lambda: jwt.encode(_claims(), settings.SUPABASE_JWT_SECRET, algorithm="HS384"),
+])
+def test_unsupported_algorithms_are_rejected(token):
+    with pytest.raises(jwt.InvalidAlgorithmError):
+        _verify(token())
+
+
+@pytest.mark.parametrize("role", ["anon", "service_role"])
+def test_project_api_keys_are_not_user_tokens(role):
+    # Forme des clés anon / service_role : signées avec le secret du projet, sans aud ni sub
+    key = _hs256({"iss": "supabase", "role": role, "iat": int(time.time()), "exp": int(time.time()) + 3600})
+    with pytest.raises(jwt.InvalidTokenError):
+        _verify(key)
+
+
+def test_hs256_without_secret_is_inconclusive(monkeypatch):
+    monkeypatch.setattr(settings, "SUPABASE_JWT_SECRET", None)
+    assert _verify(_hs256(_claims(), secret="any-secret-any-secret-any-secret-x")) is None
+
+
+class _JWKSClient(PyJWKClient):
+    """PyJWKClient answering from a dict instead of the JWKS endpoint, counting fetches"""
+
+    def __init__(self, keys):
+        super().__init__("https://example.supabase.co/auth/v1/.well-known/jwks.json", cache_keys=True, lifespan=600)
+        self.keys = keys
+        self.fetches = 0
+
+    def fetch_data(self):
+        self.fetches += 1
+        if self.keys is None:
+            raise jwt.PyJWKClientConnectionError("JWKS endpoint unreachable")
+        return {"keys": self.keys}
+
+
+@pytest.fixture
+def rsa_key():
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update(kid="key-1", alg="RS256", use="sig")
+    return private_key, jwk
+
+
+def _rs256(private_key, kid="key-1", **overrides):
+    return jwt.encode(_claims(**overrides), private_key, algorithm="RS256", headers={"kid": kid})
+
+
+def test_jwks_key_is_fetched_once_then_served_from_cache(monkeypatch, rsa_key):
+    private_key, jwk = rsa_key
+    client = _JWKSClient([jwk])
+    monkeypatch.setattr(jwt_verifier, "get_jwks_client", lambda: client)
+
+    assert _verify(_rs256(private_key))["sub"] == "user-1"
+    assert _verify(_rs256(private_key, sub="user-2"))["sub"] == "user-2"
+    assert client.fetches == 1
+    # Signature invalide avec une clé en cache : rejet sans nouveau téléchargement
+    other = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with pytest.raises(jwt.InvalidSignatureError):
+        _verify(_rs256(other))
+    assert client.fetches == 1
+
+
+def test_unknown_kid_refreshes_the_jwks(monkeypatch, rsa_key):
+    private_key, jwk = rsa_key
+    client = _JWKSClient([jwk])
+    monkeypatch.setattr(jwt_verifier, "get_jwks_client", lambda: client)
+    _verify(_rs256(private_key))
+
+    # Rotation : la nouvelle clé n'est pas dans le cache, le JWKS est retéléchargé
+    rotated = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    rotated_jwk = json.loads(RSAAlgorithm.to_jwk(rotated.public_key()))
+    rotated_jwk.update(kid="key-2", alg="RS256", use="sig")
+    client.keys = [jwk, rotated_jwk]
+
+    assert _verify(_rs256(rotated, kid="key-2"))["sub"] == "user-1"
+    assert client.fetches == 2
+
+
+def test_unreachable_jwks_is_inconclusive(monkeypatch, rsa_key):
+    private_key, _ = rsa_key
+    monkeypatch.setattr(jwt_verifier, "get_jwks_client", lambda: _JWKSClient(None))
+    assert _verify(_rs256(private_key)) is None
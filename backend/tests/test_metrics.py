@@ -0,0 +1,30 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from config import get_settings
+
+settings = get_settings()
+
+
+@pytest.fixture
+def client():
+    from server import app
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("environment,token,headers,expected", [
+    ("development", None, {}, 200),
+    ("production", None, {}, 404),
+    ("production", "metrics-secret", {}, 401),
+    ("production", "metrics-secret", {"Authorization": "Bearer wrong"}, 401),
+    ("production", "metrics-secret", {"Authorization": "Bearer metrics-secret"}, 200),
+])
+def test_metrics_need_a_token_outside_development(client, monkeypatch, environment, token, headers, expected):
+    monkeypatch.setattr(settings, "ENVIRONMENT", environment)
+    monkeypatch.setattr(settings, "METRICS_TOKEN", token)
+
+    response = client.get("/api/metrics", headers=headers)
+
+    assert response.status_code == expected
+    if expected == 200:
+        assert response.headers["content-type"].startswith("text/plain")
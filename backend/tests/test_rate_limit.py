@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from config import Settings, get_settings
+from middleware import AdmissionControlMiddleware
+from services import rate_limit
+from services.rate_limit import MemoryRateLimiter, get_rate_limiter
+
+settings = get_settings()
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+def test_bucket_refills_at_the_rule_rate(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock.monotonic)
+    limiter = MemoryRateLimiter(max_keys=10)
+
+    async def scenario():
+        # 2 requêtes / 10 s : un jeton toutes les 5 s
+        assert await limiter.acquire("k", 2, 10) == 0
+        assert await limiter.acquire("k", 2, 10) == 0
+        assert await limiter.acquire("k", 2, 10) == pytest.approx(5)
+        clock.now += 5
+        assert await limiter.acquire("k", 2, 10) == 0
+        # Seau plein au bout de 10 s, jamais au-delà de la capacité
+        clock.now += 60
+        assert await limiter.acquire("k", 2, 10, cost=2) == 0
+        assert await limiter.acquire("k", 2, 10) > 0
+        # Autre clé : seau distinct
+        assert await limiter.acquire("other", 2, 10) == 0
+
+    asyncio.run(scenario())
+
+
+def test_least_recently_used_buckets_are_dropped():
+    limiter = MemoryRateLimiter(max_keys=2)
+
+    async def scenario():
+        for key in ("a", "b", "c"):
+            await limiter.acquire(key, 1, 60)
+        assert limiter.stats()["keys"] == 2
+        # "a" oublié : seau de nouveau plein
+        assert await limiter.acquire("a", 1, 60) == 0
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def client(fake_supabase, monkeypatch):
+    from server import app
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "memory")
+    monkeypatch.setattr(rate_limit, "RULES", {**rate_limit.RULES, "entrepreneurs.batch": (10, 60), "entrepreneurs.search": (1, 60)})
+    get_rate_limiter.cache_clear()
+    fake_supabase.seed(30, 0)
+    yield TestClient(app)
+    get_rate_limiter.cache_clear()
+
+
+def test_batch_is_charged_per_id_and_answers_429_with_retry_after(client, fake_supabase):
+    ids = [row["id"] for row in fake_supabase.store.tables["entrepreneurs_public"][:6]]
+
+    assert client.post("/api/entrepreneurs/batch", json={"ids": ids}).status_code == 200
+    response = client.post("/api/entrepreneurs/batch", json={"ids": ids})
+
+    # 6 + 6 identifiants pour 10 jetons
+    assert response.status_code == 429
+    # 2 jetons manquants à 10 / 60 s
+    assert response.headers["Retry-After"] == "12"
+    assert client.get("/api/entrepreneurs/batch", params={"ids": ",".join(ids[:4])}).status_code == 200
+
+
+def test_forwarded_for_is_ignored_by_default():
+    assert Settings.model_fields["TRUSTED_PROXY_HOPS"].default == 0
+
+
+@pytest.mark.parametrize("hops,second_status", [(0, 429), (1, 200)])
+def test_forwarded_for_is_only_trusted_behind_a_proxy(client, monkeypatch, hops, second_status):
+    monkeypatch.setattr(settings, "TRUSTED_PROXY_HOPS", hops)
+
+    first = client.get("/api/entrepreneurs", params={"search": "web"}, headers={"X-Forwarded-For": "198.51.100.1"})
+    second = client.get("/api/entrepreneurs", params={"search": "web"}, headers={"X-Forwarded-For": "198.51.100.2"})
+
+    assert first.status_code == 200
+    # hops=0 : en-tête ignoré, les deux requêtes partagent le seau de l'adresse du pair
+    assert second.status_code == second_status
+
+
+def test_admission_control_sheds_requests_beyond_the_queue():
+    release = asyncio.Event()
+    served = []
+
+    async def app(scope, receive, send):
+        await release.wait()
+        served.append(scope["path"])
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    middleware = AdmissionControlMiddleware(app, max_concurrent=1, max_queue=1, queue_timeout=0.2)
+
+    async def call(path):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {"type": "http", "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"", "headers": []}
+        await middleware(scope, receive, send)
+        start = messages[0]
+        return start["status"], dict(start["headers"])
+
+    async def scenario():
+        running = asyncio.ensure_future(call("/api/a"))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(call("/api/b"))
+        await asyncio.sleep(0)
+        # File pleine : refus immédiat
+        status, headers = await call("/api/c")
+        assert status == 503 and headers[b"retry-after"] == b"1"
+        # En attente au-delà de queue_timeout : refus
+        assert (await queued)[0] == 503
+        # Les contrôles de santé ne sont jamais mis en file
+        health = asyncio.ensure_future(call("/health"))
+        release.set()
+        assert (await running)[0] == 200
+        assert (await health)[0] == 200
+
+    asyncio.run(scenario())
+    assert sorted(served) == ["/api/a", "/health"]
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from config import get_settings
+from services.response_cache import DIRECTORY_TAG, MemoryResponseCache, profile_tag
+
+settings = get_settings()
+
+
+def test_bumped_tag_makes_entries_stale():
+    cache = MemoryResponseCache(max_size=10, ttl_seconds=60)
+
+    async def scenario():
+        versions = await cache.tag_versions([DIRECTORY_TAG, profile_tag("a")])
+        await cache.set("page", b"[1]", {DIRECTORY_TAG: versions[DIRECTORY_TAG]})
+        await cache.set("a", b"{a}", {profile_tag("a"): versions[profile_tag("a")]})
+        await cache.set("b", b"{b}", await cache.tag_versions([profile_tag("b")]))
+        await cache.invalidate_tags([DIRECTORY_TAG, profile_tag("a")])
+        return await cache.get_many(["page", "a", "b"])
+
+    # Seule l'entrée dont aucun tag n'a changé reste servie
+    assert asyncio.run(scenario()) == {"b": b"{b}"}
+
+
+def test_write_during_the_fetch_is_not_hidden_by_the_cached_entry():
+    cache = MemoryResponseCache(max_size=10, ttl_seconds=60)
+
+    async def scenario():
+        # Versions lues avant la lecture PostgREST, écriture pendant la lecture
+        versions = await cache.tag_versions([DIRECTORY_TAG])
+        await cache.invalidate_tags([DIRECTORY_TAG])
+        await cache.set("page", b"[old]", versions)
+        return await cache.get("page")
+
+    assert asyncio.run(scenario()) is None
+
+
+@pytest.fixture
+def owner(fake_supabase, monkeypatch):
+    """Client plus the auth header of the owner of a seeded published profile"""
+    from server import app
+
+    assert settings.RESPONSE_CACHE_BACKEND == "memory"
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    fake_supabase.seed(20, 0)
+    profile = fake_supabase.store.tables["entrepreneurs_public"][0]
+    fake_supabase.store.tables.setdefault("user_profiles", []).append(
+        {"id": "profile-owner", "user_id": profile["user_id"], "first_name": "Awa", "last_name": "Diallo", "has_profile": True}
+    )
+    token = fake_supabase.mint_token(profile["user_id"], "owner@example.com")
+    return TestClient(app), {"Authorization": f"Bearer {token}"}, profile["id"]
+
+
+def test_profile_update_stops_serving_cached_list_and_detail(owner, fake_supabase):
+    client, auth, entrepreneur_id = owner
+    list_params = {"limit": 100, "sort_by": "created_at", "sort_order": "asc"}
+
+    def descriptions():
+        page = client.get("/api/entrepreneurs", params=list_params).json()
+        listed = next(row["description"] for row in page if row["id"] == entrepreneur_id)
+        return listed, client.get(f"/api/entrepreneurs/{entrepreneur_id}").json()["description"]
+
+    before = descriptions()
+    requests = fake_supabase.requests["postgrest"]
+    # Deuxième lecture : servie par le cache de réponses
+    assert descriptions() == before
+    assert fake_supabase.requests["postgrest"] == requests
+
+    updated = client.put("/api/entrepreneurs/me", headers=auth, json={"description": "Nouvelle description du profil."})
+    assert updated.status_code == 200
+
+    assert descriptions() == ("Nouvelle description du profil.",) * 2
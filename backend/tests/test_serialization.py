@@ -0,0 +1,95 @@
+from datetime import datetime
+
+import pytest
+
+from models.entrepreneur import EntrepreneurPublic
+from routers.entrepreneurs import _PUBLIC_ROWS, _sanitize_profile
+
+TIMESTAMP_FIELDS = ("created_at", "updated_at", "first_saved_at")
+
+
+def _row(**overrides):
+    """entrepreneurs_public row as returned by PostgREST, private columns included"""
+    row = {
+        "id": "6f1c2a34-1d5e-4b8a-9c61-2f0e5d7a9b10",
+        "user_id": "0b7e4c52-8a1f-4d3e-b6c9-5e2a1f7d8c34",
+        "profile_type": "freelance",
+        "first_name": "Awa",
+        "last_name": "Diallo",
+        "company_name": "Studio Awa",
+        "activity_name": "Design graphique",
+        "logo_url": None,
+        "description": "Identités visuelles pour les PME.",
+        "tags": ["design", "web"],
+        "phone": "+22900000000",
+        "whatsapp": "+22900000000",
+        "email": "awa@example.com",
+        "website": "https://awa.example.com",
+        "country_code": "SN",
+        "city": "Dakar",
+        "portfolio": [{"type": "link", "value": "https://dribbble.com/awa", "position": 1}],
+        "rating": 4.5,
+        "review_count": 12,
+        "is_premium": False,
+        "premium_until": None,
+        "status": "published",
+        "first_saved_at": "2024-03-01T09:15:00.123456+00:00",
+        "created_at": "2024-03-01T09:15:00.123456+00:00",
+        "updated_at": "2024-03-02T10:00:00+00:00",
+    }
+    row.update(overrides)
+    return row
+
+
+def _without(row, *fields):
+    return {key: value for key, value in row.items() if key not in fields}
+
+
+def _reference(row):
+    """What the routes returned before TrustedRowSerializer: _sanitize_profile + model_validate"""
+    # Portfolio NULL : lu comme absent (valeur par défaut du modèle), le modèle refusant None
+    if row.get("portfolio", ()) is None:
+        row = _without(row, "portfolio")
+    return EntrepreneurPublic.model_validate(_sanitize_profile(row)).model_dump(mode="json")
+
+
+def _normalized(payload):
+    # Même instant, écritures différentes : chaînes ISO de la base contre Z de Pydantic
+    return {
+        key: datetime.fromisoformat(value) if key in TIMESTAMP_FIELDS and value is not None else value
+        for key, value in payload.items()
+    }
+
+
+ROWS = {
+    "complete": _row(),
+    "tags_null": _row(tags=None),
+    "tags_missing": _without(_row(), "tags"),
+    "tags_empty": _row(tags=[]),
+    "portfolio_null": _row(portfolio=None),
+    "portfolio_missing": _without(_row(), "portfolio"),
+    "portfolio_images": _row(portfolio=[{"type": "image", "value": "logos/a.webp"}, {"type": "link", "value": "https://a.example.com"}]),
+    "first_saved_at_null": _row(first_saved_at=None),
+    "first_saved_at_missing": _without(_row(), "first_saved_at"),
+    "timestamps_utc_z": _row(created_at="2024-03-01T09:15:00Z", updated_at="2024-03-01T09:15:00Z"),
+    "timestamps_offset": _row(created_at="2024-03-01T10:15:00+01:00", updated_at="2024-03-01T10:15:00.5+01:00"),
+    "optional_text_missing": _without(_row(), "company_name", "activity_name", "website", "logo_url"),
+    "status_missing": _without(_row(), "status"),
+    "integer_rating": _row(rating=4, review_count=0),
+}
+
+
+@pytest.mark.parametrize("name", sorted(ROWS))
+def test_shaped_rows_match_model_validate(name):
+    row = ROWS[name]
+    shaped = _PUBLIC_ROWS.shape_many([row])
+
+    _PUBLIC_ROWS.check(shaped)
+    assert _normalized(shaped[0]) == _normalized(_reference(row))
+
+
+def test_private_columns_are_dropped():
+    shaped = _PUBLIC_ROWS.shape(_row())
+
+    assert set(shaped) == set(EntrepreneurPublic.model_fields)
+    assert shaped["portfolio"] == [{"type": "link", "value": "https://dribbble.com/awa"}]
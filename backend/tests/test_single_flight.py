@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight, query_key
+from services.supabase_client import execute, get_supabase_admin
+
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"rows": [1, 2]}
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("key", fetch) for _ in range(5)))
+        # Autre clé : appel distinct
+        other = await flight.do("other", fetch)
+        return results, other
+
+    results, other = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert all(result is results[0] for result in results)
+    assert other == {"rows": [1, 2]}
+    assert flight.stats() == {"in_flight": 0, "executed": 2, "coalesced": 4}
+
+
+def test_error_reaches_every_waiter_and_is_not_cached():
+    flight = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ConnectionError("PostgREST unavailable")
+
+    async def succeeding():
+        calls.append(1)
+        return "ok"
+
+    async def scenario():
+        results = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+        # Appel suivant après l'échec : nouvelle exécution, pas l'erreur mémorisée
+        return results, await flight.do("key", succeeding)
+
+    results, after = asyncio.run(scenario())
+    assert all(isinstance(result, ConnectionError) for result in results)
+    assert after == "ok"
+    assert len(calls) == 2
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+    release = None
+
+    async def fetch():
+        await release.wait()
+        return "rows"
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        first = asyncio.ensure_future(flight.do("key", fetch))
+        second = asyncio.ensure_future(flight.do("key", fetch))
+        await asyncio.sleep(0)
+        # Client déconnecté : sa requête est annulée, pas l'appel partagé
+        first.cancel()
+        release.set()
+        return await second
+
+    assert asyncio.run(scenario()) == "rows"
+
+
+@pytest.mark.usefixtures("fake_supabase")
+def test_query_key_only_coalesces_identical_reads():
+    table = get_supabase_admin().table("entrepreneurs_public")
+    key = query_key(table.select("*").eq("id", "a"))
+
+    assert key == query_key(table.select("*").eq("id", "a"))
+    assert key != query_key(table.select("*").eq("id", "b"))
+    # Écritures jamais coalescées ; RPC seulement sur demande
+    assert query_key(table.insert({"id": "a"})) is None
+    rpc = get_supabase_admin().rpc("get_platform_stats", {})
+    assert query_key(rpc) is None
+    assert query_key(rpc, coalesce=True) is not None
+    assert query_key(table.select("*"), coalesce=False) is None
+
+
+def test_identical_concurrent_reads_reach_postgrest_once(fake_supabase):
+    fake_supabase.seed(10, 0)
+    supabase = get_supabase_admin()
+
+    async def scenario():
+        query = lambda: supabase.table("entrepreneurs_public").select("*").limit(5)
+        return await asyncio.gather(*(execute(query(), call_site="tests.single_flight") for _ in range(4)))
+
+    before = fake_supabase.requests["postgrest"]
+    results = asyncio.run(scenario())
+    assert fake_supabase.requests["postgrest"] - before == 1
+    assert all(result.data == results[0].data and len(result.data) == 5 for result in results)
@@ -0,0 +1,46 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from config import get_settings
+from services import http_cache, platform_stats
+from services.cache import TTLCache
+from services.circuit_breaker import get_breaker
+
+settings = get_settings()
+
+
+@pytest.fixture
+def client(fake_supabase, monkeypatch):
+    from server import app
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    # Ni copie périmée ni instantané des statistiques laissés par un autre test
+    monkeypatch.setattr(http_cache, "_last_good", TTLCache(settings.STALE_CACHE_SIZE, settings.STALE_CACHE_MAX_AGE_SECONDS))
+    monkeypatch.setattr(platform_stats, "_snapshot", platform_stats.PlatformStatsSnapshot(settings.STATS_REFRESH_SECONDS))
+    fake_supabase.seed(20, 2)
+    get_breaker.cache_clear()
+    yield TestClient(app)
+    get_breaker.cache_clear()
+
+
+@pytest.mark.parametrize("path", ["/api/stats", "/api/contact/stats", "/api/entrepreneurs"])
+def test_open_breaker_answers_503_with_retry_after(client, path):
+    get_breaker("postgrest")._open()
+
+    response = client.get(path)
+
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_open_breaker_serves_the_last_good_stats_as_stale(client):
+    fresh = client.get("/api/stats")
+    assert fresh.status_code == 200
+    platform_stats._snapshot.invalidate()
+    get_breaker("postgrest")._open()
+
+    response = client.get("/api/stats")
+
+    assert response.status_code == 200
+    assert response.json() == fresh.json()
+    assert response.headers["Warning"] == '110 - "Response is Stale"'
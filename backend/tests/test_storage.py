@@ -0,0 +1,39 @@
+import io
+
+import pytest
+from fastapi.testclient import TestClient
+
+Image = pytest.importorskip("PIL.Image")
+
+from config import get_settings
+from routers.storage import LOGO_CACHE_CONTROL
+
+settings = get_settings()
+
+
+def test_every_logo_variant_is_uploaded_with_long_cache_control(fake_supabase, monkeypatch):
+    from server import app
+
+    monkeypatch.setattr(settings, "LOGO_PIPELINE_ENABLED", True)
+    (user_id, email), = fake_supabase.seed(0, 1)
+    uploads = []
+    handle = fake_supabase.handle
+
+    def recording(service, request):
+        if service == "storage" and request.method == "POST":
+            uploads.append((request.url.path, request.headers.get("cache-control")))
+        return handle(service, request)
+
+    monkeypatch.setattr(fake_supabase, "handle", recording)
+    buffer = io.BytesIO()
+    Image.new("RGB", (640, 480), "orange").save(buffer, format="PNG")
+
+    response = TestClient(app).post(
+        "/api/storage/upload-logo",
+        files={"file": ("logo.png", buffer.getvalue(), "image/png")},
+        headers={"Authorization": f"Bearer {fake_supabase.mint_token(user_id, email)}"},
+    )
+
+    assert response.status_code == 200
+    assert len(uploads) == 1 + len(settings.logo_thumbnail_sizes)
+    assert {cache_control for _, cache_control in uploads} == {f"max-age={LOGO_CACHE_CONTROL}"}
@@ -0,0 +1,46 @@
+import asyncio
+
+import jwt
+import pytest
+from fastapi.testclient import TestClient
+
+from config import get_settings
+from services.supabase_client import execute, get_supabase_admin
+
+settings = get_settings()
+
+
+@pytest.fixture
+def client(fake_supabase, monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    fake_supabase.seed(5, 2)
+    from server import app
+    return TestClient(app)
+
+
+def _record_postgrest(fake, monkeypatch):
+    """Roles of the Authorization header of every PostgREST request"""
+    roles = []
+    handle = fake.handle
+
+    def recording(service, request):
+        if service == "postgrest":
+            token = request.headers["authorization"].split(" ", 1)[1]
+            roles.append(jwt.decode(token, options={"verify_signature": False})["role"])
+        return handle(service, request)
+
+    monkeypatch.setattr(fake, "handle", recording)
+    return roles
+
+
+@pytest.mark.parametrize("path,payload", [
+    ("/api/auth/login", {"email": "user0@bench.example.com", "password": "benchmark-password"}),
+    ("/api/auth/register", {"email": "new@example.com", "password": "a-long-password", "first_name": "A", "last_name": "B"}),
+])
+def test_admin_client_keeps_service_role_after_sign_in(client, fake_supabase, monkeypatch, path, payload):
+    assert client.post(path, json=payload).status_code in (200, 201)
+    roles = _record_postgrest(fake_supabase, monkeypatch)
+
+    asyncio.run(execute(get_supabase_admin().rpc("get_platform_stats", {}), call_site="tests.stats"))
+    assert roles and set(roles) == {"service_role"}
+    assert get_supabase_admin().options.headers["Authorization"] == f"Bearer {settings.SUPABASE_SERVICE_ROLE_KEY}"
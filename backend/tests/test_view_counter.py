@@ -0,0 +1,116 @@
+import asyncio
+import logging
+
+from services import view_counter
+from services.view_counter import ViewCounter
+
+
+class _Client:
+    """Stands for the Supabase client: the RPC builder is a copy of its deltas"""
+
+    def rpc(self, name, params):
+        assert name == "increment_entrepreneur_views"
+        return dict(params["deltas"])
+
+
+def _execute(monkeypatch, failures=0):
+    """execute() stand-in failing the first `failures` calls; returns the deltas of every call"""
+    calls = []
+    state = {"failures": failures}
+
+    async def execute(deltas, call_site=None):
+        calls.append(deltas)
+        if state["failures"] > 0:
+            state["failures"] -= 1
+            raise ConnectionError("PostgREST unavailable")
+
+    monkeypatch.setattr(view_counter, "execute", execute)
+    return calls
+
+
+def _counter(tmp_path=None):
+    return ViewCounter(flush_seconds=60, dedup_seconds=60, dedup_size=100, spool_path=tmp_path / "views.sqlite3" if tmp_path else None)
+
+
+def test_views_are_written_in_one_call_with_merged_counts(monkeypatch):
+    calls = _execute(monkeypatch)
+    counter = _counter()
+
+    async def scenario():
+        for viewer in (1, 2, 3):
+            counter.record("a", viewer, _Client())
+        counter.record("b", 1, _Client())
+        # Même client, même profil : compté une fois
+        assert not counter.record("a", 1, _Client())
+        assert counter.pending("a") == 3
+        return await counter.flush()
+
+    assert asyncio.run(scenario()) == 2
+    assert calls == [{"a": 3, "b": 1}]
+    assert counter.stats()["written"] == 4 and counter.stats()["deduplicated"] == 1
+    assert counter.pending() == 0
+
+
+def test_failed_flush_merges_deltas_back(monkeypatch):
+    calls = _execute(monkeypatch, failures=1)
+    counter = _counter()
+
+    async def scenario():
+        counter.record("a", 1, _Client())
+        counter.record("b", 1, _Client())
+        try:
+            await counter.flush()
+        except ConnectionError:
+            pass
+        # Vues arrivées après l'échec : ajoutées aux deltas remis en attente
+        counter.record("a", 2, _Client())
+        assert counter.pending("a") == 2 and counter.pending("b") == 1
+        await counter.flush()
+
+    asyncio.run(scenario())
+    assert calls == [{"a": 1, "b": 1}, {"a": 2, "b": 1}]
+    assert counter.stats()["failures"] == 1
+
+
+def test_drain_retries_failed_writes(monkeypatch, tmp_path):
+    calls = _execute(monkeypatch, failures=2)
+    counter = _counter(tmp_path)
+
+    async def scenario():
+        counter.record("a", 1, _Client())
+        await counter.drain(timeout=5)
+
+    asyncio.run(scenario())
+    assert calls == [{"a": 1}] * 3
+    assert counter.pending() == 0
+    assert not (tmp_path / "views.sqlite3").exists()
+
+
+def test_drain_spools_unwritten_views_for_the_next_start(monkeypatch, tmp_path, caplog):
+    calls = _execute(monkeypatch, failures=1000)
+    first = _counter(tmp_path)
+
+    async def shutdown():
+        first.record("a", 1, _Client())
+        first.record("a", 2, _Client())
+        first.record("b", 1, _Client())
+        await first.drain(timeout=0.3)
+
+    with caplog.at_level(logging.WARNING, logger="services.view_counter"):
+        asyncio.run(shutdown())
+    assert len(calls) >= 2
+    assert first.pending() == 0
+    assert "kept in" in caplog.text
+
+    # Redémarrage : les vues reprennent, puis sont écrites une seule fois
+    calls = _execute(monkeypatch)
+    second = _counter(tmp_path)
+
+    async def restart():
+        assert await second.restore(_Client()) == 3
+        # Le spool est vidé à la reprise : pas de double comptage à l'arrêt suivant
+        assert await _counter(tmp_path).restore(_Client()) == 0
+        await second.drain(timeout=5)
+
+    asyncio.run(restart())
+    assert calls == [{"a": 2, "b": 1}]
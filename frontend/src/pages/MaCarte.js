@@ -476,7 +476,8 @@ const MaCarte = () => {
         },
       });
 
-      const url = response.data?.url;
+      // Miniature « medium » quand le serveur a généré des variantes : les logos sont affichés en petit format
+      const url = response.data?.variants?.medium || response.data?.url;
       if (url) {
         handleChange('logo_url', url);
         setLogoPreview(url);
@@ -63,3 +63,364 @@ CREATE TRIGGER lock_entrepreneur_fields
     BEFORE UPDATE ON public.entrepreneurs
     FOR EACH ROW
     EXECUTE FUNCTION public.lock_sensitive_fields();
+
+-- ==========================================
+-- RECHERCHE PLEIN TEXTE: search_entrepreneurs
+-- ==========================================
+-- Filtres + recherche classée + tri + pagination en une seule requête.
+-- Le document plein texte reprend exactement l'expression de
+-- idx_entrepreneurs_search pour que l'index GIN soit utilisé ; l'index
+-- trigramme couvre les fautes de frappe et les préfixes.
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS idx_entrepreneurs_search_trgm ON public.entrepreneurs
+USING GIN((
+    COALESCE(first_name, '') || ' ' ||
+    COALESCE(last_name, '') || ' ' ||
+    COALESCE(company_name, '') || ' ' ||
+    COALESCE(activity_name, '') || ' ' ||
+    COALESCE(description, '')
+) gin_trgm_ops);
+
+CREATE OR REPLACE FUNCTION public.search_entrepreneurs(
+    search_query TEXT DEFAULT NULL,
+    filter_country_code TEXT DEFAULT NULL,
+    filter_city TEXT DEFAULT NULL,
+    filter_profile_type TEXT DEFAULT NULL,
+    filter_tags TEXT[] DEFAULT NULL,
+    filter_min_rating NUMERIC DEFAULT NULL,
+    sort_by TEXT DEFAULT 'relevance',
+    sort_ascending BOOLEAN DEFAULT FALSE,
+    page_limit INTEGER DEFAULT 50,
+    page_offset INTEGER DEFAULT 0
+)
+RETURNS SETOF public.entrepreneurs_public AS $$
+    WITH params AS (
+        SELECT
+            NULLIF(btrim(search_query), '') AS term,
+            websearch_to_tsquery('french', COALESCE(search_query, '')) AS tsq
+    ),
+    matches AS (
+        SELECT
+            p.*,
+            CASE WHEN params.term IS NULL THEN 0 ELSE
+                ts_rank(
+                    to_tsvector('french',
+                        COALESCE(p.first_name, '') || ' ' ||
+                        COALESCE(p.last_name, '') || ' ' ||
+                        COALESCE(p.company_name, '') || ' ' ||
+                        COALESCE(p.activity_name, '') || ' ' ||
+                        COALESCE(p.description, '')),
+                    params.tsq)
+                + word_similarity(params.term,
+                        COALESCE(p.first_name, '') || ' ' ||
+                        COALESCE(p.last_name, '') || ' ' ||
+                        COALESCE(p.company_name, '') || ' ' ||
+                        COALESCE(p.activity_name, '') || ' ' ||
+                        COALESCE(p.description, ''))
+            END AS search_rank
+        FROM public.entrepreneurs_public p, params
+        WHERE (
+                params.term IS NULL
+                OR to_tsvector('french',
+                        COALESCE(p.first_name, '') || ' ' ||
+                        COALESCE(p.last_name, '') || ' ' ||
+                        COALESCE(p.company_name, '') || ' ' ||
+                        COALESCE(p.activity_name, '') || ' ' ||
+                        COALESCE(p.description, '')) @@ params.tsq
+                OR params.term <% (
+                        COALESCE(p.first_name, '') || ' ' ||
+                        COALESCE(p.last_name, '') || ' ' ||
+                        COALESCE(p.company_name, '') || ' ' ||
+                        COALESCE(p.activity_name, '') || ' ' ||
+                        COALESCE(p.description, ''))
+            )
+            AND (filter_country_code IS NULL OR p.country_code = upper(filter_country_code))
+            AND (filter_city IS NULL OR p.city ILIKE '%' || filter_city || '%')
+            AND (filter_profile_type IS NULL OR p.profile_type = filter_profile_type)
+            AND (filter_tags IS NULL OR p.tags @> filter_tags)
+            AND (filter_min_rating IS NULL OR p.rating >= filter_min_rating)
+    )
+    SELECT
+        m.id, m.user_id, m.profile_type, m.first_name, m.last_name,
+        m.company_name, m.activity_name, m.logo_url, m.description, m.tags,
+        m.website, m.country_code, m.city, m.portfolio, m.rating,
+        m.review_count, m.is_premium, m.status, m.created_at, m.updated_at
+    FROM matches m
+    ORDER BY
+        CASE WHEN sort_by = 'relevance' THEN m.search_rank END DESC,
+        -- Profils sans note en dernier dans les deux sens, comme la liste paginée
+        CASE WHEN sort_by = 'rating' AND sort_ascending THEN m.rating END ASC NULLS LAST,
+        CASE WHEN sort_by = 'rating' AND NOT sort_ascending THEN m.rating END DESC NULLS LAST,
+        CASE WHEN sort_by <> 'rating' AND sort_ascending THEN m.created_at END ASC,
+        CASE WHEN sort_by <> 'rating' AND NOT sort_ascending THEN m.created_at END DESC,
+        -- Départage par id dans le sens du tri (même ordre que le curseur)
+        CASE WHEN sort_by <> 'relevance' AND NOT sort_ascending THEN m.id END DESC,
+        m.id
+    LIMIT LEAST(GREATEST(page_limit, 1), 100)
+    OFFSET GREATEST(page_offset, 0);
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION public.search_entrepreneurs(TEXT, TEXT, TEXT, TEXT, TEXT[], NUMERIC, TEXT, BOOLEAN, INTEGER, INTEGER)
+    TO anon, authenticated, service_role;
+
+-- ==========================================
+-- PAGINATION PAR CURSEUR (keyset) de l'annuaire
+-- ==========================================
+-- (created_at, id) et (rating, id) : ordre total utilisé par le paramètre cursor (profils sans note en dernier)
+CREATE INDEX IF NOT EXISTS idx_entrepreneurs_published_created_id ON public.entrepreneurs(created_at DESC, id DESC)
+    WHERE status = 'published';
+CREATE INDEX IF NOT EXISTS idx_entrepreneurs_published_rating_id ON public.entrepreneurs(rating DESC NULLS LAST, id DESC)
+    WHERE status = 'published';
+
+-- ==========================================
+-- FUNCTION: Statistiques globales (un seul appel)
+-- ==========================================
+-- Remplace les requêtes count + le téléchargement de tous les country_code
+-- faits par /api/stats et /api/contact/stats.
+CREATE OR REPLACE FUNCTION public.get_platform_stats()
+RETURNS TABLE(
+    total_users BIGINT,
+    total_entrepreneurs BIGINT,
+    total_published BIGINT,
+    countries_covered BIGINT
+) AS $$
+    SELECT
+        (SELECT COUNT(*) FROM public.user_profiles),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE e.status = 'published'),
+        COUNT(DISTINCT e.country_code)
+    FROM public.entrepreneurs e;
+$$ LANGUAGE sql STABLE SECURITY DEFINER;
+
+REVOKE EXECUTE ON FUNCTION public.get_platform_stats() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_platform_stats() TO service_role;
+
+-- ==========================================
+-- FUNCTION: Contacts de plusieurs profils (un seul appel)
+-- ==========================================
+-- Version ensembliste de get_entrepreneur_contacts pour /api/entrepreneurs/batch/contacts.
+-- Limitée aux profils publiés : l'appel en lot ne doit pas exposer les brouillons.
+-- Au plus 20 identifiants (BATCH_CONTACTS_MAX_IDS du backend). Réservée au backend (service_role),
+-- qui compte un jeton entrepreneurs.contact par identifiant : la clé anon ne doit pas la contourner.
+CREATE OR REPLACE FUNCTION public.get_entrepreneur_contacts_batch(entrepreneur_ids UUID[])
+RETURNS TABLE(id UUID, phone VARCHAR, whatsapp VARCHAR, email VARCHAR) AS $$
+BEGIN
+    IF COALESCE(array_length(entrepreneur_ids, 1), 0) > 20 THEN
+        RAISE EXCEPTION 'At most 20 entrepreneur ids per call' USING ERRCODE = '22023';
+    END IF;
+    RETURN QUERY
+    SELECT e.id, e.phone, e.whatsapp, e.email
+    FROM public.entrepreneurs e
+    WHERE e.id = ANY(entrepreneur_ids)
+      AND e.status = 'published';
+END;
+$$ LANGUAGE plpgsql STABLE SECURITY DEFINER SET search_path = public, pg_temp;
+
+REVOKE EXECUTE ON FUNCTION public.get_entrepreneur_contacts_batch(UUID[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_entrepreneur_contacts_batch(UUID[]) TO service_role;
+
+-- ==========================================
+-- FUNCTIONS: Création / suppression de profil (transactionnelles)
+-- ==========================================
+-- Un seul appel par opération : la ligne entrepreneurs et le flag
+-- user_profiles.has_profile sont modifiés dans la même transaction.
+-- Résultat JSONB : {"status": "created", "profile": {...}} | {"status": "already_exists"}
+--                  {"status": "deleted", "id": ...} | {"status": "not_found"} | {"status": "not_owner"}
+-- Réservées au service_role : p_user_id est fourni par le backend après authentification.
+CREATE OR REPLACE FUNCTION public.create_entrepreneur_profile(p_user_id UUID, p_profile JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    new_row public.entrepreneurs;
+BEGIN
+    INSERT INTO public.entrepreneurs (
+        user_id, profile_type, first_name, last_name, company_name, activity_name, logo_url,
+        description, tags, phone, whatsapp, email, website, country_code, city, portfolio,
+        status, first_saved_at
+    )
+    SELECT
+        p_user_id, r.profile_type, r.first_name, r.last_name, r.company_name, r.activity_name, r.logo_url,
+        r.description, COALESCE(r.tags, '{}'), r.phone, r.whatsapp, r.email, r.website, r.country_code, r.city,
+        COALESCE(r.portfolio, '[]'::jsonb), 'draft', NOW()
+    FROM jsonb_populate_record(NULL::public.entrepreneurs, p_profile) r
+    ON CONFLICT (user_id) DO NOTHING
+    RETURNING * INTO new_row;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'already_exists');
+    END IF;
+
+    UPDATE public.user_profiles SET has_profile = TRUE WHERE user_id = p_user_id;
+    RETURN jsonb_build_object('status', 'created', 'profile', to_jsonb(new_row));
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+CREATE OR REPLACE FUNCTION public.delete_entrepreneur_profile(p_user_id UUID, p_entrepreneur_id UUID DEFAULT NULL)
+RETURNS JSONB AS $$
+DECLARE
+    target_id UUID;
+    owner_id UUID;
+BEGIN
+    -- Sans identifiant : le profil de l'utilisateur
+    SELECT e.id, e.user_id INTO target_id, owner_id
+    FROM public.entrepreneurs e
+    WHERE (p_entrepreneur_id IS NULL AND e.user_id = p_user_id)
+       OR e.id = p_entrepreneur_id
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'not_found');
+    END IF;
+    IF owner_id <> p_user_id THEN
+        RETURN jsonb_build_object('status', 'not_owner');
+    END IF;
+
+    DELETE FROM public.entrepreneurs WHERE id = target_id;
+    UPDATE public.user_profiles SET has_profile = FALSE WHERE user_id = p_user_id;
+    RETURN jsonb_build_object('status', 'deleted', 'id', target_id);
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.create_entrepreneur_profile(UUID, JSONB) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION public.delete_entrepreneur_profile(UUID, UUID) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.create_entrepreneur_profile(UUID, JSONB) TO service_role;
+GRANT EXECUTE ON FUNCTION public.delete_entrepreneur_profile(UUID, UUID) TO service_role;
+
+-- ==========================================
+-- FUNCTION: Facettes de l'annuaire (un seul agrégat)
+-- ==========================================
+-- Nombre de profils publiés par pays, ville, type de profil et tag pour /api/entrepreneurs/facets,
+-- restreint par les mêmes filtres que search_entrepreneurs. Les profils filtrés sont lus une seule
+-- fois (CTE matérialisée) ; chaque facette garde ses facet_limit valeurs les plus fréquentes.
+CREATE OR REPLACE FUNCTION public.get_entrepreneur_facets(
+    search_query TEXT DEFAULT NULL,
+    filter_country_code TEXT DEFAULT NULL,
+    filter_city TEXT DEFAULT NULL,
+    filter_profile_type TEXT DEFAULT NULL,
+    filter_tags TEXT[] DEFAULT NULL,
+    filter_min_rating NUMERIC DEFAULT NULL,
+    facet_limit INTEGER DEFAULT 50
+)
+RETURNS JSONB AS $$
+    WITH params AS (
+        SELECT
+            NULLIF(btrim(search_query), '') AS term,
+            websearch_to_tsquery('french', COALESCE(search_query, '')) AS tsq,
+            LEAST(GREATEST(facet_limit, 1), 200) AS max_values
+    ),
+    matches AS MATERIALIZED (
+        SELECT p.country_code, p.city, p.profile_type, p.tags
+        FROM public.entrepreneurs_public p, params
+        WHERE (
+                params.term IS NULL
+                OR to_tsvector('french',
+                        COALESCE(p.first_name, '') || ' ' ||
+                        COALESCE(p.last_name, '') || ' ' ||
+                        COALESCE(p.company_name, '') || ' ' ||
+                        COALESCE(p.activity_name, '') || ' ' ||
+                        COALESCE(p.description, '')) @@ params.tsq
+                OR params.term <% (
+                        COALESCE(p.first_name, '') || ' ' ||
+                        COALESCE(p.last_name, '') || ' ' ||
+                        COALESCE(p.company_name, '') || ' ' ||
+                        COALESCE(p.activity_name, '') || ' ' ||
+                        COALESCE(p.description, ''))
+            )
+            AND (filter_country_code IS NULL OR p.country_code = upper(filter_country_code))
+            AND (filter_city IS NULL OR p.city ILIKE '%' || filter_city || '%')
+            AND (filter_profile_type IS NULL OR p.profile_type = filter_profile_type)
+            AND (filter_tags IS NULL OR p.tags @> filter_tags)
+            AND (filter_min_rating IS NULL OR p.rating >= filter_min_rating)
+    ),
+    counts AS (
+        SELECT 'country_code' AS facet, country_code AS value, COUNT(*) AS n FROM matches WHERE country_code IS NOT NULL GROUP BY country_code
+        UNION ALL
+        SELECT 'city', city, COUNT(*) FROM matches WHERE city IS NOT NULL AND city <> '' GROUP BY city
+        UNION ALL
+        SELECT 'profile_type', profile_type, COUNT(*) FROM matches WHERE profile_type IS NOT NULL GROUP BY profile_type
+        UNION ALL
+        SELECT 'tags', tag, COUNT(*) FROM matches, unnest(matches.tags) AS tag GROUP BY tag
+    ),
+    ranked AS (
+        SELECT facet, value, n, row_number() OVER (PARTITION BY facet ORDER BY n DESC, value) AS position
+        FROM counts
+    )
+    SELECT jsonb_build_object('total', (SELECT COUNT(*) FROM matches))
+        || COALESCE((
+            SELECT jsonb_object_agg(facet, items)
+            FROM (
+                SELECT facet, jsonb_agg(jsonb_build_object('value', value, 'count', n) ORDER BY position) AS items
+                FROM ranked, params
+                WHERE position <= params.max_values
+                GROUP BY facet
+            ) grouped
+        ), '{}'::jsonb);
+$$ LANGUAGE sql STABLE;
+
+GRANT EXECUTE ON FUNCTION public.get_entrepreneur_facets(TEXT, TEXT, TEXT, TEXT, TEXT[], NUMERIC, INTEGER)
+    TO anon, authenticated, service_role;
+
+-- ==========================================
+-- TABLE: public.entrepreneur_views
+-- ==========================================
+-- Compteur de vues par profil, incrémenté en lot par le backend (increment_entrepreneur_views).
+CREATE TABLE IF NOT EXISTS public.entrepreneur_views (
+    entrepreneur_id UUID PRIMARY KEY REFERENCES public.entrepreneurs(id) ON DELETE CASCADE,
+    views BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+ALTER TABLE public.entrepreneur_views ENABLE ROW LEVEL SECURITY;
+
+-- ==========================================
+-- FUNCTION: Statistiques globales + total des vues
+-- ==========================================
+-- Le type de retour a changé (total_views) : CREATE OR REPLACE ne suffit pas
+DROP FUNCTION IF EXISTS public.get_platform_stats();
+CREATE OR REPLACE FUNCTION public.get_platform_stats()
+RETURNS TABLE(
+    total_users BIGINT,
+    total_entrepreneurs BIGINT,
+    total_published BIGINT,
+    countries_covered BIGINT,
+    total_views BIGINT
+) AS $$
+    SELECT
+        (SELECT COUNT(*) FROM public.user_profiles),
+        COUNT(*),
+        COUNT(*) FILTER (WHERE e.status = 'published'),
+        COUNT(DISTINCT e.country_code),
+        (SELECT COALESCE(SUM(v.views), 0)::BIGINT FROM public.entrepreneur_views v)
+    FROM public.entrepreneurs e;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.get_platform_stats() FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.get_platform_stats() TO service_role;
+
+-- ==========================================
+-- FUNCTION: Vues des profils (écriture en lot)
+-- ==========================================
+-- deltas : {"<entrepreneur_id>": <vues>, ...}, agrégés en mémoire par chaque worker.
+-- Upsert additif en une instruction ; les profils supprimés entre-temps sont ignorés.
+-- Lignes verrouillées dans l'ordre des id : deux workers qui écrivent en même temps ne s'interbloquent pas.
+CREATE OR REPLACE FUNCTION public.increment_entrepreneur_views(deltas JSONB)
+RETURNS INTEGER AS $$
+DECLARE
+    applied INTEGER;
+BEGIN
+    INSERT INTO public.entrepreneur_views AS v (entrepreneur_id, views)
+    SELECT e.id, d.value::BIGINT
+    FROM jsonb_each_text(deltas) AS d
+    JOIN public.entrepreneurs e ON e.id = d.key::UUID
+    WHERE d.value::BIGINT > 0
+    ORDER BY e.id
+    ON CONFLICT (entrepreneur_id) DO UPDATE
+        SET views = v.views + EXCLUDED.views,
+            updated_at = NOW();
+    GET DIAGNOSTICS applied = ROW_COUNT;
+    RETURN applied;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+REVOKE EXECUTE ON FUNCTION public.increment_entrepreneur_views(JSONB) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.increment_entrepreneur_views(JSONB) TO service_role;